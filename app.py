@@ -1,11 +1,78 @@
 import streamlit as st
-import fitz
-from google import genai
+from concurrent.futures import wait as wait_futures
 from datetime import datetime
-from fpdf import FPDF
-import time
-import hashlib
-import re
+import os
+import queue
+import uuid
+
+import exporters
+import warmer
+from gemini_async import AsyncRunner, call_gemini_async
+from history_store import HistoryStore
+from prompt_cache import PrefixCache
+from interview_core import (
+    BATCH_MAX_COMBINATIONS,
+    BATCH_QAS_SCHEMA,
+    CATEGORIES,
+    DIFFICULTIES,
+    EVALUATION_SCHEMA,
+    EXPERIENCE_LEVELS,
+    MODEL,
+    QAS_SCHEMA,
+    STRUCTURED_OUTPUT,
+    InterviewEngine,
+    LazyClient,
+    build_batch_qas_prompt,
+    build_evaluation_prompt,
+    build_qas_prefix,
+    build_qas_prompt,
+    build_structured_evaluation_prompt,
+    build_structured_qas_prefix,
+    build_structured_qas_prompt,
+    batch_qas_from_json,
+    build_summary_prompt,
+    cache_evaluation,
+    evaluate_answers_batch,
+    extract_text_from_pdf,
+    find_similar_qas,
+    format_qas_output,
+    get_cache_key,
+    get_content_hash,
+    get_evaluation_cache_key,
+    get_summary_cache_key,
+    parse_qas_output,
+    qas_pairs_from_json,
+    remember_qas,
+    render_evaluation,
+    render_qas,
+    split_complete_pairs,
+    store_structured_qas,
+)
+from rate_limiter import (
+    DEFAULT_RPD,
+    DEFAULT_RPM,
+    DEFAULT_TPM,
+    RateLimiter,
+    RateLimitExceeded,
+    estimate_tokens,
+)
+from response_cache import ResponseCache, SessionCache
+from retry_policy import CircuitOpenError, RetryPolicy, classify_error
+from session_memory import MemoryManager, SpillStore
+from similarity_cache import SimilarityIndex
+from single_flight import SingleFlight
+from structured_output import call_json_async
+from telemetry import (
+    ENABLED as TELEMETRY_ENABLED,
+    incr,
+    registry,
+    span,
+    start_file_sink,
+    start_http_server,
+    stats_text,
+    traced,
+)
+from token_meter import TokenBudgetExceeded, TokenMeter
 
 # ---------------- Page Config ----------------
 st.set_page_config(
@@ -18,20 +85,44 @@ if "reset_id" not in st.session_state:
     st.session_state["reset_id"] = 0
 
 # ---------------- Session History Initialization ----------------
-if "conversation_history" not in st.session_state:
-    st.session_state["conversation_history"] = []
+# The user id lives in the URL so the stored history survives page reloads
+if "user_id" not in st.session_state:
+    st.session_state["user_id"] = st.query_params.get("uid") or uuid.uuid4().hex
+    st.query_params["uid"] = st.session_state["user_id"]
+
+if "history_page" not in st.session_state:
+    st.session_state["history_page"] = 0
 
 # ---------------- API Rate Limiting ----------------
-if "last_api_call" not in st.session_state:
-    st.session_state["last_api_call"] = 0
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
+# ---------------- Session Memory ----------------
+@st.cache_resource
+def get_memory_manager():
+    """Process-wide per-session memory caps; values spill to a compressed file (RAM only if it cannot be opened)"""
+    try:
+        store = SpillStore()
+    except Exception:
+        store = None
+    return MemoryManager(store)
+
+if "memory" not in st.session_state:
+    st.session_state["memory"] = get_memory_manager().session(st.session_state["session_id"])
 
 if "api_cache" not in st.session_state:
-    st.session_state["api_cache"] = {}
+    # Kept for the whole session so its hit/miss counters survive reruns
+    st.session_state["api_cache"] = SessionCache(st.session_state["memory"].namespace("api"))
+
+# Large per-session values (document summary, generated Q&A, last evaluation) live under the
+# session's memory cap, so they spill to disk while the session is idle
+session_data = st.session_state["memory"].namespace("data")
 
 # ---------------- Clear Form Logic ----------------
 def clear_form():
+    st.session_state["memory"].namespace("data").clear()
     for key in list(st.session_state.keys()):
-        if key not in ["reset_id", "conversation_history", "last_api_call", "api_cache"]:
+        if key not in ["reset_id", "user_id", "session_id", "memory", "api_cache", "history_page"]:
             del st.session_state[key]
 
 def clear_and_reset():
@@ -39,254 +130,445 @@ def clear_and_reset():
     st.session_state["reset_id"] += 1
 
 def clear_history():
-    st.session_state["conversation_history"] = []
+    get_history_store().clear(st.session_state["user_id"])
+    st.session_state["history_page"] = 0
+    st.session_state.pop("loaded_session_id", None)
+    st.session_state.pop("current_session_id", None)
     st.success("Conversation history cleared!")
 
 # ---------------- Rate Limiting Helper ----------------
+MAX_QUEUE_WAIT = float(os.environ.get("QA_MAX_QUEUE_WAIT", 60))
+
+@st.cache_resource
+def get_rate_limiter():
+    """Process-wide token-bucket scheduler shared by all sessions"""
+    return RateLimiter(
+        rpm=int(os.environ.get("QA_RPM", DEFAULT_RPM)),
+        rpd=int(os.environ.get("QA_RPD", DEFAULT_RPD)),
+        tpm=int(os.environ.get("QA_TPM", DEFAULT_TPM))
+    )
+
 def can_make_api_call():
-    """Enforce minimum 5 seconds between API calls"""
-    current_time = time.time()
-    time_since_last = current_time - st.session_state["last_api_call"]
+    """Check the shared rate limit budget; returns (allowed, expected wait in seconds)"""
+    wait_time = get_rate_limiter().expected_wait()
     
-    if time_since_last < 5:
-        return False, 5 - time_since_last
-    return True, 0
+    if wait_time > MAX_QUEUE_WAIT:
+        return False, wait_time
+    return True, wait_time
+
+def acquire_api_slot(prompt):
+    """Wait for this session's turn in the shared budget; False if it takes too long"""
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(prompt)
+    
+    try:
+        get_token_meter().check(st.session_state["session_id"], tokens)
+    except TokenBudgetExceeded as e:
+        st.error(f"❌ {e}. Cached results are still available.")
+        return False
+    
+    expected_wait = limiter.expected_wait(tokens)
+    if expected_wait >= 1:
+        st.info(f"⏳ Queued behind other requests, expected wait {expected_wait:.0f} seconds...")
+    
+    try:
+        with span("rate_limit_wait"):
+            limiter.acquire(st.session_state["session_id"], tokens, timeout=MAX_QUEUE_WAIT)
+        return True
+    except RateLimitExceeded:
+        st.error("❌ The app is at its request limit right now. Please try again in a minute.")
+        return False
+
+# ---------------- Retry Policy ----------------
+@st.cache_resource
+def get_retry_policy():
+    """Process-wide circuit breakers and model fallback list (QA_FALLBACK_MODELS)"""
+    return RetryPolicy()
+
+# ---------------- Token Metering ----------------
+@st.cache_resource
+def get_token_meter():
+    """Process-wide token counters and budgets (QA_SESSION_TOKEN_BUDGET / QA_PROCESS_TOKEN_BUDGET)"""
+    return TokenMeter()
+
+# ---------------- Telemetry ----------------
+@st.cache_resource
+def get_telemetry():
+    """Register component metrics and start the exporters once per process (QA_TELEMETRY=1)"""
+    if not TELEMETRY_ENABLED:
+        return None
+    # Resolved here: collectors run on the exporter threads, which have no Streamlit context
+    components = {
+        "cache": get_shared_cache(),
+        "rate_limiter": get_rate_limiter(),
+        "single_flight": get_single_flight(),
+        "context_cache": get_prefix_cache(),
+        "retry": get_retry_policy(),
+        "warmer": get_cache_warmer(),
+        "memory": get_memory_manager(),
+    }
+    for name, component in components.items():
+        if component is not None:
+            registry.register_collector(name, lambda name=name, component=component: stats_text(name, component.stats()))
+    registry.register_collector("tokens", get_token_meter().metrics_text)
+    start_http_server()
+    start_file_sink()
+    return registry
+
+# ---------------- Response Cache ----------------
+@st.cache_resource
+def get_shared_cache():
+    """Process-wide disk cache shared by all sessions (None if disabled or unavailable)"""
+    if os.environ.get("QA_CACHE_BACKEND", "sqlite").lower() == "session":
+        return None
+    try:
+        return ResponseCache()
+    except Exception:
+        return None
 
-def get_cache_key(text):
-    """Generate cache key for API responses"""
-    return hashlib.md5(text.encode()).hexdigest()
+def get_response_cache():
+    """Return the shared cache, falling back to the per-session dict"""
+    shared = get_shared_cache()
+    if shared is not None:
+        return shared
+    return st.session_state["api_cache"]
+
+# ---------------- Near-duplicate Reuse ----------------
+@st.cache_resource
+def get_similarity_index():
+    """Process-wide near-duplicate index; needs the shared cache the indexed keys point into"""
+    if get_shared_cache() is None:
+        return None
+    try:
+        return SimilarityIndex()
+    except Exception:
+        return None
+
+def find_similar_generation(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Q&A generated earlier for a near-identical job text, as (text, similarity), or None"""
+    return find_similar_qas(
+        get_similarity_index(), get_shared_cache(),
+        job_or_jd, summary_text, category, difficulty, experience_level
+    )
+
+def remember_generation(job_or_jd, summary_text, category, difficulty, experience_level):
+    remember_qas(get_similarity_index(), job_or_jd, summary_text, category, difficulty, experience_level)
+
+# ---------------- Context Caching ----------------
+@st.cache_resource
+def get_prefix_cache():
+    """Process-wide cached-content handles for long prompt prefixes (job + resume context)"""
+    return PrefixCache(
+        client, MODEL,
+        rate_limiter=get_rate_limiter(),
+        token_meter=get_token_meter(),
+        retry_policy=get_retry_policy()
+    )
+
+def record_usage(response, prompt, feature, output_text=None):
+    """Meter a response and show how much input came from cached context"""
+    get_prefix_cache().record(response)
+    _, _, cached_tokens = get_token_meter().record(
+        st.session_state["session_id"], feature, response, prompt, output_text
+    )
+    if cached_tokens:
+        st.caption(f"♻️ {cached_tokens:,} input tokens served from cached document context")
+
+# ---------------- Request Coalescing ----------------
+@st.cache_resource
+def get_single_flight():
+    """Process-wide group that merges identical in-flight prompts"""
+    return SingleFlight()
+
+# ---------------- Async Execution ----------------
+@st.cache_resource
+def get_async_runner():
+    """Process-wide background event loop for concurrent Gemini calls"""
+    return AsyncRunner(max_concurrency=int(os.environ.get("QA_MAX_CONCURRENT_CALLS", 4)))
+
+def submit_gemini_call(model, prompt, cache_key=None, feature=None):
+    """Start a Gemini call in the background and return a Future for its text"""
+    return get_async_runner().submit(
+        call_gemini_async(
+            client, model, prompt,
+            cache=get_response_cache(),
+            cache_key=cache_key,
+            rate_limiter=get_rate_limiter(),
+            session_id=st.session_state["session_id"],
+            single_flight=get_single_flight(),
+            token_meter=get_token_meter(),
+            feature=feature,
+            retry_policy=get_retry_policy()
+        )
+    )
+
+def submit_json_call(model, prompt, schema, cache_key=None, prefix=None, feature=None):
+    """Start a JSON-mode call in the background; the Future yields the validated value"""
+    return get_async_runner().submit(
+        call_json_async(
+            client, model, prompt, schema,
+            cache=get_response_cache(),
+            cache_key=cache_key,
+            rate_limiter=get_rate_limiter(),
+            session_id=st.session_state["session_id"],
+            single_flight=get_single_flight(),
+            prefix=prefix,
+            prefix_cache=get_prefix_cache(),
+            token_meter=get_token_meter(),
+            feature=feature,
+            retry_policy=get_retry_policy()
+        )
+    )
 
 # ---------------- API Call with Retry ----------------
-def call_gemini_with_retry(client, model, prompt, max_retries=4, cache_key=None):
-    """Call Gemini API with exponential backoff retry logic and caching"""
+def call_gemini_with_retry(client, model, prompt, max_retries=4, cache_key=None, prefix=None, feature=None):
+    """Call Gemini API with retries and caching; the retry loop runs on the background event loop"""
+    
+    cache = get_response_cache()
     
     # Check cache first
-    if cache_key and cache_key in st.session_state["api_cache"]:
-        st.success("✅ Using cached response (no API call needed)")
-        return st.session_state["api_cache"][cache_key]
+    if cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            st.success("✅ Using cached response (no API call needed)")
+            return cached
+        
+        if get_single_flight().in_flight(cache_key):
+            st.info("🔗 An identical request is already running, waiting for its result...")
     
-    for attempt in range(max_retries):
-        try:
-            # Add initial delay to avoid immediate rate limits
-            if attempt == 0:
-                time.sleep(1)  # 1 second delay before first attempt
-            
-            response = client.models.generate_content(
-                model=model,
-                contents=[{"text": prompt}]
-            )
-            result = response.text
-            
-            # Cache the result
-            if cache_key:
-                st.session_state["api_cache"][cache_key] = result
-            
-            return result
-            
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Handle 503 Server Overload
-            if "503" in error_msg or "overloaded" in error_msg.lower() or "unavailable" in error_msg.lower():
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 3  # 3, 6, 12, 24 seconds
-                    st.warning(f"⏳ Server overloaded. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                    
-                    # Show countdown
-                    progress_bar = st.progress(0)
-                    for i in range(wait_time):
-                        progress_bar.progress((i + 1) / wait_time)
-                        time.sleep(1)
-                    progress_bar.empty()
-                else:
-                    st.error(f"❌ Server still overloaded after {max_retries} attempts. Please try again in a few minutes.")
-                    st.info("💡 The model might be experiencing high demand. Try switching to gemini-1.5-flash if this persists.")
-                    raise e
-            
-            # Handle 429 Rate Limit
-            elif "429" in error_msg:
-                if attempt == 0:
-                    st.error("❌ **Rate limit hit on first attempt!**")
-                    st.warning("""
-                    **Possible causes:**
-                    - You've exceeded your free tier quota (15 requests/min or 1500/day)
-                    - API quota was already exhausted from previous usage
-                    
-                    **Solutions:**
-                    1. Wait 60 seconds and try again
-                    2. Check your quota at: https://aistudio.google.com/app/apikey
-                    """)
-                
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 5  # 5, 10, 20, 40 seconds
-                    st.warning(f"⏳ Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                    
-                    progress_bar = st.progress(0)
-                    for i in range(wait_time):
-                        progress_bar.progress((i + 1) / wait_time)
-                        time.sleep(1)
-                    progress_bar.empty()
-                else:
-                    st.error(f"❌ Failed after {max_retries} attempts. Please wait 1-2 minutes before trying again.")
-                    raise e
-            
-            # Handle other errors
-            elif attempt < max_retries - 1:
-                wait_time = 2
-                st.warning(f"⚠️ Request failed: {error_msg}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                st.error(f"❌ Error after {max_retries} attempts: {error_msg}")
-                raise e
+    return run_gemini_call(client, model, prompt, max_retries, cache_key, prefix, feature)
+
+def run_gemini_call(client, model, prompt, max_retries=4, cache_key=None, prefix=None, feature=None, coalesce=True):
+    """Run call_gemini_async on the AsyncRunner and report its progress from the script thread.
+
+    Retry waits are asyncio sleeps on the event loop, so the script thread only polls
+    the Future. The loop thread must not touch Streamlit, so its retry notices are
+    queued and rendered here. `coalesce=False` skips single-flight for callers that
+    already lead the key (the streaming fallback).
+    """
+    session_id = st.session_state["session_id"]
+    rate_limiter = get_rate_limiter()
+    expected_wait = rate_limiter.expected_wait(estimate_tokens(prompt))
+    if expected_wait >= 1:
+        st.info(f"⏳ Queued behind other requests, expected wait {expected_wait:.0f} seconds...")
+    
+    notices = queue.SimpleQueue()
+    future = get_async_runner().submit(
+        call_gemini_async(
+            client, model, prompt, max_retries,
+            cache=get_response_cache(),
+            cache_key=cache_key,
+            on_retry=lambda *notice: notices.put(notice),
+            rate_limiter=rate_limiter,
+            session_id=session_id,
+            single_flight=get_single_flight() if coalesce else None,
+            prefix=prefix,
+            prefix_cache=get_prefix_cache(),
+            token_meter=get_token_meter(),
+            feature=feature,
+            retry_policy=get_retry_policy()
+        )
+    )
+    while True:
+        done, _ = wait_futures([future], timeout=0.25)
+        while not notices.empty():
+            show_retry_notice(*notices.get(), max_retries)
+        if done:
+            break
     
-    return None
+    try:
+        return future.result()
+    except CircuitOpenError as e:
+        st.error(f"❌ {e}")
+        return None
+    except TokenBudgetExceeded as e:
+        st.error(f"❌ {e}. Cached results are still available.")
+        return None
+    except Exception as e:
+        kind = classify_error(e)
+        if kind == "fatal":
+            st.error(f"❌ Request rejected: {e}")
+        elif kind == "overloaded":
+            st.error(f"❌ Server still overloaded after {max_retries} attempts. Please try again in a few minutes.")
+        elif kind == "rate_limit":
+            st.error(f"❌ Failed after {max_retries} attempts. Please wait 1-2 minutes before trying again.")
+            st.info("💡 Check your quota at: https://aistudio.google.com/app/apikey")
+        else:
+            st.error(f"❌ Error after {max_retries} attempts: {e}")
+        raise
+
+def show_retry_notice(kind, attempt, wait_time, error, max_retries):
+    """Render one retry reported by the event loop"""
+    if kind == "overloaded":
+        st.warning(f"⏳ Server overloaded. Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
+    elif kind == "rate_limit":
+        st.warning(f"⏳ Rate limit hit. Retrying in {wait_time:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
+    else:
+        st.warning(f"⚠️ Request failed: {error}. Retrying in {wait_time:.1f} seconds...")
 
-# ---------------- Format Q&A Output ----------------
-def format_qas_output(qas_text):
-    """Ensure proper formatting with blank lines between Q&A pairs"""
-    if not qas_text:
-        return qas_text
+# ---------------- Streaming ----------------
+def stream_gemini(client, model, prompt, cache_key=None, prefix=None, feature=None):
+    """Yield response text as it is generated; the assembled text is cached"""
+    cache = get_response_cache()
+    single_flight = None
     
-    # Clean up any extra spaces
-    qas_text = qas_text.strip()
+    if cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        # Share the result of an identical request that is already in flight
+        single_flight = get_single_flight()
+        future, leader = single_flight.begin(cache_key)
+        if not leader:
+            st.info("🔗 An identical request is already running, waiting for its result...")
+            result = future.result()
+            if result:
+                yield result
+            return
     
-    # Replace variations with standard format
-    replacements = [
-        (r'(?i)\bQ1[:\.\s]+', 'Q1. '),
-        (r'(?i)\bQ2[:\.\s]+', 'Q2. '),
-        (r'(?i)\bQ3[:\.\s]+', 'Q3. '),
-        (r'(?i)\bQ4[:\.\s]+', 'Q4. '),
-        (r'(?i)\bA1[:\.\s]+', '\nA1. '),
-        (r'(?i)\bA2[:\.\s]+', '\nA2. '),
-        (r'(?i)\bA3[:\.\s]+', '\nA3. '),
-        (r'(?i)\bA4[:\.\s]+', '\nA4. '),
-    ]
+    chunks = []
+    try:
+        for text in stream_gemini_uncached(client, model, prompt, cache_key, prefix, feature):
+            chunks.append(text)
+            yield text
+    except BaseException as e:
+        if single_flight:
+            single_flight.finish(cache_key, future, error=e)
+        raise
     
-    for pattern, replacement in replacements:
-        qas_text = re.sub(pattern, replacement, qas_text)
+    if single_flight:
+        single_flight.finish(cache_key, future, result="".join(chunks) or None)
+
+def stream_gemini_uncached(client, model, prompt, cache_key=None, prefix=None, feature=None):
+    """Streaming call behind stream_gemini; stores the assembled text in the cache"""
+    policy = get_retry_policy()
+    if not policy.breaker(model).allow():
+        # Model is failing: skip the stream and let the retry loop pick a fallback (this key is already led here)
+        result = run_gemini_call(client, model, prompt, cache_key=cache_key, prefix=prefix, feature=feature, coalesce=False)
+        if result:
+            yield result
+        return
     
-    # Ensure double newlines between Q&A pairs
-    qas_text = re.sub(r'(A\d\. .*?)(?=Q\d\.)', r'\1\n\n', qas_text, flags=re.DOTALL)
+    text, config = get_prefix_cache().request(prompt, prefix, session_id=st.session_state["session_id"])
+    if not acquire_api_slot(text):
+        policy.breaker(model).release()
+        return
     
-    return qas_text
-
-# ---------------- Export Functions ----------------
-def export_to_text():
-    """Export conversation history to text format"""
-    if not st.session_state["conversation_history"]:
-        return None
+    chunks = []
+    chunk = None
+    try:
+        # Includes the time the page spends rendering each chunk
+        with span("gemini_stream", model=model, feature=feature or "other"):
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=[{"text": text}],
+                config=config
+            ):
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+    except Exception as e:
+        kind = classify_error(e)
+        incr("qa_gemini_errors_total", kind=kind, model=model)
+        policy.record_failure(model, kind)
+        if chunks:
+            raise
+        if text is not prompt and kind in ("fatal", "other"):
+            get_prefix_cache().invalidate(prefix)
+        # Nothing streamed yet: fall back to the non-streaming call and its retries
+        result = run_gemini_call(client, model, prompt, cache_key=cache_key, prefix=prefix, feature=feature, coalesce=False)
+        if result:
+            yield result
+        return
     
-    content = "=" * 80 + "\n"
-    content += "INTERVIEW Q&A SESSION HISTORY\n"
-    content += f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-    content += "=" * 80 + "\n\n"
+    policy.record_success(model)
+    # Usage metadata arrives with the final chunk
+    if chunk is not None:
+        record_usage(chunk, text, feature, output_text="".join(chunks))
+    if cache_key and chunks:
+        get_response_cache().set(cache_key, "".join(chunks))
+
+def render_streamed_qas(chunks, placeholder):
+    """Render Q&A pairs as they arrive, formatting each pair once it is complete"""
+    received = []
+    completed = []
+    pending = ""
     
-    for idx, entry in enumerate(st.session_state["conversation_history"], 1):
-        content += f"\n{'=' * 80}\n"
-        content += f"SESSION {idx}\n"
-        content += f"Timestamp: {entry['timestamp']}\n"
-        content += f"{'=' * 80}\n\n"
-        
-        content += f"JOB ROLE/JD:\n{entry['job_or_jd']}\n\n"
-        
-        if entry.get('document_summary'):
-            content += f"DOCUMENT SUMMARY:\n{entry['document_summary']}\n\n"
-        
-        content += f"SETTINGS:\n"
-        content += f"- Category: {entry['category']}\n"
-        content += f"- Difficulty: {entry['difficulty']}\n"
-        content += f"- Experience Level: {entry['experience_level']}\n\n"
-        
-        content += f"GENERATED Q&A:\n{entry['qas']}\n\n"
-        
-        if entry.get('evaluations'):
-            content += "ANSWER EVALUATIONS:\n"
-            for eval_idx, evaluation in enumerate(entry['evaluations'], 1):
-                content += f"\nEvaluation {eval_idx}:\n"
-                content += f"Question: {evaluation['question']}\n"
-                content += f"User Answer: {evaluation['user_answer']}\n"
-                content += f"Feedback:\n{evaluation['feedback']}\n\n"
-    
-    return content
-
-def export_to_pdf():
-    """Export conversation history to PDF format with encoding safety"""
-    if not st.session_state["conversation_history"]:
+    for chunk in chunks:
+        received.append(chunk)
+        pending += chunk
+        pairs, pending = split_complete_pairs(pending)
+        completed.extend(format_qas_output(pair) for pair in pairs)
+        placeholder.markdown("\n\n".join(completed + [pending]))
+    
+    return "".join(received)
+
+def render_streamed_text(chunks, placeholder):
+    """Render free-form text as it arrives"""
+    received = []
+    for chunk in chunks:
+        received.append(chunk)
+        placeholder.markdown("".join(received))
+    return "".join(received)
+
+# ---------------- Session History Store ----------------
+HISTORY_PAGE_SIZE = int(os.environ.get("QA_HISTORY_PAGE_SIZE", 10))
+
+@st.cache_resource
+def get_history_store():
+    """Process-wide SQLite history store"""
+    return HistoryStore()
+
+# ---------------- Cache Warming ----------------
+@st.cache_resource
+def get_cache_warmer():
+    """Background warmer for popular roles (QA_WARM_INTERVAL > 0 and the shared cache), else None"""
+    if warmer.DEFAULT_INTERVAL <= 0 or get_shared_cache() is None:
         return None
+    engine = InterviewEngine(
+        client,
+        cache=get_shared_cache(),
+        rate_limiter=get_rate_limiter(),
+        single_flight=get_single_flight(),
+        session_id=warmer.SESSION_ID,
+        similarity_index=get_similarity_index(),
+        token_meter=get_token_meter(),
+        retry_policy=get_retry_policy()
+    )
+    return warmer.CacheWarmer(engine, get_history_store()).start()
+
+def count_history():
+    return get_history_store().count_sessions(st.session_state["user_id"])
+
+# ---------------- Export Functions ----------------
+EXPORT_FORMATS = {  # fmt -> (label, mime type)
+    "txt": ("📄 Text", "text/plain"),
+    "pdf": ("📕 PDF", "application/pdf"),
+    "jsonl": ("💾 JSONL", "application/jsonl"),
+    "csv": ("📊 CSV", "text/csv"),
+}
+
+def export_button(fmt):
+    """Download button whose export is only built when it is clicked"""
+    label, mime = EXPORT_FORMATS[fmt]
+    # Resolved here: Streamlit runs the callable on a server thread, which has no script context
+    store = get_history_store()
+    user_id = st.session_state["user_id"]
     
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    def clean_text(text):
-        if not isinstance(text, str):
-            return str(text)
-        replacements = {
-            '\u2013': '-',
-            '\u2014': '-',
-            '\u2018': "'",
-            '\u2019': "'",
-            '\u201c': '"',
-            '\u201d': '"',
-            '\u2022': '*',
-        }
-        for char, replacement in replacements.items():
-            text = text.replace(char, replacement)
-        return text
-
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 20)
-    pdf.cell(0, 10, "Interview Q&A Session History", ln=True, align="C")
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align="C")
-    pdf.ln(10)
-    
-    for idx, entry in enumerate(st.session_state["conversation_history"], 1):
-        pdf.add_page()
-        
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, f"Session {idx}", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.cell(0, 8, f"Timestamp: {entry['timestamp']}", ln=True)
-        pdf.ln(5)
-        
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 8, "Job Role/JD:", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.multi_cell(0, 6, clean_text(entry['job_or_jd']))
-        pdf.ln(3)
-        
-        if entry.get('document_summary'):
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 8, "Document Summary:", ln=True)
-            pdf.set_font("Arial", "", 10)
-            pdf.multi_cell(0, 6, clean_text(entry['document_summary']))
-            pdf.ln(3)
-        
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 8, "Settings:", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.cell(0, 6, clean_text(f"Category: {entry['category']}, Difficulty: {entry['difficulty']}, Experience: {entry['experience_level']}"), ln=True)
-        pdf.ln(3)
-        
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 8, "Generated Q&A:", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.multi_cell(0, 6, clean_text(entry['qas']))
-        pdf.ln(3)
-        
-        if entry.get('evaluations'):
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(0, 8, "Answer Evaluations:", ln=True)
-            for eval_idx, evaluation in enumerate(entry['evaluations'], 1):
-                pdf.set_font("Arial", "B", 10)
-                pdf.cell(0, 6, f"Evaluation {eval_idx}:", ln=True)
-                pdf.set_font("Arial", "", 10)
-                pdf.multi_cell(0, 5, clean_text(f"Question: {evaluation['question']}"))
-                pdf.multi_cell(0, 5, clean_text(f"User Answer: {evaluation['user_answer']}"))
-                pdf.multi_cell(0, 5, clean_text(f"Feedback: {evaluation['feedback']}"))
-                pdf.ln(2)
-    
-    return pdf.output(dest='S').encode('latin-1', errors='replace')
+    def build():
+        # Streamed from SQLite into a temp file, so only one session is in memory at a time
+        with span("export", format=fmt):
+            return exporters.export_bytes(store.iter_sessions(user_id), fmt)
+    
+    st.download_button(
+        label=label,
+        data=build,
+        file_name=f"interview_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+        mime=mime,
+        key=f"download_{fmt}"
+    )
 
 # ---------------- Lavender UI ----------------
 st.markdown("""
@@ -331,224 +613,403 @@ html, body, [class*="st-"] {
 st.title("Interview Q&A Generator")
 
 # ---------------- Info Banner ----------------
-st.info("💡 **Using Gemini 2.5 Flash:** Wait at least 5 seconds between requests. The app automatically handles server issues with smart retries.")
+st.info("💡 **Using Gemini 2.5 Flash:** Requests share the app's rate limit budget and are queued fairly when it is busy. The app automatically handles server issues with smart retries.")
 
 # ---------------- Gemini Client ----------------
+@st.cache_resource
+def get_client():
+    """Process-wide Gemini client, built on the first API call and reused by every session and rerun"""
+    return LazyClient(st.secrets["GEMINI_API_KEY"])
+
 try:
-    client = genai.Client(api_key=st.secrets["GEMINI_API_KEY"])
+    client = get_client()
 except Exception as e:
     st.error(f"❌ Failed to initialize Gemini API: {e}")
     st.stop()
 
 # ---------------- Helper Functions ----------------
-def extract_text_from_pdf(uploaded_file):
-    """Extract text from PDF with size limits"""
-    pdf = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-    text = ""
-    
-    # Only process first 3 pages to reduce token usage
-    max_pages = min(3, len(pdf))
-    for page_num in range(max_pages):
-        text += pdf[page_num].get_text()
-    
-    # Hard limit on characters (approximately 1000 tokens)
-    if len(text) > 4000:
-        text = text[:4000] + "\n\n[Document truncated for processing...]"
-    
-    return text
+def add_history_entry(job_or_jd, summary_text, category, difficulty, experience_level, qas, pairs=None):
+    """Append a generated Q&A set (and its parsed pairs) to the session history and make it current"""
+    history_entry = {
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "job_or_jd": job_or_jd,
+        "document_summary": summary_text,
+        "category": category,
+        "difficulty": difficulty,
+        "experience_level": experience_level,
+        "qas": qas,
+        "pairs": pairs or [],
+        "evaluations": []
+    }
+    st.session_state["current_session_id"] = get_history_store().add_session(
+        st.session_state["user_id"], history_entry
+    )
 
+def add_evaluation(session_id, question, user_answer, feedback, result=None):
+    """Attach an answer evaluation (and its structured scores, if any) to a history entry"""
+    get_history_store().add_evaluation(st.session_state["user_id"], session_id, {
+        "question": question,
+        "user_answer": user_answer,
+        "feedback": feedback,
+        "result": result
+    })
 
+@traced("summary")
 def generate_document_summary(document_text):
     """Generate document summary with caching"""
-    
-    # Additional safety truncation
-    if len(document_text) > 3500:
-        document_text = document_text[:3500] + "\n[Content truncated]"
-    
-    prompt = f"""
-You are an expert document analyzer. Analyze the provided document and determine if it's a RESUME or JOB DESCRIPTION, then generate an appropriate summary.
-
-IF IT'S A RESUME:
-Generate a concise, single-paragraph professional summary including:
-1. Full name (in bold)
-2. Educational background (degree, institution, graduation year, GPA/CGPA/percentage)
-3. Core technical skills (programming languages, frameworks, libraries, tools, platforms, specialized domains)
-4. Professional experience (company/organization names, duration, key responsibilities and achievements)
-5. Major projects (project names with technologies used and key outcomes)
-6. Certifications (list all certifications with issuing organization if mentioned)
-7. Publications/Research (if any - title, journal/conference, date)
-8. Contact information (email, phone, location)
-
-Output format: **[Name]** is a [Degree] graduate ([Years], [GPA]) from [Institution] with expertise in [Skills]. [He/She] completed [Experience details with dates and achievements]. Key projects include [Project names with technologies]. [He/She] holds certifications in [Certifications list] and published [Publication details if any]. Contact: [Email, Phone, Location].
-
-IF IT'S A JOB DESCRIPTION:
-Generate a concise, single-paragraph summary including:
-1. Job title/position (in bold)
-2. Company name (if mentioned)
-3. Key responsibilities and duties
-4. Required technical skills and qualifications
-5. Experience level required
-6. Preferred qualifications or nice-to-haves
-7. Work location/type (remote, hybrid, onsite)
-
-Output format: **[Job Title]** at [Company] requires [Experience level] with expertise in [Required skills]. Key responsibilities include [Main duties]. Candidates should have [Qualifications and requirements]. Preferred qualifications include [Nice-to-haves]. Location: [Work type/location].
-
-FORMATTING REQUIREMENTS:
-- Output must be a SINGLE, well-structured paragraph
-- Start with the key identifier (name for resume, job title for JD) in **bold** markdown format
-- Be precise and concise - eliminate unnecessary words
-- Include specific technical terms, tool names, and keywords exactly as mentioned
-- Use commas and brief phrases to separate items within categories
-- Maintain professional tone throughout
-- Ensure EVERY important detail is captured without omission
-
-Now analyze the following document and provide the appropriate summary:
-
-{document_text}
-"""
-    
-    cache_key = get_cache_key(f"summary_{document_text}")
+    prompt, cache_key = build_summary_prompt(document_text)
     
     return call_gemini_with_retry(
         client,
-        "gemini-2.5-flash",
+        MODEL,
         prompt,
-        cache_key=cache_key
+        cache_key=cache_key,
+        feature="summary"
     )
 
 
-def generate_qas(job_or_jd, summary_text, category, difficulty, experience_level):
-    """Generate Q&A with caching"""
-    prompt = f"""
-You are a professional interview coach.
-
-Generate exactly 4 interview questions WITH answers.
-
-CRITICAL FORMATTING RULES - FOLLOW EXACTLY:
-1. Start each question with "Q1.", "Q2.", "Q3.", "Q4."
-2. Start each answer with "A1.", "A2.", "A3.", "A4."
-3. Put ONE blank line after each answer
-4. NO introductory text, NO concluding remarks, NO extra formatting
-
-EXACT OUTPUT FORMAT YOU MUST USE:
-Q1. <question text>
-A1. <detailed answer>
-
-Q2. <question text>
-A2. <detailed answer>
-
-Q3. <question text>
-A3. <detailed answer>
+def submit_document_summary(document_text):
+    """Start the summary call without blocking the render thread"""
+    prompt, cache_key = build_summary_prompt(document_text)
+    return submit_gemini_call(MODEL, prompt, cache_key=cache_key, feature="summary")
 
-Q4. <question text>
-A4. <detailed answer>
 
-Interview Parameters:
-- Category: {category}
-- Difficulty: {difficulty}
-- Experience Level: {experience_level}
-
-Job Role / JD:
-{job_or_jd}
-
-Resume Summary:
-{summary_text if summary_text else "Not provided"}
-
-Generate the 4 questions and answers now following the EXACT format shown above.
-"""
+@traced("generate_qas")
+def generate_qas(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Generate Q&A with caching"""
+    prompt, cache_key = build_qas_prompt(job_or_jd, summary_text, category, difficulty, experience_level)
     
-    cache_key = get_cache_key(f"qas_v3_{job_or_jd}_{summary_text}_{category}_{difficulty}_{experience_level}")
+    return call_gemini_with_retry(
+        client,
+        MODEL,
+        prompt,
+        cache_key=cache_key,
+        prefix=build_qas_prefix(job_or_jd, summary_text),
+        feature="qas"
+    )
+
 
+def stream_qas(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Stream Q&A text chunks with caching"""
+    prompt, cache_key = build_qas_prompt(job_or_jd, summary_text, category, difficulty, experience_level)
     
-    return call_gemini_with_retry(
+    return stream_gemini(
         client,
-        "gemini-2.5-flash",
+        MODEL,
         prompt,
-        cache_key=cache_key
+        cache_key=cache_key,
+        prefix=build_qas_prefix(job_or_jd, summary_text),
+        feature="qas"
     )
 
 
+@traced("evaluate_answer")
 def evaluate_answer(question, user_answer):
-    """Evaluate answer with retry logic"""
-    prompt = f"""
-You are an interview evaluator.
+    """Evaluate answer with retry logic and caching"""
+    return call_gemini_with_retry(
+        client,
+        MODEL,
+        build_evaluation_prompt(question, user_answer),
+        cache_key=get_evaluation_cache_key(question, user_answer),
+        feature="evaluation"
+    )
 
-Evaluate based on:
-1. Completeness
-2. Technical Accuracy
-3. Communication Clarity
 
-Provide:
-- Score /10
-- Feedback
-- Improvements
+def generate_qas_batch(job_or_jd, summary_text, combinations):
+    """Generate Q&A for many combinations in as few calls as possible.
+
+    Combinations already in the cache are served from it; the rest are grouped into
+    chunks of BATCH_MAX_COMBINATIONS that run concurrently in JSON mode, so a malformed
+    batch is repaired or reported rather than cached. Every parsed set is cached under
+    its single-request key so later single requests hit.
+    """
+    cache = get_response_cache()
+    results = {}
+    missing = []
+    for combination in combinations:
+        _, cache_key = build_qas_prompt(job_or_jd, summary_text, *combination)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            results[combination] = cached
+        else:
+            missing.append(combination)
+    
+    chunks = [missing[i:i + BATCH_MAX_COMBINATIONS] for i in range(0, len(missing), BATCH_MAX_COMBINATIONS)]
+    futures = []
+    for chunk in chunks:
+        prompt = build_batch_qas_prompt(job_or_jd, summary_text, chunk)
+        futures.append(submit_json_call(
+            MODEL, prompt, BATCH_QAS_SCHEMA, cache_key=get_cache_key(f"qas_batch_v2_{prompt}"), feature="qas"
+        ))
+    
+    for chunk, future in zip(chunks, futures):
+        try:
+            parsed = batch_qas_from_json(future.result())
+        except Exception as e:
+            st.error(f"❌ Batch request failed: {e}")
+            continue
+        for combination in chunk:
+            qas = parsed.get(tuple(value.lower() for value in combination))
+            if qas:
+                _, cache_key = build_qas_prompt(job_or_jd, summary_text, *combination)
+                cache.set(cache_key, qas)
+                remember_generation(job_or_jd, summary_text, *combination)
+                results[combination] = qas
+    
+    return results
+
+
+def generate_qas_structured(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Q&A pairs from a schema-validated JSON response, or None if it could not be produced"""
+    prompt, cache_key = build_structured_qas_prompt(job_or_jd, summary_text, category, difficulty, experience_level)
+    try:
+        value = submit_json_call(
+            MODEL, prompt, QAS_SCHEMA, cache_key=cache_key,
+            prefix=build_structured_qas_prefix(job_or_jd, summary_text),
+            feature="qas"
+        ).result()
+    except Exception as e:
+        st.error(f"❌ Could not generate structured questions: {e}")
+        return None
+    pairs = qas_pairs_from_json(value)
+    store_structured_qas(
+        get_response_cache(), get_similarity_index(),
+        job_or_jd, summary_text, category, difficulty, experience_level, pairs
+    )
+    return pairs
+
+
+def evaluate_answer_structured(question, user_answer):
+    """Evaluation scores as a validated dict, or None if it could not be produced"""
+    try:
+        result = submit_json_call(
+            MODEL,
+            build_structured_evaluation_prompt(question, user_answer),
+            EVALUATION_SCHEMA,
+            cache_key=get_evaluation_cache_key(question, user_answer, structured=True),
+            feature="evaluation"
+        ).result()
+    except Exception as e:
+        st.error(f"❌ Could not evaluate the answer: {e}")
+        return None
+    cache_evaluation(get_response_cache(), question, user_answer, result)
+    return result
+
 
-Question:
-{question}
+def evaluate_all_answers(items):
+    """Evaluate several (question, answer) items in one request; cached items are not re-sent.
 
-Answer:
-{user_answer}
-"""
+    Returns results in item order (None for an item the model skipped), or None on failure.
+    """
+    # Resolved here: the batch runs on the event loop thread, which has no Streamlit context
+    rate_limiter = get_rate_limiter()
+    token_meter = get_token_meter()
+    retry_policy = get_retry_policy()
+    session_id = st.session_state["session_id"]
     
-    return call_gemini_with_retry(
+    def call_json(prompt, schema):
+        return call_json_async(
+            client, MODEL, prompt, schema,
+            rate_limiter=rate_limiter, session_id=session_id,
+            token_meter=token_meter, feature="evaluation", retry_policy=retry_policy
+        )
+    
+    try:
+        return get_async_runner().submit(
+            evaluate_answers_batch(call_json, get_response_cache(), items)
+        ).result()
+    except Exception as e:
+        st.error(f"❌ Could not evaluate the answers: {e}")
+        return None
+
+
+def stream_evaluation(question, user_answer):
+    """Stream evaluation text chunks with caching"""
+    return stream_gemini(
         client,
-        "gemini-2.5-flash",
-        prompt
+        MODEL,
+        build_evaluation_prompt(question, user_answer),
+        cache_key=get_evaluation_cache_key(question, user_answer),
+        feature="evaluation"
     )
 
 # ---------------- Sidebar for History ----------------
 with st.sidebar:
     st.header("📜 Session History")
     
-    if st.session_state["conversation_history"]:
-        st.write(f"**Total Sessions:** {len(st.session_state['conversation_history'])}")
+    total_sessions = count_history()
+    
+    if total_sessions:
+        st.write(f"**Total Sessions:** {total_sessions}")
         
         st.subheader("Export Options")
         
+        # Exports are built when a download button is clicked, never on a rerun
         col1, col2 = st.columns(2)
-        
         with col1:
-            text_content = export_to_text()
-            if text_content:
-                st.download_button(
-                    label="📄 Text",
-                    data=text_content,
-                    file_name=f"interview_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain"
-                )
-        
+            export_button("txt")
         with col2:
-            pdf_content = export_to_pdf()
-            if pdf_content:
-                st.download_button(
-                    label="📕 PDF",
-                    data=pdf_content,
-                    file_name=f"interview_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
+            export_button("pdf")
+        
+        col3, col4 = st.columns(2)
+        with col3:
+            export_button("jsonl")
+        with col4:
+            export_button("csv")
         
         st.button("🗑️ Clear History", on_click=clear_history)
         st.divider()
         
         st.subheader("Previous Sessions")
-        for idx, entry in enumerate(reversed(st.session_state["conversation_history"]), 1):
-            with st.expander(f"Session {len(st.session_state['conversation_history']) - idx + 1} - {entry['timestamp']}"):
-                st.write(f"**Category:** {entry['category']}")
-                st.write(f"**Difficulty:** {entry['difficulty']}")
-                st.write(f"**Experience:** {entry['experience_level']}")
-                if st.button(f"Load Session", key=f"load_{idx}"):
-                    st.session_state["loaded_session"] = entry
+        search_query = st.text_input("🔎 Search history", key="history_search", placeholder="e.g. kafka partitioning")
+        store = get_history_store()
+        
+        if search_query.strip():
+            # Ranked full-text matches replace the paginated listing while searching
+            results = store.search(st.session_state["user_id"], search_query, limit=HISTORY_PAGE_SIZE)
+            if not results:
+                st.caption("No matching sessions.")
+            for entry in results:
+                with st.expander(f"Session {entry['id']} - {entry['timestamp']}"):
+                    st.markdown(entry["snippet"])
+                    st.caption(f"{entry['category']} · {entry['difficulty']} · {entry['experience_level']}")
+                    if st.button("Load Session", key=f"search_load_{entry['id']}"):
+                        st.session_state["loaded_session_id"] = entry["id"]
+                        st.rerun()
+        else:
+            filter_col1, filter_col2, filter_col3 = st.columns(3)
+            with filter_col1:
+                filter_category = st.selectbox("Category", ["All"] + CATEGORIES, key="history_filter_category")
+            with filter_col2:
+                filter_difficulty = st.selectbox("Difficulty", ["All"] + DIFFICULTIES, key="history_filter_difficulty")
+            with filter_col3:
+                filter_experience = st.selectbox("Experience", ["All"] + EXPERIENCE_LEVELS, key="history_filter_experience")
+            filters = {
+                "category": None if filter_category == "All" else filter_category,
+                "difficulty": None if filter_difficulty == "All" else filter_difficulty,
+                "experience_level": None if filter_experience == "All" else filter_experience,
+            }
+        
+            # Only one page of summaries is fetched and rendered per rerun
+            matching = store.count_sessions(st.session_state["user_id"], filters)
+            page_count = max(1, -(-matching // HISTORY_PAGE_SIZE))
+            page = min(st.session_state["history_page"], page_count - 1)
+        
+            for entry in store.list_sessions(
+                st.session_state["user_id"],
+                limit=HISTORY_PAGE_SIZE,
+                offset=page * HISTORY_PAGE_SIZE,
+                filters=filters
+            ):
+                with st.expander(f"Session {entry['id']} - {entry['timestamp']}"):
+                    st.write(f"**Category:** {entry['category']}")
+                    st.write(f"**Difficulty:** {entry['difficulty']}")
+                    st.write(f"**Experience:** {entry['experience_level']}")
+                    if st.button("Load Session", key=f"load_{entry['id']}"):
+                        st.session_state["loaded_session_id"] = entry["id"]
+                        st.rerun()
+        
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button("◀", disabled=page == 0, key="history_prev"):
+                    st.session_state["history_page"] = page - 1
+                    st.rerun()
+            with page_col:
+                st.caption(f"Page {page + 1} of {page_count} ({matching} sessions)")
+            with next_col:
+                if st.button("▶", disabled=page >= page_count - 1, key="history_next"):
+                    st.session_state["history_page"] = page + 1
                     st.rerun()
     else:
         st.info("No session history yet. Generate Q&A to start!")
+    
+    cache_stats = get_response_cache().stats()
+    flight_stats = get_single_flight().stats()
+    st.caption(
+        f"Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries · "
+        f"Coalesced requests: {flight_stats['deduplicated']}"
+    )
+    similarity_index = get_similarity_index()
+    if similarity_index is not None:
+        similarity_stats = similarity_index.stats()
+        st.caption(
+            f"Near-duplicate reuse: {similarity_stats['hits']} of {similarity_stats['lookups']} lookups "
+            f"(threshold {similarity_stats['threshold']:.2f})"
+        )
+    prefix_stats = get_prefix_cache().stats()
+    if prefix_stats["requests"]:
+        st.caption(
+            f"Context cache: {prefix_stats['cached_tokens']:,} cached input tokens "
+            f"({prefix_stats['saved_ratio']:.0%} of input), {prefix_stats['handles']} live handles"
+        )
+    memory_stats = st.session_state["memory"].stats()
+    if memory_stats["spills"]:
+        st.caption(
+            f"Session memory: {memory_stats['bytes'] / 1024:,.0f} of {memory_stats['max_bytes'] / 1024:,.0f} KB in RAM, "
+            f"{memory_stats['spilled_entries']} entries on disk"
+        )
+    cache_warmer = get_cache_warmer()
+    if cache_warmer is not None:
+        warm_stats = cache_warmer.stats()
+        st.caption(
+            f"Warmed ahead: {warm_stats['warmed']} question sets in {warm_stats['requests']} requests "
+            f"({warm_stats['yielded']} rounds paused for user traffic)"
+        )
+    retry_stats = get_retry_policy().stats()
+    open_circuits = [model for model, circuit in retry_stats["circuits"].items() if circuit["state"] != "closed"]
+    if retry_stats["fallbacks"] or open_circuits:
+        st.caption(
+            f"Model fallbacks: {retry_stats['fallbacks']}"
+            + (f" · Circuit open: {', '.join(open_circuits)}" if open_circuits else "")
+        )
+    
+    metrics_registry = get_telemetry()
+    if metrics_registry is not None:
+        with st.expander("🐞 Stage timings"):
+            for stage, timing in sorted(metrics_registry.stage_summary().items()):
+                st.write(
+                    f"**{stage}**: {timing['count']}× · p50 {timing['p50'] * 1000:.0f} ms · "
+                    f"p95 {timing['p95'] * 1000:.0f} ms · max {timing['max'] * 1000:.0f} ms"
+                )
+            st.download_button(
+                "Download all metrics",
+                metrics_registry.metrics_text(),
+                file_name="qa_metrics.prom",
+                mime="text/plain",
+                key="download_all_metrics"
+            )
+    
+    token_meter = get_token_meter()
+    token_stats = token_meter.stats()
+    session_tokens = token_meter.session_usage(st.session_state["session_id"])
+    session_budget = f" of {token_stats['session_budget']:,}" if token_stats["session_budget"] else ""
+    st.caption(f"Tokens this session: {session_tokens:,}{session_budget}")
+    if token_stats["features"]:
+        with st.expander("📈 Token usage by feature"):
+            for feature, counters in sorted(token_stats["features"].items()):
+                st.write(
+                    f"**{feature}**: {counters['requests']} requests, "
+                    f"{counters['input_tokens']:,} in ({counters['cached_tokens']:,} cached) / "
+                    f"{counters['output_tokens']:,} out"
+                )
+            st.download_button(
+                "Download metrics",
+                token_meter.metrics_text(),
+                file_name="qa_token_metrics.prom",
+                mime="text/plain",
+                key="download_token_metrics"
+            )
 
 # ---------------- UI ----------------
 with st.container():
     st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
     # Load session if requested
-    if "loaded_session" in st.session_state:
-        loaded = st.session_state["loaded_session"]
+    loaded = None
+    if "loaded_session_id" in st.session_state:
+        loaded = get_history_store().get_session(st.session_state["user_id"], st.session_state["loaded_session_id"])
+    
+    if loaded is not None:
         st.info(f"📂 Loaded session from {loaded['timestamp']}")
         
         st.markdown("### 📄 Loaded Session Details")
@@ -568,7 +1029,7 @@ with st.container():
                 st.markdown(f"*Feedback:*\n{evaluation['feedback']}")
         
         if st.button("Close Loaded Session"):
-            del st.session_state["loaded_session"]
+            del st.session_state["loaded_session_id"]
             st.rerun()
         
         st.divider()
@@ -591,26 +1052,48 @@ with st.container():
     )
 
     summary_text = ""
+    pending_summary = None
+    summary_placeholder = None
 
     if uploaded_file is not None:
-        # Check cache first
-        file_hash = get_cache_key(uploaded_file.name + str(uploaded_file.size))
-        cache_key = f"pdf_summary_{file_hash}"
+        cache = get_response_cache()
         
-        if cache_key in st.session_state["api_cache"]:
-            summary_text = st.session_state["api_cache"][cache_key]
-            st.session_state["summary_text"] = summary_text
-            st.markdown("### 📄 Document Summary")
-            st.markdown(summary_text)
-        else:
-            with st.spinner("Analyzing document..."):
+        # Level 1: file bytes -> extracted text
+        text_cache_key = f"pdf_text_{get_content_hash(uploaded_file)}"
+        full_text = cache.get(text_cache_key)
+        if full_text is None:
+            with st.spinner("Reading document..."):
                 full_text = extract_text_from_pdf(uploaded_file)
-                summary_text = generate_document_summary(full_text)
-                st.session_state["summary_text"] = summary_text
-                st.session_state["api_cache"][cache_key] = summary_text
-
-            st.markdown("### 📄 Document Summary")
+            cache.set(text_cache_key, full_text)
+        
+        # Level 2: normalized text -> summary
+        summary_text = cache.get(get_summary_cache_key(full_text))
+        
+        st.markdown("### 📄 Document Summary")
+        if summary_text is not None:
+            session_data["summary_text"] = summary_text
             st.markdown(summary_text)
+        else:
+            # Summarize in the background while the rest of the form renders
+            pending_summary = submit_document_summary(full_text)
+            summary_placeholder = st.empty()
+            summary_placeholder.info("⏳ Analyzing document...")
+
+    def resolve_pending_summary():
+        """Wait for an in-flight summary and show it in its placeholder"""
+        global pending_summary
+        if pending_summary is None:
+            return
+        try:
+            with span("summary_wait"):
+                result = pending_summary.result()
+        except Exception as e:
+            summary_placeholder.error(f"❌ Failed to analyze document: {e}")
+            result = None
+        pending_summary = None
+        if result:
+            session_data["summary_text"] = result
+            summary_placeholder.markdown(result)
 
     # Customize Interview Questions
     st.markdown("### 🎯 Customize Interview Questions")
@@ -620,113 +1103,278 @@ with st.container():
     with col1:
         difficulty = st.selectbox(
             "Difficulty",
-            ["Easy", "Medium", "Hard"],
+            DIFFICULTIES,
             key=f"difficulty_{st.session_state['reset_id']}"
         )
 
     with col2:
         category = st.selectbox(
             "Category",
-            ["Technical", "Behavioral", "Situational", "Domain-specific"],
+            CATEGORIES,
             key=f"category_{st.session_state['reset_id']}"
         )
 
     with col3:
         experience_level = st.selectbox(
             "Experience Level",
-            ["Fresher", "Mid-level", "Senior"],
+            EXPERIENCE_LEVELS,
             key=f"experience_{st.session_state['reset_id']}"
         )
 
+    stream_responses = st.checkbox(
+        "⚡ Stream responses as they are generated",
+        value=True,
+        key="stream_responses"
+    )
+    structured_output = st.checkbox(
+        "🧩 Structured output (schema-validated JSON, not streamed)",
+        value=STRUCTURED_OUTPUT,
+        key="structured_output"
+    )
+    reuse_similar = st.checkbox(
+        "♻️ Reuse questions generated for a near-identical job description",
+        value=get_similarity_index() is not None,
+        disabled=get_similarity_index() is None,
+        key="reuse_similar"
+    )
+
     # Generate Q&A with rate limiting
     can_call, wait_time = can_make_api_call()
     generate_disabled = not can_call
 
     if generate_disabled:
-        st.warning(f"⏳ Please wait {wait_time:.1f} more seconds before making another request.")
+        st.warning(f"⏳ The app is at its request limit. Please wait about {wait_time:.0f} seconds.")
+    elif wait_time >= 1:
+        st.caption(f"⏳ Busy: requests are queued, expected wait {wait_time:.0f} seconds.")
 
     if st.button("Generate Interview Q&A", disabled=generate_disabled):
-        if not job_or_jd.strip() and "summary_text" not in st.session_state:
+        with st.spinner("Analyzing document..."):
+            resolve_pending_summary()
+        
+        if not job_or_jd.strip() and "summary_text" not in session_data:
             st.warning("Please enter a job role/JD or upload a PDF.")
         else:
-            st.session_state["last_api_call"] = time.time()
+            summary = session_data.get("summary_text", "")
+            reused = None
+            if reuse_similar:
+                reused = find_similar_generation(job_or_jd, summary, category, difficulty, experience_level)
+            st.session_state.pop("reused_similarity", None)
+            
+            structured_pairs = None
+            if reused is not None:
+                qas, st.session_state["reused_similarity"] = reused
+            elif structured_output:
+                with st.spinner("Generating questions..."):
+                    structured_pairs = generate_qas_structured(
+                        job_or_jd,
+                        summary,
+                        category,
+                        difficulty,
+                        experience_level
+                    )
+                qas = render_qas(structured_pairs) if structured_pairs else None
+            elif stream_responses:
+                st.markdown("### 🧠 Interview Questions & Answers")
+                qas = render_streamed_qas(
+                    stream_qas(
+                        job_or_jd,
+                        summary,
+                        category,
+                        difficulty,
+                        experience_level
+                    ),
+                    st.empty()
+                )
+            else:
+                with st.spinner("Generating questions..."):
+                    qas = generate_qas(
+                        job_or_jd,
+                        summary,
+                        category,
+                        difficulty,
+                        experience_level
+                    )
             
-            with st.spinner("Generating questions..."):
-                qas = generate_qas(
+            if qas:
+                if structured_pairs:
+                    pairs = structured_pairs
+                else:
+                    if reused is None:
+                        remember_generation(job_or_jd, summary, category, difficulty, experience_level)
+                    # Parse into pairs and re-render with consistent spacing
+                    pairs, qas = parse_qas_output(qas)
+                session_data["qas"] = qas
+                session_data["qa_pairs"] = pairs
+                add_history_entry(
                     job_or_jd,
-                    st.session_state.get("summary_text", ""),
+                    summary,
                     category,
                     difficulty,
-                    experience_level
+                    experience_level,
+                    qas,
+                    pairs
                 )
+                st.rerun()
+
+    # Batch mode: several combinations in one request
+    with st.expander("📦 Batch mode: generate several combinations at once"):
+        batch_difficulties = st.multiselect(
+            "Difficulties", DIFFICULTIES, default=[difficulty],
+            key=f"batch_difficulties_{st.session_state['reset_id']}"
+        )
+        batch_categories = st.multiselect(
+            "Categories", CATEGORIES, default=[category],
+            key=f"batch_categories_{st.session_state['reset_id']}"
+        )
+        batch_experience_levels = st.multiselect(
+            "Experience Levels", EXPERIENCE_LEVELS, default=[experience_level],
+            key=f"batch_experience_{st.session_state['reset_id']}"
+        )
+        combinations = [
+            (batch_category, batch_difficulty, batch_experience)
+            for batch_category in batch_categories
+            for batch_difficulty in batch_difficulties
+            for batch_experience in batch_experience_levels
+        ]
+        st.caption(f"{len(combinations)} combination(s) selected")
+        
+        if st.button("Generate Batch", disabled=generate_disabled or not combinations):
+            with st.spinner("Analyzing document..."):
+                resolve_pending_summary()
+            
+            if not job_or_jd.strip() and "summary_text" not in session_data:
+                st.warning("Please enter a job role/JD or upload a PDF.")
+            else:
+                summary = session_data.get("summary_text", "")
+                with st.spinner(f"Generating {len(combinations)} question sets..."):
+                    batch_results = generate_qas_batch(job_or_jd, summary, combinations)
                 
-                if qas:
-                    # Format the output to ensure proper spacing
-                    qas = format_qas_output(qas)
-                    st.session_state["qas"] = qas
-                    
-                    history_entry = {
-                        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        "job_or_jd": job_or_jd,
-                        "document_summary": st.session_state.get("summary_text", ""),
-                        "category": category,
-                        "difficulty": difficulty,
-                        "experience_level": experience_level,
-                        "qas": qas,
-                        "evaluations": []
-                    }
-                    st.session_state["conversation_history"].append(history_entry)
-                    st.session_state["current_session_idx"] = len(st.session_state["conversation_history"]) - 1
+                st.session_state.pop("reused_similarity", None)
+                for combination in combinations:
+                    if combination in batch_results:
+                        pairs, qas = parse_qas_output(batch_results[combination])
+                        session_data["qas"] = qas
+                        session_data["qa_pairs"] = pairs
+                        add_history_entry(job_or_jd, summary, *combination, qas, pairs)
+                
+                if batch_results:
                     st.rerun()
 
-    if "qas" in st.session_state:
+    if "qas" in session_data:
         st.markdown("### 🧠 Interview Questions & Answers")
-        st.markdown(st.session_state["qas"])
+        if "reused_similarity" in st.session_state:
+            st.info(
+                f"♻️ Reused questions from a {st.session_state['reused_similarity']:.0%} similar job description. "
+                "Untick the reuse option and generate again for a fresh set."
+            )
+        st.markdown(session_data["qas"])
 
     # Answer Evaluation
-    if "qas" in st.session_state:
+    if "qas" in session_data:
         st.markdown("### ✍️ Answer Evaluation")
 
-        question = st.text_input(
-            "Paste the question",
-            key=f"eval_q_{st.session_state['reset_id']}"
-        )
-        user_answer = st.text_area(
-            "Type your answer",
-            height=150,
-            key=f"user_ans_{st.session_state['reset_id']}"
-        )
+        pairs = session_data.get("qa_pairs") or []
+        evaluate_all = len(pairs) > 1 and st.radio(
+            "Evaluation mode",
+            ["One question", "All questions in one request"],
+            horizontal=True,
+            key=f"eval_mode_{st.session_state['reset_id']}"
+        ) != "One question"
+
+        if evaluate_all:
+            answers = [
+                st.text_area(
+                    f"Q{pair['number']}. {pair['question']}",
+                    height=100,
+                    key=f"batch_ans_{pair['number']}_{st.session_state['reset_id']}"
+                )
+                for pair in pairs
+            ]
+        else:
+            custom_question = "✏️ Type my own question"
+            # Label -> question text; structured results also show each question's difficulty tag
+            question_options = {
+                f"Q{pair['number']}. {pair['question']}" + (f" [{pair['difficulty']}]" if pair.get("difficulty") else ""):
+                    pair["question"]
+                for pair in pairs
+            }
+            picked = st.selectbox(
+                "Choose a question",
+                list(question_options) + [custom_question],
+                key=f"eval_pick_{st.session_state['reset_id']}"
+            )
+            if picked == custom_question:
+                question = st.text_input(
+                    "Paste the question",
+                    key=f"eval_q_{st.session_state['reset_id']}"
+                )
+            else:
+                question = question_options[picked]
+            user_answer = st.text_area(
+                "Type your answer",
+                height=150,
+                key=f"user_ans_{st.session_state['reset_id']}"
+            )
 
         can_eval, eval_wait_time = can_make_api_call()
         eval_disabled = not can_eval
 
         if eval_disabled:
-            st.warning(f"⏳ Please wait {eval_wait_time:.1f} more seconds before evaluating.")
-
-        if st.button("Evaluate Answer", disabled=eval_disabled):
+            st.warning(f"⏳ The app is at its request limit. Please wait about {eval_wait_time:.0f} seconds before evaluating.")
+        elif eval_wait_time >= 1:
+            st.caption(f"⏳ Busy: requests are queued, expected wait {eval_wait_time:.0f} seconds.")
+
+        if evaluate_all:
+            if st.button("Evaluate All Answers", disabled=eval_disabled):
+                items = [(pair["question"], answer) for pair, answer in zip(pairs, answers) if answer.strip()]
+                if not items:
+                    st.warning("Please answer at least one question.")
+                else:
+                    with st.spinner(f"Evaluating {len(items)} answers..."):
+                        results = evaluate_all_answers(items)
+                    
+                    sections = []
+                    for (question, user_answer), result in zip(items, results or []):
+                        if result is None:
+                            sections.append(f"#### {question}\n\n⚠️ No evaluation was returned for this answer.")
+                            continue
+                        feedback = render_evaluation(result)
+                        sections.append(f"#### {question}\n\n{feedback}")
+                        if "current_session_id" in st.session_state:
+                            add_evaluation(st.session_state["current_session_id"], question, user_answer, feedback, result)
+                    
+                    if results:
+                        session_data["evaluation"] = "\n\n---\n\n".join(sections)
+                        st.rerun()
+        elif st.button("Evaluate Answer", disabled=eval_disabled):
             if not question.strip() or not user_answer.strip():
                 st.warning("Please provide both question and answer.")
             else:
-                st.session_state["last_api_call"] = time.time()
+                result = None
+                if structured_output:
+                    with st.spinner("Evaluating..."):
+                        result = evaluate_answer_structured(question, user_answer)
+                    feedback = render_evaluation(result) if result else None
+                elif stream_responses:
+                    st.markdown("### 📊 Evaluation Result")
+                    feedback = render_streamed_text(stream_evaluation(question, user_answer), st.empty())
+                else:
+                    with st.spinner("Evaluating..."):
+                        feedback = evaluate_answer(question, user_answer)
                 
-                with st.spinner("Evaluating..."):
-                    feedback = evaluate_answer(question, user_answer)
+                if feedback:
+                    session_data["evaluation"] = feedback
                     
-                    if feedback:
-                        st.session_state["evaluation"] = feedback
-                        
-                        if "current_session_idx" in st.session_state:
-                            evaluation_entry = {
-                                "question": question,
-                                "user_answer": user_answer,
-                                "feedback": feedback
-                            }
-                            st.session_state["conversation_history"][st.session_state["current_session_idx"]]["evaluations"].append(evaluation_entry)
-                        st.rerun()
+                    if "current_session_id" in st.session_state:
+                        add_evaluation(st.session_state["current_session_id"], question, user_answer, feedback, result)
+                    st.rerun()
 
-    if "evaluation" in st.session_state:
+    if "evaluation" in session_data:
         st.markdown("### 📊 Evaluation Result")
-        st.markdown(st.session_state["evaluation"])
+        st.markdown(session_data["evaluation"])
+
+    # Fill in the document summary once the background call finishes
+    resolve_pending_summary()
 
     # Clear Form
     st.divider()
@@ -0,0 +1,416 @@
+"""Offline benchmark for the generation pipeline.
+
+Runs extraction, summary, Q&A generation, evaluation, formatting and both exporters
+against synthetic PDFs and histories, with mock_gemini.MockGeminiClient in place of
+the real API. Reports p50/p95/p99 latency per stage, Gemini calls per minute, cache
+hit ratio and peak RSS. `--startup` instead measures cold import and first-paint
+time in fresh interpreters, and `--search` measures history search latency over a
+large synthetic store against a p95 target.
+
+    python benchmark.py --docs 20 --latency 0.5 --overload-rate 0.05 --json bench.json
+    python benchmark.py --startup 5
+    python benchmark.py --search 100000 --search-target-ms 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import exporters
+import retry_policy
+from history_store import HistoryStore
+from interview_core import (
+    CATEGORIES,
+    DIFFICULTIES,
+    EXPERIENCE_LEVELS,
+    MODEL,
+    InterviewEngine,
+    extract_text_from_pdf,
+    format_qas_output,
+)
+from mock_gemini import MockGeminiClient, make_qas_text
+from prompt_cache import PrefixCache
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from token_meter import TokenMeter
+
+
+# ---------------- Synthetic Inputs ----------------
+def make_pdf(pages, lines_per_page=45, seed=0):
+    """Build a resume-like PDF in memory"""
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Candidate {seed} page {page_num + 1}: built data pipelines in Python, SQL and Spark (item {line})"
+            for line in range(lines_per_page)
+        )
+        page.insert_text((40, 40), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_history(sessions, evaluations_per_session=2, answer_chars=600):
+    qas = format_qas_output(make_qas_text(answer_chars))
+    return [
+        {
+            "timestamp": f"2024-01-01 00:{idx // 60:02d}:{idx % 60:02d}",
+            "job_or_jd": f"Software Engineer {idx}",
+            "document_summary": "**Jane Doe** is a Computer Science graduate. " * 5,
+            "category": CATEGORIES[idx % len(CATEGORIES)],
+            "difficulty": DIFFICULTIES[idx % len(DIFFICULTIES)],
+            "experience_level": EXPERIENCE_LEVELS[idx % len(EXPERIENCE_LEVELS)],
+            "qas": qas,
+            "evaluations": [
+                {"question": "Q1. Describe a situation?", "user_answer": "I would...", "feedback": "Score: 6/10 " * 40}
+                for _ in range(evaluations_per_session)
+            ],
+        }
+        for idx in range(sessions)
+    ]
+
+
+# ---------------- Measurement ----------------
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def timed(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    async def timed_async(self, stage, coro):
+        start = time.perf_counter()
+        result = await coro
+        self.samples[stage].append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        return {stage: describe(samples) for stage, samples in self.samples.items()}
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def describe(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------------- Startup ----------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_MODULES = ("exporters", "history_store", "interview_core", "telemetry", "warmer")
+DEFERRED_MODULES = ("fitz", "fpdf", "google.genai")
+FIRST_PAINT = """
+import time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=120)
+app.secrets["GEMINI_API_KEY"] = "benchmark"
+start = time.perf_counter()
+app.run()
+print(time.perf_counter() - start)
+"""
+
+
+def seconds_in_subprocess(code):
+    """Run `code` in a fresh interpreter and return the seconds it prints last, or None if it fails"""
+    try:
+        result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+        return float(result.stdout.strip().splitlines()[-1])
+    except (subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+
+
+def import_code(modules):
+    imports = "; ".join(f"import {module}" for module in modules)
+    return f"import time; start = time.perf_counter(); {imports}; print(time.perf_counter() - start)"
+
+
+def measure_startup(runs):
+    """Cold import and first-paint latency over `runs` fresh interpreters (None where unavailable)"""
+    probes = {
+        "import_app_modules": import_code(APP_MODULES),
+        "import_deferred_modules": import_code(DEFERRED_MODULES),
+        "first_paint": FIRST_PAINT,
+    }
+    results = {}
+    for name, code in probes.items():
+        samples = [seconds_in_subprocess(code) for _ in range(runs)]
+        results[name] = describe(samples) if None not in samples else None
+    return results
+
+
+def report_startup(runs, json_path=None):
+    results = measure_startup(runs)
+    print(f"{'startup':<26}{'n':>4}{'p50 ms':>11}{'max ms':>11}")
+    for name, stats in results.items():
+        if stats is None:
+            print(f"{name:<26}{'unavailable (missing dependency)':>26}")
+        else:
+            print(f"{name:<26}{stats['count']:>4}{stats['p50_ms']:>11.1f}{stats['max_ms']:>11.1f}")
+    print()
+    print(f"Deferred until first use: {', '.join(DEFERRED_MODULES)}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+# ---------------- Search ----------------
+SEARCH_VOCABULARY = 5000
+SEARCH_QUERIES = {  # label -> vocabulary ranks of the query terms (1 = most frequent word)
+    "common term": (10,),
+    "frequent term": (50,),
+    "typical term": (200,),
+    "rare term": (1000,),
+    "two terms": (100, 500),
+    "three terms": (30, 300, 900),
+}
+
+
+def build_search_history(path, sessions, users, seed=0):
+    """Fill a history store with Zipf-distributed text, spread round-robin over `users` users.
+
+    Word frequencies follow natural text: the rank-10 word is in almost every session,
+    the rank-1000 word in a few percent. Every fourth session carries an evaluation.
+    """
+    rng = random.Random(seed)
+    words = [f"term{rank}" for rank in range(1, SEARCH_VOCABULARY + 1)]
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, SEARCH_VOCABULARY + 1)))
+
+    def text(count):
+        return " ".join(rng.choices(words, cum_weights=weights, k=count))
+
+    store = HistoryStore(path)
+    store._conn.execute("BEGIN")  # one transaction instead of one commit per session
+    for idx in range(sessions):
+        store.add_session(f"user{idx % users}", {
+            "timestamp": f"2024-01-01 00:00:{idx % 60:02d}",
+            "job_or_jd": text(30),
+            "document_summary": text(40),
+            "category": CATEGORIES[idx % len(CATEGORIES)],
+            "difficulty": DIFFICULTIES[idx % len(DIFFICULTIES)],
+            "experience_level": EXPERIENCE_LEVELS[idx % len(EXPERIENCE_LEVELS)],
+            "qas": text(180),
+            "evaluations": [
+                {"question": text(12), "user_answer": text(30), "feedback": text(60)}
+            ] if idx % 4 == 0 else [],
+        })
+    store._conn.execute("COMMIT")
+    return store
+
+
+def measure_search(store, users, repeat=40):
+    """Latency of HistoryStore.search per query class, cycling through the users"""
+    recorder = Recorder()
+    for label, ranks in SEARCH_QUERIES.items():
+        query = " ".join(f"term{rank}" for rank in ranks)
+        for idx in range(repeat):
+            recorder.timed(label, store.search, f"user{idx % users}", query)
+    return recorder.summary()
+
+
+def report_search(sessions, users, target_ms, json_path=None):
+    """Print search latency per query class; exit status 1 if any p95 misses `target_ms`"""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        store = build_search_history(os.path.join(tmp, "history.sqlite3"), sessions, users)
+        print(f"Built {sessions:,} sessions for {users} users in {time.perf_counter() - start:.1f} s")
+        results = measure_search(store, users)
+    print(f"{'query':<16}{'n':>4}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+    for label, stats in results.items():
+        print(f"{label:<16}{stats['count']:>4}{stats['p50_ms']:>11.1f}{stats['p95_ms']:>11.1f}{stats['max_ms']:>11.1f}")
+    slow = [label for label, stats in results.items() if stats["p95_ms"] > target_ms]
+    print()
+    print(f"p95 target {target_ms:g} ms: " + (f"missed by {', '.join(slow)}" if slow else "met by every query"))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"sessions": sessions, "users": users, "target_ms": target_ms, "queries": results}, f, indent=2)
+    return 1 if slow else 0
+
+
+# ---------------- Stages ----------------
+async def run_pipeline(engine, recorder, documents, combinations, concurrency, structured=False):
+    """Summaries, Q&A and evaluations with bounded concurrency, twice over (cold then warm cache)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text, combination):
+        async with semaphore:
+            summary = await recorder.timed_async("summary", engine.summarize(text))
+            if structured:
+                pairs = await recorder.timed_async(
+                    "generate_qas_structured", engine.generate_qas_structured("Data Engineer", summary, *combination)
+                )
+                await recorder.timed_async(
+                    "evaluate_answer_structured", engine.evaluate_answer_structured(pairs[0]["question"], "I would use Spark.")
+                )
+                return
+            qas = await recorder.timed_async("generate_qas", engine.generate_qas("Data Engineer", summary, *combination))
+            await recorder.timed_async("evaluate_answer", engine.evaluate_answer(qas.split("\n", 1)[0], "I would use Spark."))
+
+    for _ in range(2):
+        await asyncio.gather(
+            *(one(text, combination) for text in documents for combination in combinations),
+            return_exceptions=True
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark with a mock Gemini client")
+    parser.add_argument("--docs", type=int, default=10, help="synthetic PDFs")
+    parser.add_argument("--pages", type=int, default=4, help="pages per PDF")
+    parser.add_argument("--combinations", type=int, default=3, help="settings combinations per document")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock call latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--response-chars", type=int, default=2000)
+    parser.add_argument("--structured", action="store_true", help="use JSON mode for Q&A and evaluation")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0, help="fraction of JSON responses cut short")
+    parser.add_argument("--backoff-scale", type=float, default=0.01, help="multiplier for retry waits")
+    parser.add_argument("--outage", action="store_true", help="primary model answers every call with 503")
+    parser.add_argument("--fallback-models", default=",".join(retry_policy.DEFAULT_FALLBACK_MODELS),
+                        help="comma-separated fallback models (empty = none)")
+    parser.add_argument("--prefix-min-tokens", type=int, default=1024, help="smallest prefix to cache as context")
+    parser.add_argument("--rpm", type=int, default=0, help="apply a shared rate limiter (0 = off)")
+    parser.add_argument("--history", type=int, default=200, help="sessions in the synthetic export history")
+    parser.add_argument("--startup", type=int, default=0, metavar="RUNS",
+                        help="only measure cold import and first-paint time over RUNS fresh interpreters")
+    parser.add_argument("--search", type=int, default=0, metavar="SESSIONS",
+                        help="only measure history search over a store with SESSIONS synthetic sessions")
+    parser.add_argument("--search-users", type=int, default=50, help="users the search sessions are spread over")
+    parser.add_argument("--search-target-ms", type=float, default=50, help="p95 search latency to meet")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return report_startup(args.startup, args.json)
+    if args.search:
+        return report_search(args.search, args.search_users, args.search_target_ms, args.json)
+
+    retry_policy.BACKOFF_SCALE = args.backoff_scale
+    recorder = Recorder()
+
+    # Extraction
+    pdfs = [make_pdf(args.pages, seed=idx) for idx in range(args.docs)]
+    documents = [recorder.timed("extract_text_from_pdf", extract_text_from_pdf, data) for data in pdfs]
+
+    # Gemini-backed stages
+    client = MockGeminiClient(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_rate=args.rate_limit_rate,
+        overload_rate=args.overload_rate,
+        response_chars=args.response_chars,
+        invalid_json_rate=args.invalid_json_rate,
+        unavailable_models=[MODEL] if args.outage else [],
+        seed=1
+    )
+    cache = ResponseCache(cache_dir=tempfile.mkdtemp(prefix="qa-bench-"))
+    rate_limiter = RateLimiter(rpm=args.rpm, rpd=10 ** 9, tpm=10 ** 12) if args.rpm else None
+    token_meter = TokenMeter(session_budget=0, process_budget=0)
+    policy = retry_policy.RetryPolicy(
+        fallback_models=[model for model in args.fallback_models.split(",") if model], seed=1
+    )
+    engine = InterviewEngine(
+        client,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        single_flight=SingleFlight(),
+        prefix_cache=PrefixCache(
+            client, MODEL, min_tokens=args.prefix_min_tokens,
+            rate_limiter=rate_limiter, token_meter=token_meter, retry_policy=policy
+        ),
+        token_meter=token_meter,
+        retry_policy=policy
+    )
+    combinations = [
+        (CATEGORIES[idx % len(CATEGORIES)], DIFFICULTIES[idx % len(DIFFICULTIES)], EXPERIENCE_LEVELS[idx % len(EXPERIENCE_LEVELS)])
+        for idx in range(args.combinations)
+    ]
+    start = time.perf_counter()
+    asyncio.run(run_pipeline(engine, recorder, documents, combinations, args.concurrency, args.structured))
+    pipeline_seconds = time.perf_counter() - start
+
+    # Formatting and exports
+    raw_qas = make_qas_text(args.response_chars // 4)
+    for _ in range(200):
+        recorder.timed("format_qas_output", format_qas_output, raw_qas)
+    history = make_history(args.history)
+    for _ in range(3):
+        recorder.timed("export_to_text", exporters.export_to_text, history)
+        recorder.timed("export_to_pdf", exporters.export_to_pdf, history)
+
+    cache_stats = cache.stats()
+    results = {
+        "stages": recorder.summary(),
+        "gemini_calls": client.calls,
+        "injected_errors": client.errors,
+        "calls_per_minute": client.calls / pipeline_seconds * 60 if pipeline_seconds else 0.0,
+        "pipeline_seconds": pipeline_seconds,
+        "cache_hit_ratio": cache_stats["hit_ratio"],
+        "cache_hits": cache_stats["hits"],
+        "cache_misses": cache_stats["misses"],
+        "coalesced_calls": engine.single_flight.stats()["deduplicated"],
+        "context_cached_tokens": engine.prefix_cache.stats()["cached_tokens"],
+        "tokens_by_feature": engine.token_meter.stats()["features"],
+        "calls_by_model": client.calls_by_model,
+        "retry_policy": engine.retry_policy.stats(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(f"{'stage':<24}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<24}{stats['count']:>6}{stats['p50_ms']:>11.1f}{stats['p95_ms']:>11.1f}{stats['p99_ms']:>11.1f}")
+    print()
+    print(f"Gemini calls:      {results['gemini_calls']} ({results['injected_errors']} injected errors)")
+    print(f"Calls per minute:  {results['calls_per_minute']:.1f}")
+    print(f"Cache hit ratio:   {results['cache_hit_ratio']:.1%}")
+    print(f"Coalesced calls:   {results['coalesced_calls']}")
+    print(f"Calls by model:    {results['calls_by_model']}")
+    print(f"Fallbacks:         {results['retry_policy']['fallbacks']} "
+          f"({results['retry_policy']['fast_failures']} failed fast on open circuits)")
+    print(f"Context cached:    {results['context_cached_tokens']:,} input tokens")
+    for feature, counters in sorted(results["tokens_by_feature"].items()):
+        print(f"Tokens ({feature + '):':<12}{counters['input_tokens']:,} in / {counters['output_tokens']:,} out")
+    print(f"Peak RSS:          {results['peak_rss_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""Headless bulk Q&A generation.
+
+Examples:
+    python cli.py resumes/ --job "Data Analyst" --output banks.jsonl
+    python cli.py --manifest candidates.jsonl --output banks.jsonl --concurrency 8
+
+A manifest is a JSONL file with one object per line: "path" (PDF or .txt, optional),
+"job_or_jd", "category", "difficulty" and "experience_level" (the last three fall
+back to the command-line settings). Rerunning with the same --output skips items
+that already succeeded; Gemini responses come from the shared response cache when present,
+and Q&A sets are reused for near-identical job texts (see QA_SIMILARITY_THRESHOLD).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from interview_core import (
+    CATEGORIES,
+    DIFFICULTIES,
+    EXPERIENCE_LEVELS,
+    MODEL,
+    STRUCTURED_OUTPUT,
+    InterviewEngine,
+    build_qas_prompt,
+    build_structured_qas_prompt,
+    build_summary_prompt,
+    create_client,
+    extract_text_from_pdf,
+    parse_qas,
+    render_qas,
+)
+from prompt_cache import PrefixCache
+from rate_limiter import DEFAULT_RPD, DEFAULT_RPM, DEFAULT_TPM, RateLimiter
+from response_cache import ResponseCache
+from retry_policy import RetryPolicy
+from similarity_cache import SimilarityIndex
+from single_flight import SingleFlight
+from telemetry import registry
+from token_meter import TokenMeter
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+# ---------------- Work Items ----------------
+def load_items(args):
+    """Build work items from a manifest or a directory of documents"""
+    defaults = {
+        "job_or_jd": args.job or "",
+        "category": args.category,
+        "difficulty": args.difficulty,
+        "experience_level": args.experience_level,
+    }
+    items = []
+    if args.manifest:
+        base_dir = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = {**defaults, "path": None, **json.loads(line)}
+                if item["path"] and not os.path.isabs(item["path"]):
+                    item["path"] = os.path.join(base_dir, item["path"])
+                items.append(item)
+    else:
+        for name in sorted(os.listdir(args.input)):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                items.append({**defaults, "path": os.path.join(args.input, name)})
+
+    for item in items:
+        item["id"] = get_item_id(item)
+    return items
+
+
+def get_item_id(item):
+    """Stable id from the document bytes and settings, used for resuming"""
+    digest = hashlib.blake2b(digest_size=16)
+    if item.get("path"):
+        with open(item["path"], "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+    for field in ("job_or_jd", "category", "difficulty", "experience_level"):
+        digest.update(b"\0" + str(item.get(field, "")).encode())
+    return digest.hexdigest()
+
+
+def load_completed_ids(output_path):
+    """Ids of items that already succeeded in a previous run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial line from an interrupted run
+            if "qas" in record:
+                completed.add(record["id"])
+    return completed
+
+
+def read_document(path):
+    if path.lower().endswith(".pdf"):
+        with open(path, "rb") as f:
+            return extract_text_from_pdf(f.read())
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+# ---------------- Processing ----------------
+async def process_item(engine, item, structured=False):
+    """Summarize the document (if any) and generate the Q&A set for one item"""
+    summary_text = ""
+    cached = True
+    if item.get("path"):
+        document_text = await asyncio.to_thread(read_document, item["path"])
+        _, summary_key = build_summary_prompt(document_text)
+        cached = engine.is_cached(summary_key)
+        summary_text = await engine.summarize(document_text) or ""
+
+    settings = (item["category"], item["difficulty"], item["experience_level"])
+    build_prompt = build_structured_qas_prompt if structured else build_qas_prompt
+    _, qas_key = build_prompt(item["job_or_jd"], summary_text, *settings)
+    cached = cached and engine.is_cached(qas_key)
+    if structured:
+        pairs = await engine.generate_qas_structured(item["job_or_jd"], summary_text, *settings)
+        qas = render_qas(pairs)
+    else:
+        qas = await engine.generate_qas(item["job_or_jd"], summary_text, *settings)
+        pairs = parse_qas(qas)
+
+    return {
+        "id": item["id"],
+        "source": item.get("path"),
+        "job_or_jd": item["job_or_jd"],
+        "document_summary": summary_text,
+        "category": item["category"],
+        "difficulty": item["difficulty"],
+        "experience_level": item["experience_level"],
+        "qas": qas,
+        "pairs": pairs,
+        "cached": cached,
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+async def run(engine, items, output_path, concurrency, structured=False):
+    """Process items with bounded parallelism, appending one JSON line per item"""
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+    failed = 0
+    start = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def worker(item):
+            nonlocal done, failed
+            async with semaphore:
+                try:
+                    record = await process_item(engine, item, structured)
+                    status = "cached" if record["cached"] else "ok"
+                except Exception as e:
+                    record = {"id": item["id"], "source": item.get("path"), "error": str(e)}
+                    status = f"error: {e}"
+                    failed += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            done += 1
+            name = os.path.basename(item["path"]) if item.get("path") else item["job_or_jd"][:40]
+            print(f"[{done}/{len(items)}] {name} {status} ({time.monotonic() - start:.0f}s)", file=sys.stderr)
+
+        await asyncio.gather(*(worker(item) for item in items))
+
+    return failed
+
+
+# ---------------- Entry Point ----------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate interview Q&A banks without the web UI")
+    parser.add_argument("input", nargs="?", help="directory of resumes/JDs (.pdf or .txt)")
+    parser.add_argument("--manifest", help="JSONL manifest of items instead of a directory")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to")
+    parser.add_argument("--job", help="job role or JD applied to every document")
+    parser.add_argument("--category", choices=CATEGORIES, default=CATEGORIES[0])
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default=DIFFICULTIES[1])
+    parser.add_argument("--experience-level", choices=EXPERIENCE_LEVELS, default=EXPERIENCE_LEVELS[0])
+    parser.add_argument("--concurrency", type=int, default=4, help="items processed at once")
+    parser.add_argument("--api-key", help="Gemini API key (default: GEMINI_API_KEY)")
+    parser.add_argument("--metrics", help="write token counters and, with QA_TELEMETRY=1, stage timings "
+                                          "(Prometheus text) to this file")
+    parser.add_argument("--structured", action="store_true", default=STRUCTURED_OUTPUT,
+                        help="request schema-validated JSON (default: QA_STRUCTURED_OUTPUT)")
+    args = parser.parse_args(argv)
+    if not args.input and not args.manifest:
+        parser.error("provide an input directory or --manifest")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    items = load_items(args)
+    completed = load_completed_ids(args.output)
+    pending = [item for item in items if item["id"] not in completed]
+    print(f"{len(items)} items, {len(items) - len(pending)} already done, {len(pending)} to process", file=sys.stderr)
+    if not pending:
+        return 0
+
+    client = create_client(args.api_key)
+    rate_limiter = RateLimiter(
+        rpm=int(os.environ.get("QA_RPM", DEFAULT_RPM)),
+        rpd=int(os.environ.get("QA_RPD", DEFAULT_RPD)),
+        tpm=int(os.environ.get("QA_TPM", DEFAULT_TPM))
+    )
+    token_meter = TokenMeter()
+    retry_policy = RetryPolicy()
+    engine = InterviewEngine(
+        client,
+        cache=ResponseCache(),
+        rate_limiter=rate_limiter,
+        single_flight=SingleFlight(),
+        similarity_index=SimilarityIndex(),
+        prefix_cache=PrefixCache(
+            client, MODEL, rate_limiter=rate_limiter, token_meter=token_meter, retry_policy=retry_policy
+        ),
+        token_meter=token_meter,
+        retry_policy=retry_policy
+    )
+    failed = asyncio.run(run(engine, pending, args.output, max(1, args.concurrency), args.structured))
+    token_stats = engine.token_meter.stats()
+    for feature, counters in sorted(token_stats["features"].items()):
+        print(
+            f"{feature}: {counters['requests']} requests, {counters['input_tokens']:,} input / "
+            f"{counters['output_tokens']:,} output tokens",
+            file=sys.stderr
+        )
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(engine.token_meter.metrics_text() + registry.metrics_text())
+    prefix_stats = engine.prefix_cache.stats()
+    if prefix_stats["cached_tokens"]:
+        print(
+            f"Context cache: {prefix_stats['cached_tokens']:,} of {prefix_stats['prompt_tokens']:,} "
+            f"input tokens served from cache ({prefix_stats['saved_ratio']:.0%})",
+            file=sys.stderr
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+
+# ---------------- Export Functions ----------------
+def render_text_header():
+    """Title block of the text export"""
+    return (
+        "=" * 80 + "\n"
+        "INTERVIEW Q&A SESSION HISTORY\n"
+        f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        + "=" * 80 + "\n\n"
+    )
+
+def render_text_session(idx, entry):
+    """Text export fragment for one history entry"""
+    parts = [
+        f"\n{'=' * 80}\n",
+        f"SESSION {idx}\n",
+        f"Timestamp: {entry['timestamp']}\n",
+        f"{'=' * 80}\n\n",
+        f"JOB ROLE/JD:\n{entry['job_or_jd']}\n\n",
+    ]
+    
+    if entry.get('document_summary'):
+        parts.append(f"DOCUMENT SUMMARY:\n{entry['document_summary']}\n\n")
+    
+    parts += [
+        "SETTINGS:\n",
+        f"- Category: {entry['category']}\n",
+        f"- Difficulty: {entry['difficulty']}\n",
+        f"- Experience Level: {entry['experience_level']}\n\n",
+        f"GENERATED Q&A:\n{entry['qas']}\n\n",
+    ]
+    
+    if entry.get('evaluations'):
+        parts.append("ANSWER EVALUATIONS:\n")
+        for eval_idx, evaluation in enumerate(entry['evaluations'], 1):
+            parts += [
+                f"\nEvaluation {eval_idx}:\n",
+                f"Question: {evaluation['question']}\n",
+                f"User Answer: {evaluation['user_answer']}\n",
+                f"Feedback:\n{evaluation['feedback']}\n\n",
+            ]
+    
+    return "".join(parts)
+
+def render_jsonl_session(idx, entry):
+    """One JSON line per history entry"""
+    return json.dumps({"session": idx, **entry}, ensure_ascii=False) + "\n"
+
+CSV_COLUMNS = [
+    "session", "timestamp", "category", "difficulty", "experience_level",
+    "job_or_jd", "document_summary", "qas", "evaluation_count", "evaluations",
+]
+
+def render_csv_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def render_csv_header():
+    return render_csv_row(CSV_COLUMNS)
+
+def render_csv_session(idx, entry):
+    """One CSV row per history entry; evaluations are embedded as JSON"""
+    evaluations = entry.get('evaluations') or []
+    return render_csv_row([
+        idx,
+        entry['timestamp'],
+        entry['category'],
+        entry['difficulty'],
+        entry['experience_level'],
+        entry['job_or_jd'],
+        entry.get('document_summary', ''),
+        entry['qas'],
+        len(evaluations),
+        json.dumps(evaluations, ensure_ascii=False),
+    ])
+
+# format -> (header renderer, per-session renderer)
+STREAMING_FORMATS = {
+    "txt": (render_text_header, render_text_session),
+    "jsonl": (lambda: "", render_jsonl_session),
+    "csv": (render_csv_header, render_csv_session),
+}
+
+def iter_export(history, fmt="txt"):
+    """Yield an export chunk by chunk; memory is bounded by the largest session"""
+    render_header, render_session = STREAMING_FORMATS[fmt]
+    header = render_header()
+    if header:
+        yield header
+    for idx, entry in enumerate(history, 1):
+        yield render_session(idx, entry)
+
+def export_to_text(history):
+    """Export conversation history to text format"""
+    if not history:
+        return None
+    
+    return "".join(iter_export(history, "txt"))
+
+def export_to_jsonl(history):
+    if not history:
+        return None
+    return "".join(iter_export(history, "jsonl"))
+
+def export_to_csv(history):
+    if not history:
+        return None
+    return "".join(iter_export(history, "csv"))
+
+def build_pdf(history):
+    """Lay out the history as an FPDF document"""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    
+    def clean_text(text):
+        if not isinstance(text, str):
+            return str(text)
+        replacements = {
+            '\u2013': '-',
+            '\u2014': '-',
+            '\u2018': "'",
+            '\u2019': "'",
+            '\u201c': '"',
+            '\u201d': '"',
+            '\u2022': '*',
+        }
+        for char, replacement in replacements.items():
+            text = text.replace(char, replacement)
+        return text
+
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 20)
+    pdf.cell(0, 10, "Interview Q&A Session History", ln=True, align="C")
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align="C")
+    pdf.ln(10)
+    
+    for idx, entry in enumerate(history, 1):
+        pdf.add_page()
+        
+        pdf.set_font("Arial", "B", 16)
+        pdf.cell(0, 10, f"Session {idx}", ln=True)
+        pdf.set_font("Arial", "", 10)
+        pdf.cell(0, 8, f"Timestamp: {entry['timestamp']}", ln=True)
+        pdf.ln(5)
+        
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 8, "Job Role/JD:", ln=True)
+        pdf.set_font("Arial", "", 10)
+        pdf.multi_cell(0, 6, clean_text(entry['job_or_jd']))
+        pdf.ln(3)
+        
+        if entry.get('document_summary'):
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(0, 8, "Document Summary:", ln=True)
+            pdf.set_font("Arial", "", 10)
+            pdf.multi_cell(0, 6, clean_text(entry['document_summary']))
+            pdf.ln(3)
+        
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 8, "Settings:", ln=True)
+        pdf.set_font("Arial", "", 10)
+        pdf.cell(0, 6, clean_text(f"Category: {entry['category']}, Difficulty: {entry['difficulty']}, Experience: {entry['experience_level']}"), ln=True)
+        pdf.ln(3)
+        
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 8, "Generated Q&A:", ln=True)
+        pdf.set_font("Arial", "", 10)
+        pdf.multi_cell(0, 6, clean_text(entry['qas']))
+        pdf.ln(3)
+        
+        if entry.get('evaluations'):
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(0, 8, "Answer Evaluations:", ln=True)
+            for eval_idx, evaluation in enumerate(entry['evaluations'], 1):
+                pdf.set_font("Arial", "B", 10)
+                pdf.cell(0, 6, f"Evaluation {eval_idx}:", ln=True)
+                pdf.set_font("Arial", "", 10)
+                pdf.multi_cell(0, 5, clean_text(f"Question: {evaluation['question']}"))
+                pdf.multi_cell(0, 5, clean_text(f"User Answer: {evaluation['user_answer']}"))
+                pdf.multi_cell(0, 5, clean_text(f"Feedback: {evaluation['feedback']}"))
+                pdf.ln(2)
+    
+    return pdf
+
+def export_to_pdf(history):
+    """Export conversation history to PDF format with encoding safety"""
+    if not history:
+        return None
+    
+    return build_pdf(history).output(dest='S').encode('latin-1', errors='replace')
+
+# ---------------- File Export ----------------
+def write_export(history, path, fmt="txt"):
+    """Stream an export straight to a file without building it in memory first"""
+    if fmt == "pdf":
+        # FPDF writes its page buffer directly, skipping the intermediate byte string
+        build_pdf(history).output(path, 'F')
+        return path
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for chunk in iter_export(history, fmt):
+            f.write(chunk)
+    return path
+
+def export_to_tempfile(history, fmt="txt"):
+    """Write an export to a named temporary file and return its path"""
+    fd, path = tempfile.mkstemp(prefix="interview_history_", suffix=f".{fmt}")
+    os.close(fd)
+    return write_export(history, path, fmt)
+
+def export_bytes(history, fmt="txt"):
+    """Contents of an export built in a temporary file (for deferred downloads); the file is removed"""
+    path = export_to_tempfile(history, fmt)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
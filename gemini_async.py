@@ -0,0 +1,139 @@
+import asyncio
+import threading
+
+from rate_limiter import estimate_tokens
+from retry_policy import RetryPolicy, classify_error
+from telemetry import incr, span
+from token_meter import TokenBudgetExceeded
+
+# ---------------- Async Gemini Call ----------------
+async def generate_content_async(client, model, prompt, config=None):
+    """Use the client's native async surface when present, else run the sync call in a thread"""
+    contents = [{"text": prompt}]
+    aio = getattr(client, "aio", None)
+    if aio is not None:
+        return await aio.models.generate_content(model=model, contents=contents, config=config)
+    return await asyncio.to_thread(client.models.generate_content, model=model, contents=contents, config=config)
+
+async def generate_with_retry_async(client, model, prompt, max_retries=4, on_retry=None,
+                                    rate_limiter=None, session_id=None, config=None,
+                                    prefix=None, prefix_cache=None, token_meter=None, feature=None,
+                                    retry_policy=None):
+    """Retry loop for one prompt; waits yield to the event loop instead of blocking.
+
+    `retry_policy` (a process-wide retry_policy.RetryPolicy) picks the model for each
+    attempt, falling back past overloaded models and open circuits, and sets the wait
+    between attempts. Without one, only `model` is used and no failures are remembered.
+    With a `prefix_cache`, a `prompt` starting with `prefix` is sent as the remainder
+    plus a cached-content handle for the prefix. With a `token_meter`, each attempt is
+    checked against the token budgets and each response is metered under `feature`.
+    Budget, open-circuit and invalid-request errors are raised without retrying.
+    """
+    policy = retry_policy or RetryPolicy(fallback_models=())
+    avoid = set()
+    wait_time = 0.0
+    for attempt in range(max_retries):
+        attempt_model = policy.select(model, avoid)
+        text, request_config = prompt, config
+        try:
+            # Cached-content handles belong to one model, so a fallback gets the full prompt
+            if prefix_cache is not None and attempt_model == prefix_cache.model:
+                text, request_config = await asyncio.to_thread(prefix_cache.request, prompt, prefix, config, session_id)
+            if token_meter is not None:
+                token_meter.check(session_id, estimate_tokens(text))
+            if rate_limiter is not None:
+                with span("rate_limit_wait"):
+                    await asyncio.to_thread(rate_limiter.acquire, session_id, estimate_tokens(text))
+            with span("gemini_attempt", model=attempt_model, feature=feature or "other"):
+                response = await generate_content_async(client, attempt_model, text, request_config)
+            policy.record_success(attempt_model)
+            if prefix_cache is not None:
+                prefix_cache.record(response)
+            if token_meter is not None:
+                token_meter.record(session_id, feature, response, text)
+            return response.text
+        except TokenBudgetExceeded:
+            policy.breaker(attempt_model).release()
+            raise
+        except Exception as e:
+            kind = classify_error(e)
+            incr("qa_gemini_errors_total", kind=kind, model=attempt_model)
+            policy.record_failure(attempt_model, kind)
+            uses_handle = text is not prompt
+            if uses_handle and kind in ("fatal", "other"):
+                prefix_cache.invalidate(prefix)  # handle expired or deleted early: register again
+            elif kind == "fatal":
+                raise
+            if attempt == max_retries - 1:
+                raise
+            if kind in ("overloaded", "rate_limit"):
+                avoid.add(attempt_model)
+            wait_time = policy.backoff(kind, wait_time, e, switching=policy.can_switch(model, avoid))
+            if on_retry:
+                on_retry(kind, attempt, wait_time, e)
+            incr("qa_retries_total", kind=kind)
+            with span("retry_wait", kind=kind):
+                await asyncio.sleep(wait_time)
+
+    return None
+
+async def call_gemini_async(client, model, prompt, max_retries=4, cache=None, cache_key=None,
+                            on_retry=None, rate_limiter=None, session_id=None, single_flight=None,
+                            config=None, prefix=None, prefix_cache=None, token_meter=None, feature=None,
+                            retry_policy=None):
+    """Async counterpart of call_gemini_with_retry.
+
+    `client` may be a genai.Client or any stub exposing `models.generate_content`
+    (and optionally `aio.models.generate_content`). `on_retry(kind, attempt, wait, error)`
+    is called from the event loop thread, so it must not touch Streamlit elements.
+    When a `rate_limiter` is given, every attempt waits for a slot in its budget; with a
+    `single_flight` group, concurrent calls for the same cache key share one request.
+    `config` is passed through as the GenerateContentConfig (for example a JSON schema);
+    `prefix`/`prefix_cache` enable context caching (see prompt_cache.PrefixCache), and
+    `token_meter`/`feature` budget and meter the call (see token_meter.TokenMeter), and
+    `retry_policy` adds circuit breaking and model fallback (see retry_policy.RetryPolicy).
+    """
+    if cache is not None and cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    async def fetch():
+        result = await generate_with_retry_async(
+            client, model, prompt, max_retries, on_retry, rate_limiter, session_id, config,
+            prefix, prefix_cache, token_meter, feature, retry_policy
+        )
+        # Cache before releasing the in-flight key so late arrivals hit the cache
+        if cache is not None and cache_key:
+            cache.set(cache_key, result)
+        return result
+
+    if single_flight is not None and cache_key:
+        result, _ = await single_flight.do_async(cache_key, fetch)
+        return result
+    return await fetch()
+
+# ---------------- Background Event Loop ----------------
+class AsyncRunner:
+    """Event loop on a daemon thread so the Streamlit script thread never waits on retries"""
+
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="gemini-async", daemon=True)
+        self._thread.start()
+
+    async def _bounded(self, coro):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await coro
+
+    def submit(self, coro):
+        """Schedule a coroutine and return a concurrent.futures.Future for its result"""
+        return asyncio.run_coroutine_threadsafe(self._bounded(coro), self.loop)
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
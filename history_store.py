@@ -0,0 +1,325 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from response_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_HISTORY_DB = os.environ.get("QA_HISTORY_DB", os.path.join(DEFAULT_CACHE_DIR, "history.sqlite3"))
+
+SUMMARY_COLUMNS = ("id", "timestamp", "category", "difficulty", "experience_level")
+FILTER_COLUMNS = ("category", "difficulty", "experience_level")
+# Left out of searches: they match almost every row, and ranking pays for each row they match
+SEARCH_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it my of on or that the this to was what when where which with you".split()
+)
+
+
+# ---------------- Session History Store ----------------
+class HistoryStore:
+    """SQLite-backed per-user session history.
+
+    Listings return only the indexed summary columns; full entries (JD, summary,
+    Q&A and evaluations) are fetched by id when a session is loaded or exported.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_DB):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                job_or_jd TEXT NOT NULL,
+                document_summary TEXT,
+                category TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                experience_level TEXT NOT NULL,
+                qas TEXT NOT NULL,
+                pairs TEXT
+            );
+            CREATE TABLE IF NOT EXISTS evaluations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+                user_id TEXT,
+                question TEXT NOT NULL,
+                user_answer TEXT NOT NULL,
+                feedback TEXT NOT NULL,
+                result TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_time ON sessions(user_id, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_category ON sessions(user_id, category, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_difficulty ON sessions(user_id, difficulty, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_experience ON sessions(user_id, experience_level, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_session ON evaluations(session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions(timestamp);
+        """)
+        self._migrate()
+        self._create_search_index()
+
+    def _migrate(self):
+        # Stores created before sessions kept parsed Q&A pairs (older rows keep NULL)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "pairs" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN pairs TEXT")
+        # Stores created before evaluations kept structured (JSON-mode) results
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(evaluations)")}
+        if "result" not in columns:
+            self._conn.execute("ALTER TABLE evaluations ADD COLUMN result TEXT")
+        # Stores created before evaluations carried their owner's user id
+        if "user_id" not in columns:
+            self._conn.execute("ALTER TABLE evaluations ADD COLUMN user_id TEXT")
+            self._conn.execute(
+                "UPDATE evaluations SET user_id = (SELECT user_id FROM sessions WHERE sessions.id = evaluations.session_id)"
+            )
+
+    def _create_search_index(self):
+        """FTS5 indexes over session and evaluation text, kept current by triggers"""
+        existing = {
+            row[0] for row in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE name IN ('sessions_fts', 'evaluations_fts')"
+            )
+        }
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                user_id, job_or_jd, document_summary, qas,
+                content='sessions', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS evaluations_fts USING fts5(
+                user_id, question, feedback,
+                content='evaluations', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+                INSERT INTO sessions_fts(rowid, user_id, job_or_jd, document_summary, qas)
+                VALUES (new.id, new.user_id, new.job_or_jd, new.document_summary, new.qas);
+            END;
+            CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+                INSERT INTO sessions_fts(sessions_fts, rowid, user_id, job_or_jd, document_summary, qas)
+                VALUES ('delete', old.id, old.user_id, old.job_or_jd, old.document_summary, old.qas);
+            END;
+            CREATE TRIGGER IF NOT EXISTS evaluations_fts_insert AFTER INSERT ON evaluations BEGIN
+                INSERT INTO evaluations_fts(rowid, user_id, question, feedback)
+                VALUES (new.id, new.user_id, new.question, new.feedback);
+            END;
+            CREATE TRIGGER IF NOT EXISTS evaluations_fts_delete AFTER DELETE ON evaluations BEGIN
+                INSERT INTO evaluations_fts(evaluations_fts, rowid, user_id, question, feedback)
+                VALUES ('delete', old.id, old.user_id, old.question, old.feedback);
+            END;
+        """)
+        # Databases created before search existed: index what is already stored
+        if "sessions_fts" not in existing:
+            self._conn.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild')")
+        if "evaluations_fts" not in existing:
+            self._conn.execute("INSERT INTO evaluations_fts(evaluations_fts) VALUES ('rebuild')")
+
+    def _where(self, user_id, filters):
+        clauses = ["user_id = ?"]
+        params = [user_id]
+        for column in FILTER_COLUMNS:
+            value = (filters or {}).get(column)
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    # ---------------- Writes ----------------
+    def add_session(self, user_id, entry):
+        """Store a history entry (and any evaluations it carries); returns its id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                """INSERT INTO sessions (user_id, timestamp, job_or_jd, document_summary,
+                                         category, difficulty, experience_level, qas, pairs)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, entry["timestamp"], entry["job_or_jd"], entry.get("document_summary", ""),
+                 entry["category"], entry["difficulty"], entry["experience_level"], entry["qas"],
+                 json.dumps(entry["pairs"], ensure_ascii=False) if entry.get("pairs") else None)
+            )
+            session_id = cursor.lastrowid
+        for evaluation in entry.get("evaluations") or []:
+            self.add_evaluation(user_id, session_id, evaluation)
+        return session_id
+
+    def add_evaluation(self, user_id, session_id, evaluation):
+        with self._lock:
+            owned = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE id = ? AND user_id = ?", (session_id, user_id)
+            ).fetchone()
+            if owned is None:
+                raise KeyError(f"Session {session_id} not found")
+            cursor = self._conn.execute(
+                """INSERT INTO evaluations (session_id, user_id, question, user_answer, feedback, result, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (session_id, user_id, evaluation["question"], evaluation["user_answer"], evaluation["feedback"],
+                 json.dumps(evaluation["result"], ensure_ascii=False) if evaluation.get("result") else None,
+                 time.time())
+            )
+            return cursor.lastrowid
+
+    def clear(self, user_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    # ---------------- Reads ----------------
+    def count_sessions(self, user_id, filters=None):
+        where, params = self._where(user_id, filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM sessions WHERE {where}", params).fetchone()[0]
+
+    def count_evaluations(self, user_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM evaluations e JOIN sessions s ON s.id = e.session_id WHERE s.user_id = ?",
+                (user_id,)
+            ).fetchone()[0]
+
+    def list_sessions(self, user_id, limit=10, offset=0, filters=None, newest_first=True):
+        """One page of session summaries (id, timestamp and settings only)"""
+        where, params = self._where(user_id, filters)
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM sessions WHERE {where} "
+                f"ORDER BY timestamp {order}, id {order} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _evaluations(self, session_id):
+        rows = self._conn.execute(
+            "SELECT question, user_answer, feedback, result FROM evaluations WHERE session_id = ? ORDER BY id",
+            (session_id,)
+        ).fetchall()
+        evaluations = []
+        for row in rows:
+            evaluation = dict(row)
+            evaluation["result"] = json.loads(evaluation["result"]) if evaluation["result"] else None
+            evaluations.append(evaluation)
+        return evaluations
+
+    def _entry(self, row):
+        entry = dict(row)
+        del entry["user_id"]
+        entry["pairs"] = json.loads(entry["pairs"]) if entry["pairs"] else []
+        entry["evaluations"] = self._evaluations(entry["id"])
+        return entry
+
+    def get_session(self, user_id, session_id):
+        """Full entry with parsed Q&A pairs and evaluations, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sessions WHERE id = ? AND user_id = ?", (session_id, user_id)
+            ).fetchone()
+            return None if row is None else self._entry(row)
+
+    def iter_sessions(self, user_id, batch_size=50):
+        """Yield full entries oldest first, holding at most one batch in memory"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM sessions WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (user_id, last_id, batch_size)
+                ).fetchall()
+                entries = [self._entry(row) for row in rows]
+            if not entries:
+                return
+            yield from entries
+            last_id = entries[-1]["id"]
+
+    # ---------------- Full-text Search ----------------
+    # FTS table, its searched columns, and the joins from a hit to the session that owns it
+    SEARCH_INDEXES = (
+        ("sessions_fts", "job_or_jd document_summary qas",
+         "JOIN sessions s ON s.id = sessions_fts.rowid"),
+        ("evaluations_fts", "question feedback",
+         "JOIN evaluations e ON e.id = evaluations_fts.rowid JOIN sessions s ON s.id = e.session_id"),
+    )
+
+    @staticmethod
+    def _quote(term):
+        return '"' + term.replace('"', '""') + '"'
+
+    def _match_expression(self, query):
+        # Quote every term so user input cannot break FTS syntax; each goes through the
+        # stemmer, so "partitioning" also finds "partitioned". Stopwords are dropped
+        # unless the query has nothing else.
+        terms = query.split()
+        terms = [term for term in terms if term.lower() not in SEARCH_STOPWORDS] or terms
+        return " AND ".join(self._quote(term) for term in terms)
+
+    def _ranked_hits(self, table, columns, joins, user_id, expression, limit):
+        """This user's best `limit` matches in one FTS table, with a highlighted snippet"""
+        columns_sql = ", ".join("s." + column for column in SUMMARY_COLUMNS)
+        text_match = f"{{{columns}}} : ({expression})"
+        # The user id token lets FTS5 skip other users' rows; the exact s.user_id check
+        # drops rows whose id only tokenizes the same ("abc" and "abc-def")
+        rows = self._conn.execute(
+            f"""SELECT {table}.rowid AS hit_id, {columns_sql}, {table}.rank AS score
+                FROM {table} {joins}
+                WHERE {table} MATCH ? AND s.user_id = ?
+                ORDER BY score LIMIT ?""",
+            (f"user_id : {self._quote(user_id)} AND {text_match}", user_id, limit)
+        ).fetchall()
+        hits = []
+        for row in rows:
+            # Snippets for the rows kept only, not for every ranked match
+            hit = dict(row)
+            hit["snippet"] = self._conn.execute(
+                f"SELECT snippet({table}, -1, '**', '**', '…', 12) FROM {table} WHERE {table} MATCH ? AND rowid = ?",
+                (text_match, hit.pop("hit_id"))
+            ).fetchone()[0]
+            hits.append(hit)
+        return hits
+
+    def search(self, user_id, query, limit=10):
+        """Ranked sessions matching `query` in the JD, summary, Q&A or evaluations.
+
+        Returns session summaries plus a highlighted `snippet`, best match first.
+        """
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            hits = [
+                hit
+                for table, columns, joins in self.SEARCH_INDEXES
+                for hit in self._ranked_hits(table, columns, joins, user_id, expression, limit)
+            ]
+        best = {}
+        for hit in hits:
+            current = best.get(hit["id"])
+            if current is None or hit["score"] < current["score"]:
+                best[hit["id"]] = hit
+        return sorted(best.values(), key=lambda hit: hit["score"])[:limit]
+
+    # ---------------- Request Statistics ----------------
+    def popular_requests(self, since, limit=5, min_users=3):
+        """Job roles requested without a document by at least `min_users` users since `since`.
+
+        Requests with a document summary are left out: the summary is one user's
+        resume, so its questions are never shared. `since` is a timestamp string in
+        the stored format. Returns dicts with `job_or_jd`, `document_summary` (always
+        empty), `requests` and `users`, most widely requested first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT job_or_jd, '' AS document_summary,
+                          COUNT(*) AS requests, COUNT(DISTINCT user_id) AS users
+                   FROM sessions
+                   WHERE timestamp >= ? AND COALESCE(document_summary, '') = ''
+                   GROUP BY job_or_jd
+                   HAVING COUNT(DISTINCT user_id) >= ?
+                   ORDER BY users DESC, requests DESC LIMIT ?""",
+                (since, min_users, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
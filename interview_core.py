@@ -0,0 +1,736 @@
+"""Streamlit-free core of the Interview Q&A Generator.
+
+Prompt building, cache keys, PDF extraction, response formatting and an async
+generation engine, shared by the Streamlit app (app.py) and the headless CLI (cli.py).
+"""
+import hashlib
+import os
+import re
+import threading
+
+import pdf_extract
+from gemini_async import call_gemini_async
+from structured_output import call_json_async, dumps, loads
+from telemetry import traced
+from token_meter import CHARS_PER_TOKEN, DOCUMENT_MAX_TOKENS, truncate_to_tokens
+
+MODEL = "gemini-2.5-flash"
+
+# ---------------- Interview Settings ----------------
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+CATEGORIES = ["Technical", "Behavioral", "Situational", "Domain-specific"]
+EXPERIENCE_LEVELS = ["Fresher", "Mid-level", "Senior"]
+BATCH_MAX_COMBINATIONS = int(os.environ.get("QA_BATCH_MAX_COMBINATIONS", 6))
+STRUCTURED_OUTPUT = os.environ.get("QA_STRUCTURED_OUTPUT", "").lower() in ("1", "true", "yes", "on")
+
+# ---------------- Response Schemas ----------------
+SCORE = {"type": "integer", "minimum": 0, "maximum": 10}
+
+QAS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "answer": {"type": "string"},
+                    "difficulty": {"type": "string", "enum": DIFFICULTIES},
+                },
+                "required": ["question", "answer", "difficulty"],
+            },
+        },
+    },
+    "required": ["questions"],
+}
+
+BATCH_QAS_SCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {
+        "type": "object",
+        "properties": {
+            "category": {"type": "string"},
+            "difficulty": {"type": "string"},
+            "experience_level": {"type": "string"},
+            "questions": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {"question": {"type": "string"}, "answer": {"type": "string"}},
+                    "required": ["question", "answer"],
+                },
+            },
+        },
+        "required": ["category", "difficulty", "experience_level", "questions"],
+    },
+}
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "completeness": SCORE,
+        "accuracy": SCORE,
+        "clarity": SCORE,
+        "overall": SCORE,
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "improved_answer": {"type": "string"},
+    },
+    "required": ["completeness", "accuracy", "clarity", "overall", "strengths", "improvements", "improved_answer"],
+}
+
+# ---------------- Cache Keys ----------------
+def get_cache_key(text):
+    """Generate cache key for API responses"""
+    return hashlib.md5(text.encode()).hexdigest()
+
+def get_content_hash(uploaded_file, chunk_size=64 * 1024):
+    """Hash uploaded file bytes in chunks (BLAKE2b) without holding a second copy"""
+    digest = hashlib.blake2b(digest_size=20)
+    uploaded_file.seek(0)
+    for chunk in iter(lambda: uploaded_file.read(chunk_size), b""):
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+def normalize_document_text(text):
+    """Collapse whitespace and case so re-exports of the same document match"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def get_summary_cache_key(document_text):
+    """Cache key for a document summary, based on the normalized text"""
+    normalized = normalize_document_text(document_text)
+    return "summary_" + hashlib.blake2b(normalized.encode(), digest_size=20).hexdigest()
+
+def get_qas_cache_key(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Exact-match cache key for a Q&A set"""
+    return get_cache_key(f"qas_v3_{job_or_jd}_{summary_text}_{category}_{difficulty}_{experience_level}")
+
+def get_evaluation_cache_key(question, user_answer, structured=False):
+    """Cache key for an evaluation, insensitive to case and whitespace in the question and answer"""
+    normalized = normalize_document_text(question) + "\0" + normalize_document_text(user_answer)
+    prefix = "evaluation_json_v1_" if structured else "evaluation_v1_"
+    return prefix + hashlib.blake2b(normalized.encode(), digest_size=20).hexdigest()
+
+def get_similarity_scope(summary_text, category, difficulty, experience_level):
+    """Partition for near-duplicate lookups: only the job text may differ, the resume and settings must match"""
+    settings = "\0".join((normalize_document_text(summary_text or ""), category, difficulty, experience_level))
+    return hashlib.blake2b(settings.encode(), digest_size=16).hexdigest()
+
+BATCH_EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "evaluations": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {"index": {"type": "integer", "minimum": 1}, **EVALUATION_SCHEMA["properties"]},
+                "required": ["index"] + EVALUATION_SCHEMA["required"],
+            },
+        },
+    },
+    "required": ["evaluations"],
+}
+
+# ---------------- Q&A Parsing ----------------
+# "Q3." / "a3:" / "**Q3)**" style markers. A marker counts only where it can
+# continue the sequence (see parse_qas), so "Q3 earnings" inside an answer is text.
+QA_MARKER = re.compile(r'(?im)(^[ \t>#*]*)?\b([QA])(\d+)(?=[\s:.)*])(\**[:.)])?[\s:.)*]*')
+
+def parse_qas(qas_text):
+    """Parse model output into [{"number", "question", "answer"}] in one pass.
+
+    Handles any number of pairs. A question marker is accepted at the start of a line,
+    or mid-line when punctuated ("Q2:") and next in sequence; an answer marker must
+    match the current question number. Text before the first question is ignored.
+    """
+    pairs = []
+    current = None
+    field = None
+    position = 0
+
+    for match in QA_MARKER.finditer(qas_text or ""):
+        line_start, kind, number = match.group(1) is not None, match.group(2).upper(), int(match.group(3))
+        if not line_start and match.group(4) is None:
+            continue
+        if kind == "Q":
+            if not line_start and current is not None and number != current["number"] + 1:
+                continue
+        elif current is None or number != current["number"] or field == "answer":
+            continue
+
+        if current is not None:
+            current[field] += qas_text[position:match.start()]
+        if kind == "Q":
+            current = {"number": number, "question": "", "answer": ""}
+            pairs.append(current)
+            field = "question"
+        else:
+            field = "answer"
+        position = match.end()
+
+    if current is not None:
+        current[field] += qas_text[position:]
+    for pair in pairs:
+        pair["question"] = pair["question"].strip()
+        pair["answer"] = pair["answer"].strip()
+    return pairs
+
+def qas_pairs_from_json(value):
+    """Pairs from a QAS_SCHEMA response, numbered in order"""
+    return [
+        {"number": idx, "question": item["question"].strip(), "answer": item["answer"].strip(),
+         "difficulty": item["difficulty"]}
+        for idx, item in enumerate(value["questions"], 1)
+    ]
+
+def render_qas(pairs):
+    """Markdown for parsed pairs: Q/A lines with a blank line between pairs"""
+    return "\n\n".join(
+        f"Q{pair['number']}. {pair['question']}\nA{pair['number']}. {pair['answer']}"
+        for pair in pairs
+    )
+
+@traced("parse_qas_output")
+def parse_qas_output(qas_text):
+    """Return (pairs, markdown); unparseable text is passed through unchanged"""
+    pairs = parse_qas(qas_text)
+    if not pairs:
+        return [], qas_text.strip() if qas_text else qas_text
+    return pairs, render_qas(pairs)
+
+@traced("format_qas_output")
+def format_qas_output(qas_text):
+    """Ensure proper formatting with blank lines between Q&A pairs"""
+    return parse_qas_output(qas_text)[1]
+
+def render_evaluation(evaluation):
+    """Markdown for an EVALUATION_SCHEMA result"""
+    parts = [
+        f"### Score: {evaluation['overall']}/10",
+        "| Completeness | Technical Accuracy | Communication Clarity |\n|---|---|---|\n"
+        f"| {evaluation['completeness']}/10 | {evaluation['accuracy']}/10 | {evaluation['clarity']}/10 |",
+    ]
+    if evaluation["strengths"]:
+        parts.append("### Strengths:\n" + "\n".join(f"- {item}" for item in evaluation["strengths"]))
+    if evaluation["improvements"]:
+        parts.append("### Improvements:\n" + "\n".join(f"- {item}" for item in evaluation["improvements"]))
+    if evaluation["improved_answer"]:
+        parts.append(f"### Suggested Answer:\n{evaluation['improved_answer']}")
+    return "\n\n".join(parts)
+
+# ---------------- Streaming Helpers ----------------
+QUESTION_START = re.compile(r'(?im)^[ \t*]*Q\d+[:\.\s]')
+
+def split_complete_pairs(text):
+    """Split streamed text into finished Q/A pairs and the trailing unfinished one"""
+    starts = [m.start() for m in QUESTION_START.finditer(text)]
+    if len(starts) < 2:
+        return [], text
+    pairs = [text[start:end] for start, end in zip(starts, starts[1:])]
+    return pairs, text[starts[-1]:]
+
+# ---------------- Document Extraction ----------------
+@traced("extract_text_from_pdf")
+def extract_text_from_pdf(uploaded_file):
+    """Extract text from PDF within the configured page, character and token budgets"""
+    max_chars = min(pdf_extract.DEFAULT_MAX_CHARS, DOCUMENT_MAX_TOKENS * CHARS_PER_TOKEN)
+    return pdf_extract.extract_text(uploaded_file, max_chars=max_chars)
+
+# ---------------- Prompts ----------------
+def build_summary_prompt(document_text):
+    """Build the document summary prompt and its cache key"""
+    
+    cache_key = get_summary_cache_key(document_text)
+    
+    # Additional safety truncation (text that did not come through extract_text_from_pdf)
+    document_text = truncate_to_tokens(document_text, DOCUMENT_MAX_TOKENS)
+    
+    prompt = f"""
+You are an expert document analyzer. Analyze the provided document and determine if it's a RESUME or JOB DESCRIPTION, then generate an appropriate summary.
+
+IF IT'S A RESUME:
+Generate a concise, single-paragraph professional summary including:
+1. Full name (in bold)
+2. Educational background (degree, institution, graduation year, GPA/CGPA/percentage)
+3. Core technical skills (programming languages, frameworks, libraries, tools, platforms, specialized domains)
+4. Professional experience (company/organization names, duration, key responsibilities and achievements)
+5. Major projects (project names with technologies used and key outcomes)
+6. Certifications (list all certifications with issuing organization if mentioned)
+7. Publications/Research (if any - title, journal/conference, date)
+8. Contact information (email, phone, location)
+
+Output format: **[Name]** is a [Degree] graduate ([Years], [GPA]) from [Institution] with expertise in [Skills]. [He/She] completed [Experience details with dates and achievements]. Key projects include [Project names with technologies]. [He/She] holds certifications in [Certifications list] and published [Publication details if any]. Contact: [Email, Phone, Location].
+
+IF IT'S A JOB DESCRIPTION:
+Generate a concise, single-paragraph summary including:
+1. Job title/position (in bold)
+2. Company name (if mentioned)
+3. Key responsibilities and duties
+4. Required technical skills and qualifications
+5. Experience level required
+6. Preferred qualifications or nice-to-haves
+7. Work location/type (remote, hybrid, onsite)
+
+Output format: **[Job Title]** at [Company] requires [Experience level] with expertise in [Required skills]. Key responsibilities include [Main duties]. Candidates should have [Qualifications and requirements]. Preferred qualifications include [Nice-to-haves]. Location: [Work type/location].
+
+FORMATTING REQUIREMENTS:
+- Output must be a SINGLE, well-structured paragraph
+- Start with the key identifier (name for resume, job title for JD) in **bold** markdown format
+- Be precise and concise - eliminate unnecessary words
+- Include specific technical terms, tool names, and keywords exactly as mentioned
+- Use commas and brief phrases to separate items within categories
+- Maintain professional tone throughout
+- Ensure EVERY important detail is captured without omission
+
+Now analyze the following document and provide the appropriate summary:
+
+{document_text}
+"""
+    
+    return prompt, cache_key
+
+
+def build_qas_prefix(job_or_jd, summary_text):
+    """Static instructions plus job and resume context: identical for every settings
+    combination, so it can be registered once as cached content (see prompt_cache)"""
+    return f"""
+You are a professional interview coach.
+
+Generate exactly 4 interview questions WITH answers.
+
+CRITICAL FORMATTING RULES - FOLLOW EXACTLY:
+1. Start each question with "Q1.", "Q2.", "Q3.", "Q4."
+2. Start each answer with "A1.", "A2.", "A3.", "A4."
+3. Put ONE blank line after each answer
+4. NO introductory text, NO concluding remarks, NO extra formatting
+
+EXACT OUTPUT FORMAT YOU MUST USE:
+Q1. <question text>
+A1. <detailed answer>
+
+Q2. <question text>
+A2. <detailed answer>
+
+Q3. <question text>
+A3. <detailed answer>
+
+Q4. <question text>
+A4. <detailed answer>
+
+Job Role / JD:
+{job_or_jd}
+
+Resume Summary:
+{summary_text if summary_text else "Not provided"}
+"""
+
+
+def build_qas_prompt(job_or_jd, summary_text, category, difficulty, experience_level):
+    """Build the Q&A generation prompt and its cache key; the prompt starts with build_qas_prefix"""
+    prompt = build_qas_prefix(job_or_jd, summary_text) + f"""
+Interview Parameters:
+- Category: {category}
+- Difficulty: {difficulty}
+- Experience Level: {experience_level}
+
+Generate the 4 questions and answers now following the EXACT format shown above.
+"""
+    
+    return prompt, get_qas_cache_key(job_or_jd, summary_text, category, difficulty, experience_level)
+
+
+def build_evaluation_prompt(question, user_answer):
+    """Build the answer evaluation prompt"""
+    return f"""
+You are an interview evaluator.
+
+Evaluate based on:
+1. Completeness
+2. Technical Accuracy
+3. Communication Clarity
+
+Provide:
+- Score /10
+- Feedback
+- Improvements
+
+Question:
+{question}
+
+Answer:
+{user_answer}
+"""
+
+
+def build_structured_qas_prefix(job_or_jd, summary_text):
+    """Settings-independent start of build_structured_qas_prompt (see build_qas_prefix)"""
+    return f"""
+You are a professional interview coach.
+
+Generate exactly 4 interview questions WITH detailed answers as JSON.
+Tag each question with its own difficulty ("Easy", "Medium" or "Hard").
+
+Job Role / JD:
+{job_or_jd}
+
+Resume Summary:
+{summary_text if summary_text else "Not provided"}
+"""
+
+
+def build_structured_qas_prompt(job_or_jd, summary_text, category, difficulty, experience_level):
+    """JSON-mode variant of build_qas_prompt; the response must match QAS_SCHEMA"""
+    prompt = build_structured_qas_prefix(job_or_jd, summary_text) + f"""
+Interview Parameters:
+- Category: {category}
+- Difficulty: {difficulty} (most questions should be "{difficulty}")
+- Experience Level: {experience_level}
+
+Respond with a JSON object: {{"questions": [{{"question": "...", "answer": "...", "difficulty": "..."}}]}}
+"""
+    cache_key = get_cache_key(f"qas_json_v1_{job_or_jd}_{summary_text}_{category}_{difficulty}_{experience_level}")
+    return prompt, cache_key
+
+
+def build_structured_evaluation_prompt(question, user_answer):
+    """JSON-mode variant of build_evaluation_prompt; the response must match EVALUATION_SCHEMA"""
+    return f"""
+You are an interview evaluator.
+
+Score the answer from 0 to 10 on:
+- completeness
+- accuracy (technical accuracy)
+- clarity (communication clarity)
+- overall
+
+Also list strengths and improvements, and write an improved_answer.
+Respond with a JSON object containing exactly those fields.
+
+Question:
+{question}
+
+Answer:
+{user_answer}
+"""
+
+
+def build_batch_evaluation_prompt(items):
+    """One JSON-mode prompt evaluating several (question, answer) items; matches BATCH_EVALUATION_SCHEMA"""
+    blocks = "\n\n".join(
+        f"Item {idx}\nQuestion:\n{question}\n\nAnswer:\n{user_answer}"
+        for idx, (question, user_answer) in enumerate(items, 1)
+    )
+    return f"""
+You are an interview evaluator.
+
+Evaluate EACH of the {len(items)} answers below independently. For each item, score from 0 to 10:
+- completeness
+- accuracy (technical accuracy)
+- clarity (communication clarity)
+- overall
+
+Also list strengths and improvements, and write an improved_answer.
+Respond with a JSON object {{"evaluations": [...]}} holding one entry per item, with "index" set to the item number.
+
+{blocks}
+"""
+
+
+def parse_batch_evaluations(value, count):
+    """Map a BATCH_EVALUATION_SCHEMA response to a list of `count` results (None where an item is missing)"""
+    results = [None] * count
+    for item in value["evaluations"]:
+        if 1 <= item["index"] <= count:
+            results[item["index"] - 1] = {key: item[key] for key in EVALUATION_SCHEMA["properties"]}
+    return results
+
+
+def build_batch_qas_prompt(job_or_jd, summary_text, combinations):
+    """Build one prompt asking for Q&A sets for several (category, difficulty, experience) combinations"""
+    combination_lines = "\n".join(
+        f'- category: "{category}", difficulty: "{difficulty}", experience_level: "{experience_level}"'
+        for category, difficulty, experience_level in combinations
+    )
+    return f"""
+You are a professional interview coach.
+
+For EACH combination of interview parameters listed below, generate exactly 4 interview questions WITH detailed answers.
+
+Combinations:
+{combination_lines}
+
+Job Role / JD:
+{job_or_jd}
+
+Resume Summary:
+{summary_text if summary_text else "Not provided"}
+
+Respond with ONLY a JSON array, no markdown fences and no extra text. One object per combination, using exactly this shape:
+[
+  {{
+    "category": "<category>",
+    "difficulty": "<difficulty>",
+    "experience_level": "<experience_level>",
+    "questions": [
+      {{"question": "<question text>", "answer": "<detailed answer>"}}
+    ]
+  }}
+]
+"""
+
+
+def batch_qas_from_json(value):
+    """Split a BATCH_QAS_SCHEMA response into {(category, difficulty, experience_level): qas_text}, keys lowercased"""
+    results = {}
+    for item in value:
+        combination = tuple(item[field].strip().lower() for field in ("category", "difficulty", "experience_level"))
+        # Same text layout as a single generate_qas response, so both share the cache
+        results[combination] = "\n\n".join(
+            f"Q{idx}. {pair['question'].strip()}\nA{idx}. {pair['answer'].strip()}"
+            for idx, pair in enumerate(item["questions"], 1)
+        )
+    return results
+
+
+# ---------------- Near-duplicate Reuse ----------------
+def find_similar_qas(index, cache, job_or_jd, summary_text, category, difficulty, experience_level):
+    """Cached Q&A for a near-identical earlier request as (text, similarity), or None.
+
+    Returns None when the exact request is already cached, so the normal path serves it.
+    """
+    if index is None or cache is None:
+        return None
+    cache_key = get_qas_cache_key(job_or_jd, summary_text, category, difficulty, experience_level)
+    if cache_key in cache:
+        return None
+    scope = get_similarity_scope(summary_text, category, difficulty, experience_level)
+    match = index.find(scope, job_or_jd, exclude=cache_key)
+    if match is None:
+        return None
+    value_key, similarity = match
+    text = cache.get(value_key)
+    if text is None:
+        index.discard(value_key)  # evicted from the response cache
+        return None
+    return text, similarity
+
+def store_structured_qas(cache, index, job_or_jd, summary_text, category, difficulty, experience_level, pairs):
+    """Cache a JSON-mode result under the plain-text key too, so text mode and reuse share it"""
+    if cache is None or not pairs:
+        return
+    cache.set(get_qas_cache_key(job_or_jd, summary_text, category, difficulty, experience_level), render_qas(pairs))
+    remember_qas(index, job_or_jd, summary_text, category, difficulty, experience_level)
+
+def remember_qas(index, job_or_jd, summary_text, category, difficulty, experience_level):
+    """Make a freshly cached Q&A set available to near-duplicate lookups"""
+    if index is None:
+        return
+    index.add(
+        get_similarity_scope(summary_text, category, difficulty, experience_level),
+        job_or_jd,
+        get_qas_cache_key(job_or_jd, summary_text, category, difficulty, experience_level)
+    )
+
+
+# ---------------- Batched Evaluation ----------------
+def cache_evaluation(cache, question, user_answer, result):
+    """Store a structured result under the JSON-mode key and its markdown under the text-mode key"""
+    if cache is None or result is None:
+        return
+    cache.set(get_evaluation_cache_key(question, user_answer, structured=True), dumps(result))
+    cache.set(get_evaluation_cache_key(question, user_answer), render_evaluation(result))
+
+async def evaluate_answers_batch(call_json, cache, items):
+    """Cached results plus one BATCH_EVALUATION_SCHEMA call for the rest.
+
+    `call_json(prompt, schema)` performs the JSON-mode request (engine or app flavour).
+    """
+    results = [None] * len(items)
+    missing = []
+    for idx, (question, user_answer) in enumerate(items):
+        cached = cache.get(get_evaluation_cache_key(question, user_answer, structured=True)) if cache is not None else None
+        if cached is not None:
+            results[idx] = loads(cached)
+        else:
+            missing.append(idx)
+    if not missing:
+        return results
+
+    batch = [items[idx] for idx in missing]
+    value = await call_json(build_batch_evaluation_prompt(batch), BATCH_EVALUATION_SCHEMA)
+    for idx, result in zip(missing, parse_batch_evaluations(value, len(batch))):
+        results[idx] = result
+        cache_evaluation(cache, *items[idx], result)
+    return results
+
+
+# ---------------- Client & Engine ----------------
+def create_client(api_key=None):
+    """Construct a genai.Client from an explicit key or the GEMINI_API_KEY environment variable"""
+    from google import genai
+
+    return genai.Client(api_key=api_key or os.environ["GEMINI_API_KEY"])
+
+
+class LazyClient:
+    """Stands in for a genai.Client that is only built on first attribute access.
+
+    Importing google.genai and building the client is deferred until a request is
+    actually made; after that the one client (and its HTTP connection pool) is reused.
+    """
+
+    def __init__(self, api_key=None):
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._client is None:
+                self._client = create_client(self._api_key)
+            return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+class InterviewEngine:
+    """Async generation pipeline with no Streamlit dependency.
+
+    `client` may be a genai.Client or any stub with the same `models` surface.
+    Cache, rate limiter, single-flight group, similarity index, prefix cache, token
+    meter and retry policy are optional and shared with the app when the same objects
+    (or the same cache directory) are used.
+    """
+
+    def __init__(self, client, model=MODEL, cache=None, rate_limiter=None, single_flight=None,
+                 session_id="headless", max_retries=4, similarity_index=None, prefix_cache=None,
+                 token_meter=None, retry_policy=None):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.session_id = session_id
+        self.max_retries = max_retries
+        self.similarity_index = similarity_index
+        self.prefix_cache = prefix_cache
+        self.token_meter = token_meter
+        self.retry_policy = retry_policy
+
+    async def call(self, prompt, cache_key=None, prefix=None, feature=None):
+        return await call_gemini_async(
+            self.client, self.model, prompt,
+            max_retries=self.max_retries,
+            cache=self.cache,
+            cache_key=cache_key,
+            rate_limiter=self.rate_limiter,
+            session_id=self.session_id,
+            single_flight=self.single_flight,
+            prefix=prefix,
+            prefix_cache=self.prefix_cache,
+            token_meter=self.token_meter,
+            feature=feature,
+            retry_policy=self.retry_policy
+        )
+
+    async def call_json(self, prompt, schema, cache_key=None, prefix=None, feature=None):
+        return await call_json_async(
+            self.client, self.model, prompt, schema,
+            cache=self.cache,
+            cache_key=cache_key,
+            max_retries=self.max_retries,
+            rate_limiter=self.rate_limiter,
+            session_id=self.session_id,
+            single_flight=self.single_flight,
+            prefix=prefix,
+            prefix_cache=self.prefix_cache,
+            token_meter=self.token_meter,
+            feature=feature,
+            retry_policy=self.retry_policy
+        )
+
+    def is_cached(self, cache_key):
+        return self.cache is not None and cache_key in self.cache
+
+    async def summarize(self, document_text):
+        prompt, cache_key = build_summary_prompt(document_text)
+        return await self.call(prompt, cache_key, feature="summary")
+
+    async def generate_qas(self, job_or_jd, summary_text, category, difficulty, experience_level):
+        """Generate and format one Q&A set, reusing one for a near-identical job text if indexed"""
+        settings = (category, difficulty, experience_level)
+        reused = find_similar_qas(self.similarity_index, self.cache, job_or_jd, summary_text, *settings)
+        if reused is not None:
+            return format_qas_output(reused[0])
+        prompt, cache_key = build_qas_prompt(job_or_jd, summary_text, *settings)
+        qas = await self.call(prompt, cache_key, prefix=build_qas_prefix(job_or_jd, summary_text), feature="qas")
+        if qas:
+            remember_qas(self.similarity_index, job_or_jd, summary_text, *settings)
+        return format_qas_output(qas)
+
+    async def generate_qas_batch(self, job_or_jd, summary_text, combinations, feature="qas"):
+        """Generate Q&A for several settings combinations with one request.
+
+        The response is validated against BATCH_QAS_SCHEMA before it is cached, so a
+        malformed batch is repaired or raised, never served from the cache. Each parsed
+        set is cached under its single-request key (and indexed for near-duplicate
+        reuse); returns {combination: qas_text} for the sets received.
+        """
+        prompt = build_batch_qas_prompt(job_or_jd, summary_text, combinations)
+        parsed = batch_qas_from_json(
+            await self.call_json(prompt, BATCH_QAS_SCHEMA, get_cache_key(f"qas_batch_v2_{prompt}"), feature=feature)
+        )
+        results = {}
+        for combination in combinations:
+            qas = parsed.get(tuple(value.lower() for value in combination))
+            if qas:
+                if self.cache is not None:
+                    self.cache.set(get_qas_cache_key(job_or_jd, summary_text, *combination), qas)
+                remember_qas(self.similarity_index, job_or_jd, summary_text, *combination)
+                results[combination] = qas
+        return results
+
+    async def generate_qas_structured(self, job_or_jd, summary_text, category, difficulty, experience_level):
+        """Generate one Q&A set in JSON mode; returns validated pairs with difficulty tags"""
+        settings = (category, difficulty, experience_level)
+        prompt, cache_key = build_structured_qas_prompt(job_or_jd, summary_text, *settings)
+        prefix = build_structured_qas_prefix(job_or_jd, summary_text)
+        pairs = qas_pairs_from_json(await self.call_json(prompt, QAS_SCHEMA, cache_key, prefix=prefix, feature="qas"))
+        store_structured_qas(self.cache, self.similarity_index, job_or_jd, summary_text, *settings, pairs)
+        return pairs
+
+    async def evaluate_answer(self, question, user_answer):
+        return await self.call(
+            build_evaluation_prompt(question, user_answer),
+            get_evaluation_cache_key(question, user_answer),
+            feature="evaluation"
+        )
+
+    async def evaluate_answer_structured(self, question, user_answer):
+        """Evaluation as an EVALUATION_SCHEMA dict with numeric scores"""
+        result = await self.call_json(
+            build_structured_evaluation_prompt(question, user_answer),
+            EVALUATION_SCHEMA,
+            get_evaluation_cache_key(question, user_answer, structured=True),
+            feature="evaluation"
+        )
+        cache_evaluation(self.cache, question, user_answer, result)
+        return result
+
+    async def evaluate_answers(self, items):
+        """Evaluate several (question, answer) items with one request; returns results in order.
+
+        Items already evaluated are served from the cache. An item the model left out
+        of its response comes back as None.
+        """
+        def call_json(prompt, schema):
+            return self.call_json(prompt, schema, feature="evaluation")
+
+        return await evaluate_answers_batch(call_json, self.cache, items)
@@ -0,0 +1,237 @@
+"""Local stand-in for genai.Client used by the offline benchmark.
+
+Implements the subset of the client surface the app uses: `models.generate_content`,
+`models.generate_content_stream`, `aio.models.generate_content` and `caches.create`
+(explicit context caching), with configurable latency, 429/503 injection, per-model
+outages, malformed JSON-mode responses and response sizes. No network access or API key needed.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+
+class MockAPIError(Exception):
+    """Error shaped like google.genai.errors.APIError (code, status, message, details)"""
+
+    def __init__(self, code, status, message, details=None):
+        self.code = code
+        self.status = status
+        self.message = message
+        self.details = details
+        super().__init__(f"{code} {status}. {message}")
+
+
+class MockUsage:
+    def __init__(self, prompt_tokens, output_tokens, cached_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class MockResponse:
+    def __init__(self, text, prompt_tokens=0, cached_tokens=0):
+        self.text = text
+        self.usage_metadata = MockUsage(prompt_tokens, len(text) // 4, cached_tokens)
+
+
+class MockCachedContent:
+    def __init__(self, name, text, expire_time):
+        self.name = name
+        self.text = text
+        self.expire_time = expire_time
+
+
+# ---------------- Response Bodies ----------------
+def make_qas_text(answer_chars, questions=4):
+    filler = ("This answer explains the approach, trade-offs and an example from practice. " * 40)[:answer_chars]
+    return "\n\n".join(
+        f"Q{idx}: Describe a situation involving topic {idx}?\nA{idx}: {filler}"
+        for idx in range(1, questions + 1)
+    )
+
+
+def make_response_text(prompt, response_chars):
+    """Pick a plausible body for the prompt type so formatting code sees realistic input"""
+    if "Combinations:" in prompt:
+        return make_batch_qas_text(prompt, response_chars)
+    if "interview questions WITH answers" in prompt and "JSON" not in prompt:
+        return make_qas_text(max(40, response_chars // 4))
+    if "interview evaluator" in prompt:
+        return ("### Score: 6/10\n### Feedback:\n" + "Clear but missing detail. " * 200)[:response_chars]
+    return ("**Jane Doe** is a Computer Science graduate with expertise in Python. " * 100)[:response_chars]
+
+
+def make_batch_qas_text(prompt, response_chars):
+    """JSON array with one Q&A set per combination line of a batch prompt"""
+    filler = ("This answer explains the approach and an example from practice. " * 40)[:max(40, response_chars // 8)]
+    combinations = re.findall(
+        r'(?m)^- category: "([^"]+)", difficulty: "([^"]+)", experience_level: "([^"]+)"$', prompt
+    )
+    return json.dumps([
+        {
+            "category": category, "difficulty": difficulty, "experience_level": experience_level,
+            "questions": [
+                {"question": f"Describe a situation involving topic {idx}?", "answer": filler}
+                for idx in range(1, 5)
+            ],
+        }
+        for category, difficulty, experience_level in combinations
+    ])
+
+
+def make_json_text(prompt, response_chars):
+    """JSON-mode body: an evaluation, a Q&A set or a batch, whichever schema the prompt asks for"""
+    if "Combinations:" in prompt:
+        return make_batch_qas_text(prompt, response_chars)
+    filler = ("Clear structure, but the example needs measurable results. " * 40)[:max(40, response_chars // 8)]
+    if "interview evaluator" in prompt or "improved_answer" in prompt:
+        evaluation = {
+            "completeness": 6, "accuracy": 7, "clarity": 8, "overall": 7,
+            "strengths": ["Clear structure"], "improvements": [filler],
+            "improved_answer": filler,
+        }
+        if '"evaluations"' in prompt:
+            items = len(re.findall(r"(?m)^Item \d+$", prompt)) or 1
+            return json.dumps({"evaluations": [{"index": idx, **evaluation} for idx in range(1, items + 1)]})
+        return json.dumps(evaluation)
+    return json.dumps({"questions": [
+        {"question": f"Describe a situation involving topic {idx}?", "answer": filler, "difficulty": "Medium"}
+        for idx in range(1, 5)
+    ]})
+
+
+def is_json_mode(config):
+    return isinstance(config, dict) and config.get("response_mime_type") == "application/json"
+
+
+# ---------------- Mock Client ----------------
+class MockCaches:
+    """Explicit context caches: `create` stores the prefix, requests reference it by name"""
+
+    def __init__(self, client):
+        self._client = client
+        self._entries = {}
+
+    def create(self, model, config):
+        text = "".join(part["text"] for content in config["contents"] for part in content["parts"])
+        ttl = float(str(config.get("ttl", "3600s")).rstrip("s"))
+        with self._client._lock:
+            self._client.cache_creations += 1
+            name = f"cachedContents/mock-{self._client.cache_creations}"
+            self._entries[name] = MockCachedContent(name, text, time.time() + ttl)
+        return self._entries[name]
+
+    def resolve(self, config):
+        """(prefix text, cached tokens) for a request config; raises like the API for unknown handles"""
+        name = config.get("cached_content") if isinstance(config, dict) else None
+        if not name:
+            return "", 0
+        entry = self._entries.get(name)
+        if entry is None or entry.expire_time <= time.time():
+            raise MockAPIError(404, "NOT_FOUND", f"CachedContent not found: {name}")
+        return entry.text, len(entry.text) // 4
+
+
+class MockModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        prefix, cached_tokens = self._client.caches.resolve(config)
+        prompt = prefix + (contents[0]["text"] if contents else "")
+        self._client._before_call(model)
+        time.sleep(self._client._latency())
+        return MockResponse(self._client._body(prompt, config), len(prompt) // 4, cached_tokens)
+
+    def generate_content_stream(self, model, contents, config=None):
+        prefix, cached_tokens = self._client.caches.resolve(config)
+        prompt = prefix + (contents[0]["text"] if contents else "")
+        self._client._before_call(model)
+        text = make_response_text(prompt, self._client.response_chars)
+        chunk_size = max(1, len(text) // self._client.stream_chunks)
+        delay = self._client._latency() / self._client.stream_chunks
+        for start in range(0, len(text), chunk_size):
+            time.sleep(delay)
+            chunk = MockResponse(text[start:start + chunk_size])
+            # Like the API, each chunk reports usage so far; the last one has the totals
+            chunk.usage_metadata = MockUsage(len(prompt) // 4, min(len(text), start + chunk_size) // 4, cached_tokens)
+            yield chunk
+
+
+class MockAsyncModels:
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        prefix, cached_tokens = self._client.caches.resolve(config)
+        prompt = prefix + (contents[0]["text"] if contents else "")
+        self._client._before_call(model)
+        await asyncio.sleep(self._client._latency())
+        return MockResponse(self._client._body(prompt, config), len(prompt) // 4, cached_tokens)
+
+
+class MockAio:
+    def __init__(self, client):
+        self.models = MockAsyncModels(client)
+
+
+class MockGeminiClient:
+    """Drop-in for genai.Client with injected latency and failures"""
+
+    def __init__(self, latency=0.5, jitter=0.2, rate_limit_rate=0.0, overload_rate=0.0,
+                 response_chars=2000, stream_chunks=20, seed=None, invalid_json_rate=0.0,
+                 unavailable_models=(), retry_delay=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.overload_rate = overload_rate
+        self.invalid_json_rate = invalid_json_rate
+        self.unavailable_models = set(unavailable_models)  # always answer 503 (partial outage)
+        self.retry_delay = retry_delay  # seconds suggested with each 429, like RetryInfo
+        self.response_chars = response_chars
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.errors = 0
+        self.calls_by_model = {}
+        self.cache_creations = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = MockModels(self)
+        self.aio = MockAio(self)
+        self.caches = MockCaches(self)
+
+    def _latency(self):
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _body(self, prompt, config):
+        if not is_json_mode(config):
+            return make_response_text(prompt, self.response_chars)
+        text = make_json_text(prompt, self.response_chars)
+        with self._lock:
+            malformed = self._random.random() < self.invalid_json_rate
+        return text[:len(text) // 2] if malformed else text  # cut off mid-object
+
+    def _before_call(self, model):
+        with self._lock:
+            self.calls += 1
+            self.calls_by_model[model] = self.calls_by_model.get(model, 0) + 1
+            roll = self._random.random()
+            if model in self.unavailable_models:
+                self.errors += 1
+                raise MockAPIError(503, "UNAVAILABLE", "The model is overloaded")
+            if roll < self.rate_limit_rate:
+                self.errors += 1
+                details = None
+                if self.retry_delay is not None:
+                    details = {"error": {"code": 429, "details": [
+                        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{self.retry_delay}s"}
+                    ]}}
+                raise MockAPIError(429, "RESOURCE_EXHAUSTED", "Quota exceeded", details)
+            if roll < self.rate_limit_rate + self.overload_rate:
+                self.errors += 1
+                raise MockAPIError(503, "UNAVAILABLE", "The model is overloaded")
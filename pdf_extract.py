@@ -0,0 +1,67 @@
+"""Budgeted, page-lazy PDF text extraction.
+
+The document is opened once and pages are read one at a time until the page or
+character budget (QA_PDF_MAX_PAGES / QA_PDF_MAX_CHARS) is reached, so a long
+upload costs no more than the pages that fit. Page texts are joined once at the
+end, and the page crossing the character budget is cut at a sentence boundary.
+"""
+import os
+
+from token_meter import truncate_at_sentence
+
+# ---------------- Defaults ----------------
+DEFAULT_MAX_PAGES = int(os.environ.get("QA_PDF_MAX_PAGES", 10))
+DEFAULT_MAX_CHARS = int(os.environ.get("QA_PDF_MAX_CHARS", 12000))
+TRUNCATION_NOTICE = "\n\n[Document truncated for processing...]"
+
+
+# ---------------- Page Iterator ----------------
+def iter_pages(doc, page_count):
+    """Yield page text one page at a time"""
+    for page_num in range(page_count):
+        yield doc.load_page(page_num).get_text()
+
+
+# ---------------- Extraction ----------------
+def read_bytes(source):
+    """Accept raw bytes or an uploaded file object"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def extract_text(source, max_pages=DEFAULT_MAX_PAGES, max_chars=DEFAULT_MAX_CHARS):
+    """Extract text up to a page and character budget, stopping as soon as it is reached.
+
+    A page that crosses the character budget is cut at its last sentence boundary.
+    Pages are read in-process: under the budgets only a handful are ever read, too
+    few for worker processes to pay for their startup. `max_pages`/`max_chars` of
+    None mean no limit.
+    """
+    import fitz
+
+    data = read_bytes(source)
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = len(doc) if max_pages is None else min(max_pages, len(doc))
+        pages = iter_pages(doc, page_count)
+
+        parts = []
+        total = 0
+        truncated = False
+        for text in pages:
+            if max_chars is not None and total + len(text) > max_chars:
+                parts.append(truncate_at_sentence(text, max_chars - total))
+                truncated = True
+                break
+            parts.append(text)
+            total += len(text)
+        pages.close()
+
+    text = "".join(parts)
+    if truncated:
+        text += TRUNCATION_NOTICE
+    return text
@@ -0,0 +1,173 @@
+"""Explicit context caching for long, repeated prompt prefixes.
+
+A prefix (static instructions plus document context) is registered once with the
+API's cached-content feature; later requests send only the rest of the prompt and
+reference the handle. Handles are reused until shortly before their TTL runs out,
+and token savings are read from each response's usage metadata.
+
+Registering a handle is a billed API call that also pays for storage, so a
+prefix is only registered once it has been seen `min_sightings` times. The
+create call takes a slot from the shared rate limiter, is checked against the
+token budgets and skipped while the model's circuit is open.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from rate_limiter import RateLimitExceeded, estimate_tokens
+from token_meter import TokenBudgetExceeded
+
+# ---------------- Defaults ----------------
+DEFAULT_TTL = int(os.environ.get("QA_PREFIX_CACHE_TTL", 600))
+# Gemini rejects explicit caches below a minimum size (1024 tokens for 2.5 Flash)
+DEFAULT_MIN_TOKENS = int(os.environ.get("QA_PREFIX_CACHE_MIN_TOKENS", 1024))
+DEFAULT_MIN_SIGHTINGS = int(os.environ.get("QA_PREFIX_CACHE_MIN_SIGHTINGS", 2))
+EXPIRY_MARGIN = 30  # seconds; a handle this close to expiry is replaced rather than reused
+MAX_TRACKED_PREFIXES = 4096  # prefixes seen fewer than min_sightings times are forgotten LRU-first
+SESSION_ID = "context-cache"  # rate limiter and token meter session when no user session is given
+
+
+# ---------------- Prefix Cache ----------------
+class PrefixCache:
+    """Maps prompt prefixes to live cached-content handles for one client and model.
+
+    `client` needs `caches.create(model=..., config=...)` returning an object with a
+    `name`, as genai.Client does. A TTL of 0 disables caching. `rate_limiter`,
+    `token_meter` and `retry_policy` are the process-wide instances the create
+    calls are accounted against; each is optional.
+    """
+
+    def __init__(self, client, model, ttl=DEFAULT_TTL, min_tokens=DEFAULT_MIN_TOKENS,
+                 min_sightings=DEFAULT_MIN_SIGHTINGS, rate_limiter=None, token_meter=None, retry_policy=None):
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.min_sightings = min_sightings
+        self.rate_limiter = rate_limiter
+        self.token_meter = token_meter
+        self.retry_policy = retry_policy
+        self.created = 0
+        self.skipped = 0
+        self.reused = 0
+        self.failures = 0
+        self.requests = 0
+        self.cached_tokens = 0
+        self.prompt_tokens = 0
+        self._handles = {}  # prefix hash -> (handle name, expires_at)
+        self._sightings = OrderedDict()  # prefix hash -> times seen without a handle
+        self._lock = threading.Lock()
+
+    def _key(self, prefix):
+        return hashlib.blake2b(f"{self.model}\0{prefix}".encode(), digest_size=16).hexdigest()
+
+    def _prune(self, now):
+        for key in [key for key, (_, expires_at) in self._handles.items() if expires_at - EXPIRY_MARGIN <= now]:
+            del self._handles[key]
+
+    def handle(self, prefix, session_id=SESSION_ID):
+        """Name of a live handle for `prefix`, registering it if needed.
+
+        None when caching is off, the prefix is below the API minimum or not yet seen
+        `min_sightings` times, or when registration was skipped or failed.
+        """
+        tokens = estimate_tokens(prefix) if prefix else 0
+        if self.ttl <= 0 or not prefix or tokens < self.min_tokens:
+            return None
+        key = self._key(prefix)
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            entry = self._handles.get(key)
+            if entry is not None:
+                self.reused += 1
+                return entry[0]
+            seen = self._sightings.pop(key, 0) + 1
+            if seen < self.min_sightings:
+                self._sightings[key] = seen
+                if len(self._sightings) > MAX_TRACKED_PREFIXES:
+                    self._sightings.popitem(last=False)
+                return None
+
+        if not self._may_create(session_id, tokens):
+            with self._lock:
+                self.skipped += 1
+                self._sightings[key] = seen  # try again on the next sighting
+            return None
+        try:
+            cached = self.client.caches.create(
+                model=self.model,
+                config={
+                    "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+                    "ttl": f"{self.ttl}s",
+                }
+            )
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            return None
+        if self.token_meter is not None:
+            self.token_meter.record(session_id, "context_cache", cached, prefix, output_text="")
+        with self._lock:
+            self._handles[key] = (cached.name, now + self.ttl)
+            self.created += 1
+        return cached.name
+
+    def _may_create(self, session_id, tokens):
+        """Whether a create call may be sent now; never waits, since the prompt can go inline instead"""
+        if self.retry_policy is not None and self.retry_policy.breaker(self.model).state != "closed":
+            return False
+        try:
+            if self.token_meter is not None:
+                self.token_meter.check(session_id, tokens)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(session_id, tokens, timeout=0)
+        except (TokenBudgetExceeded, RateLimitExceeded):
+            return False
+        return True
+
+    def invalidate(self, prefix):
+        """Forget the handle for `prefix` (for example after the API reports it missing)"""
+        with self._lock:
+            self._handles.pop(self._key(prefix), None)
+
+    def request(self, prompt, prefix=None, config=None, session_id=SESSION_ID):
+        """Return (text to send, config) for `prompt`, which must start with `prefix`.
+
+        With a live handle only the remainder is sent and `cached_content` is added to
+        the config; otherwise the full prompt and the original config are returned.
+        A create call this triggers is accounted to `session_id`.
+        """
+        if prefix and prompt.startswith(prefix):
+            name = self.handle(prefix, session_id)
+            if name is not None:
+                return prompt[len(prefix):], {**(config or {}), "cached_content": name}
+        return prompt, config
+
+    def record(self, response):
+        """Add a response's usage to the totals; returns the input tokens served from cache"""
+        usage = getattr(response, "usage_metadata", None)
+        cached = getattr(usage, "cached_content_token_count", None) or 0
+        prompt = getattr(usage, "prompt_token_count", None) or 0
+        with self._lock:
+            self.requests += 1
+            self.cached_tokens += cached
+            self.prompt_tokens += prompt
+        return cached
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.time())
+            return {
+                "handles": len(self._handles),
+                "created": self.created,
+                "reused": self.reused,
+                "skipped": self.skipped,
+                "failures": self.failures,
+                "requests": self.requests,
+                "cached_tokens": self.cached_tokens,
+                "prompt_tokens": self.prompt_tokens,
+                "saved_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# ---------------- Defaults (Gemini free tier) ----------------
+DEFAULT_RPM = 15
+DEFAULT_RPD = 1500
+DEFAULT_TPM = 1_000_000
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request could not be scheduled within its timeout"""
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+# ---------------- Token Bucket ----------------
+class TokenBucket:
+    """Classic token bucket; refills continuously up to capacity"""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+
+# ---------------- Process-wide Scheduler ----------------
+class RateLimiter:
+    """Shared RPM/RPD/TPM budget with round-robin fairness across sessions"""
+
+    def __init__(self, rpm=DEFAULT_RPM, rpd=DEFAULT_RPD, tpm=DEFAULT_TPM):
+        self.requests_per_minute = TokenBucket(rpm, 60)
+        self.requests_per_day = TokenBucket(rpd, 86400)
+        self.tokens_per_minute = TokenBucket(tpm, 60)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # session_id -> deque of waiting tickets
+        self.granted = 0
+        self.total_wait = 0.0
+
+    def _wait_for(self, tokens, now, requests=1):
+        return max(
+            self.requests_per_minute.wait_time(requests, now),
+            self.requests_per_day.wait_time(requests, now),
+            self.tokens_per_minute.wait_time(tokens, now),
+        )
+
+    def _head(self):
+        if not self._queues:
+            return None
+        return next(iter(self._queues.values()))[0]
+
+    def _remove(self, session_id, ticket):
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return
+        queue.remove(ticket)
+        if queue:
+            # Round robin: a session with more queued work goes to the back
+            self._queues.move_to_end(session_id)
+        else:
+            del self._queues[session_id]
+
+    def queue_length(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def expected_wait(self, tokens=0):
+        """Estimated seconds a new request would wait, given the current queue"""
+        with self._cond:
+            queued = sum(len(queue) for queue in self._queues.values())
+            return self._wait_for(tokens * (queued + 1), time.monotonic(), requests=queued + 1)
+
+    def acquire(self, session_id, tokens=0, timeout=None):
+        """Block until the request may be sent; returns the seconds spent waiting"""
+        ticket = object()
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._head() is ticket:
+                        wait = self._wait_for(tokens, now)
+                        if wait <= 0:
+                            self.requests_per_minute.consume(1, now)
+                            self.requests_per_day.consume(1, now)
+                            self.tokens_per_minute.consume(tokens, now)
+                            waited = now - start
+                            self.granted += 1
+                            self.total_wait += waited
+                            return waited
+                    if deadline is not None and (now >= deadline or (wait is not None and now + wait > deadline)):
+                        raise RateLimitExceeded(f"No capacity within {timeout:.0f} seconds")
+                    self._cond.wait(min(wait, 1.0) if wait is not None else 1.0)
+            finally:
+                self._remove(session_id, ticket)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            for bucket in (self.requests_per_minute, self.requests_per_day, self.tokens_per_minute):
+                bucket._refill(now)
+            return {
+                "granted": self.granted,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+                "rpm_available": self.requests_per_minute.tokens,
+                "rpd_available": self.requests_per_day.tokens,
+                "tpm_available": self.tokens_per_minute.tokens,
+            }
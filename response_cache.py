@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import threading
+import time
+
+# ---------------- Defaults ----------------
+DEFAULT_CACHE_DIR = os.environ.get("QA_CACHE_DIR", ".cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("QA_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+DEFAULT_TTL = int(os.environ.get("QA_CACHE_TTL", 7 * 24 * 3600))
+
+
+# ---------------- Disk-backed Response Cache ----------------
+class ResponseCache:
+    """Process-wide SQLite cache for LLM responses with TTL and LRU eviction"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 default_ttl=DEFAULT_TTL, filename="responses.sqlite3"):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, filename)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+
+    def get(self, key):
+        """Return cached value or None; expired entries count as misses"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def expires_in(self, key):
+        """Seconds until `key` expires (inf without a TTL), or None if it is not cached"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[0] is None:
+            return float("inf")
+        remaining = row[0] - time.time()
+        return remaining if remaining > 0 else None
+
+    def set(self, key, value, ttl=None):
+        """Store a value, then evict least recently used entries over the byte budget"""
+        if value is None:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Return hit/miss counters and current footprint"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# ---------------- Per-session Fallback ----------------
+class SessionCache:
+    """Dict-backed cache with the same interface, used for the per-session fallback.
+
+    `store` may be any mapping; a session_memory namespace keeps it under the session's cap.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.store:
+            self.hits += 1
+            return self.store[key]
+        self.misses += 1
+        return None
+
+    def __contains__(self, key):
+        return key in self.store
+
+    def expires_in(self, key):
+        return float("inf") if key in self.store else None
+
+    def set(self, key, value, ttl=None):
+        if value is not None:
+            self.store[key] = value
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+    def clear(self):
+        self.store.clear()
+
+    def nbytes(self):
+        # A session_memory namespace tracks its own size; reading values back would load spilled ones
+        nbytes = getattr(self.store, "nbytes", None)
+        if nbytes is not None:
+            return nbytes
+        return sum(len(v.encode("utf-8")) for v in self.store.values() if isinstance(v, str))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": 0,
+            "entries": len(self.store),
+            "bytes": self.nbytes(),
+            "max_bytes": None,
+        }
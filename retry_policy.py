@@ -0,0 +1,230 @@
+"""Retry, circuit breaking and model fallback for Gemini calls.
+
+Errors are classified by their typed status (`code`/`status` on google.genai
+errors) rather than by message text. Waits honor the server's Retry-After hint
+and otherwise use decorrelated jitter. A per-model circuit breaker shared by
+the whole process fails fast while a model keeps failing, and requests move to
+the next model in the fallback list instead of waiting for it to recover.
+"""
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# ---------------- Defaults ----------------
+# Multiplier for retry waits; the offline benchmark lowers it to keep runs short
+BACKOFF_SCALE = float(os.environ.get("QA_BACKOFF_SCALE", 1))
+DEFAULT_FALLBACK_MODELS = tuple(
+    model.strip() for model in os.environ.get("QA_FALLBACK_MODELS", "gemini-2.5-flash-lite").split(",") if model.strip()
+)
+DEFAULT_FAILURE_THRESHOLD = int(os.environ.get("QA_CIRCUIT_FAILURES", 3))
+DEFAULT_RESET_TIMEOUT = float(os.environ.get("QA_CIRCUIT_RESET_SECONDS", 30))
+MAX_WAIT = float(os.environ.get("QA_RETRY_MAX_WAIT", 30))
+BASE_WAIT = {"overloaded": 1.0, "rate_limit": 2.0, "fatal": 0.5, "other": 0.5}
+
+OVERLOADED_CODES = {500, 502, 503, 504}
+OVERLOADED_STATUSES = {"UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED"}
+FATAL_CODES = {400, 401, 403}
+FATAL_STATUSES = {"INVALID_ARGUMENT", "PERMISSION_DENIED", "UNAUTHENTICATED", "FAILED_PRECONDITION"}
+RETRY_DELAY = re.compile(r"""retryDelay['"]?\s*[:=]\s*['"]?(\d+(?:\.\d+)?)s""")
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API when every candidate model's circuit is open"""
+
+
+# ---------------- Error Classification ----------------
+def error_code(error):
+    """HTTP status of an API error, or None for errors without one"""
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """Map an API exception to 'overloaded', 'rate_limit', 'fatal' or 'other'.
+
+    Typed `code`/`status` attributes decide when present; errors without them
+    (transport failures, stubs) fall back to the message text.
+    """
+    code = error_code(error)
+    status = str(getattr(error, "status", "") or "").upper()
+    if code == 429 or status == "RESOURCE_EXHAUSTED":
+        return "rate_limit"
+    if code in OVERLOADED_CODES or status in OVERLOADED_STATUSES:
+        return "overloaded"
+    if code in FATAL_CODES or status in FATAL_STATUSES:
+        return "fatal"
+    if code is None and not status:
+        error_msg = str(error).lower()
+        if "503" in error_msg or "overloaded" in error_msg or "unavailable" in error_msg:
+            return "overloaded"
+        if "429" in error_msg:
+            return "rate_limit"
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return "overloaded"
+    return "other"
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header or RetryInfo), else None"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = RETRY_DELAY.search(str(getattr(error, "details", "") or error))
+    return float(match.group(1)) if match else None
+
+
+# ---------------- Circuit Breaker ----------------
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive upstream failures.
+
+    While open, calls are refused until `reset_timeout` has passed; then a single
+    probe is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self):
+        """Give back a half-open probe whose call never reached the model"""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+# ---------------- Retry Policy ----------------
+class RetryPolicy:
+    """Model selection and wait times for one process, shared by every call.
+
+    `fallback_models` are tried in order after the requested model when it is
+    overloaded, rate limited or its circuit is open.
+    """
+
+    def __init__(self, fallback_models=DEFAULT_FALLBACK_MODELS, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, max_wait=MAX_WAIT, seed=None):
+        self.fallback_models = tuple(fallback_models)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_wait = max_wait
+        self.fallbacks = 0
+        self.fast_failures = 0
+        self._breakers = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def select(self, model, avoid=()):
+        """First candidate whose circuit allows a call, preferring models not in `avoid`.
+
+        Raises CircuitOpenError when no candidate is available.
+        """
+        candidates = [model] + [fallback for fallback in self.fallback_models if fallback != model]
+        ordered = [m for m in candidates if m not in avoid] + [m for m in candidates if m in avoid]
+        for candidate in ordered:
+            if self.breaker(candidate).allow():
+                if candidate != model:
+                    with self._lock:
+                        self.fallbacks += 1
+                return candidate
+        with self._lock:
+            self.fast_failures += 1
+        raise CircuitOpenError(
+            f"{model} is unavailable (circuit open); try again in {self.reset_timeout:.0f} seconds"
+        )
+
+    def can_switch(self, model, avoid):
+        """Whether a candidate outside `avoid` currently has a closed circuit"""
+        candidates = [model] + list(self.fallback_models)
+        return any(m not in avoid and self.breaker(m).state == "closed" for m in candidates)
+
+    def record_success(self, model):
+        self.breaker(model).record_success()
+
+    def record_failure(self, model, kind):
+        # Only upstream trouble counts; other errors say nothing about the model's health
+        if kind in ("overloaded", "rate_limit"):
+            self.breaker(model).record_failure()
+        else:
+            self.breaker(model).release()
+
+    def backoff(self, kind, previous, error=None, switching=False):
+        """Seconds to wait before the next attempt.
+
+        A Retry-After hint is honored unless the next attempt goes to another model;
+        otherwise decorrelated jitter: uniform(base, 3 * previous wait), capped.
+        """
+        base = BASE_WAIT.get(kind, BASE_WAIT["other"])
+        hinted = retry_after(error) if error is not None and not switching else None
+        if hinted is not None:
+            wait = min(hinted, self.max_wait)
+        elif switching:
+            wait = base / 2
+        else:
+            with self._lock:
+                wait = min(self.max_wait, self._random.uniform(base, max(base, previous * 3)))
+        return wait * BACKOFF_SCALE
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            stats = {"fallbacks": self.fallbacks, "fast_failures": self.fast_failures}
+        stats["circuits"] = {
+            model: {"state": breaker.state, "trips": breaker.trips, "failures": breaker.failures}
+            for model, breaker in breakers.items()
+        }
+        return stats
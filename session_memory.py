@@ -0,0 +1,340 @@
+"""Per-session memory caps with a compressed spill-to-disk store.
+
+Large per-session values (the current document summary, Q&A and evaluation, and
+the session fallback response cache) live in a SessionMemory mapping instead of
+st.session_state. Each session tracks an
+approximate byte footprint. When it passes its cap, the least
+recently used values are compressed into a shared SQLite file and dropped from
+RAM. They are loaded back transparently when accessed again. A process-wide cap
+spills the coldest sessions first, so RSS stays flat however many sessions are
+connected. Values are treated as immutable: reassign a key after changing its value.
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from response_cache import DEFAULT_CACHE_DIR
+
+# ---------------- Defaults ----------------
+DEFAULT_SESSION_MAX_BYTES = int(os.environ.get("QA_SESSION_MEMORY_MAX_BYTES", 4 * 1024 * 1024))
+DEFAULT_PROCESS_MAX_BYTES = int(os.environ.get("QA_PROCESS_MEMORY_MAX_BYTES", 256 * 1024 * 1024))  # 0 = no cap
+DEFAULT_SPILL_TTL = int(os.environ.get("QA_SPILL_TTL", 24 * 3600))
+COMPRESSION_LEVEL = 6
+
+
+def value_size(value):
+    """Approximate payload bytes of a value (strings as UTF-8, containers summed)"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(value_size(key) + value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(value_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# ---------------- Spill Store ----------------
+class SpillStore:
+    """Process-wide SQLite file of zlib-compressed values, keyed by (session id, key).
+
+    Values are pickled. The file only ever holds this process's own session data,
+    and rows older than `ttl` are purged when the store is opened.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, filename="spill.sqlite3", ttl=DEFAULT_SPILL_TTL):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, filename)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spilled (
+                session_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (session_id, key)
+            )
+        """)
+        self.purge()
+
+    def put(self, session_id, key, value):
+        """Compress and store a value; returns the compressed size"""
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spilled (session_id, key, value, size, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, key, blob, len(blob), time.time())
+            )
+        return len(blob)
+
+    def take(self, session_id, key):
+        """Remove and return a stored value; raises KeyError if it is not there"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM spilled WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()
+            if row is None:
+                raise KeyError(key)
+            self._conn.execute("DELETE FROM spilled WHERE session_id = ? AND key = ?", (session_id, key))
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def delete(self, session_id, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM spilled WHERE session_id = ? AND key = ?", (session_id, key))
+
+    def drop_session(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM spilled WHERE session_id = ?", (session_id,))
+
+    def purge(self):
+        """Delete rows left behind by sessions that ended without cleaning up (e.g. a crash)"""
+        if not self.ttl:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM spilled WHERE stored_at <= ?", (time.time() - self.ttl,))
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM spilled"
+            ).fetchone()
+        return {"entries": count, "bytes": total}
+
+
+# ---------------- Session Memory ----------------
+class SessionMemory(MutableMapping):
+    """Mapping for one session's large values with a byte cap and LRU spilling.
+
+    Without a store (the spill file could not be opened) it behaves as a plain
+    dict and only tracks its footprint.
+    """
+
+    def __init__(self, session_id, store=None, max_bytes=DEFAULT_SESSION_MAX_BYTES, manager=None):
+        self.session_id = session_id
+        self.store = store
+        self.max_bytes = max_bytes
+        self.manager = manager
+        self.nbytes = 0
+        self.spills = 0
+        self.loads = 0
+        self.last_access = time.time()
+        self._hot = OrderedDict()  # key -> value, least recently used first
+        self._sizes = {}
+        self._spilled = set()
+        self._lock = threading.RLock()
+        if store is not None:
+            weakref.finalize(self, store.drop_session, session_id)
+
+    def __getitem__(self, key):
+        with self._lock:
+            self.last_access = time.time()
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                return self._hot[key]
+            if key not in self._spilled:
+                raise KeyError(key)
+            value = self.store.take(self.session_id, key)
+            self._spilled.discard(key)
+            self.loads += 1
+            self._keep(key, value, value_size(value))
+        self._enforce_process_cap()
+        return value
+
+    def __setitem__(self, key, value):
+        size = value_size(value)
+        with self._lock:
+            self.last_access = time.time()
+            self._forget(key)
+            self._keep(key, value, size)
+        self._enforce_process_cap()
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._hot and key not in self._spilled:
+                raise KeyError(key)
+            self._forget(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._hot or key in self._spilled
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._hot) + list(self._spilled))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hot) + len(self._spilled)
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+            if self._spilled and self.store is not None:
+                self.store.drop_session(self.session_id)
+            self._spilled.clear()
+
+    def _keep(self, key, value, size):
+        self._hot[key] = value
+        self._sizes[key] = size
+        self.nbytes += size
+        self.spill(self.max_bytes, keep=key)
+
+    def _forget(self, key):
+        if key in self._hot:
+            del self._hot[key]
+            self.nbytes -= self._sizes.pop(key)
+        elif key in self._spilled:
+            self._spilled.discard(key)
+            self.store.delete(self.session_id, key)
+
+    def spill(self, target_bytes=0, keep=None):
+        """Move least recently used values to disk until at most `target_bytes` stay in RAM.
+
+        `keep` is spilled last, and only when it alone is over the target. Returns the bytes freed.
+        """
+        if self.store is None:
+            return 0
+        freed = 0
+        with self._lock:
+            for key in [key for key in self._hot if key != keep] + ([keep] if keep in self._hot else []):
+                if self.nbytes <= target_bytes:
+                    break
+                try:
+                    self.store.put(self.session_id, key, self._hot[key])
+                except Exception:
+                    continue  # unserializable value or disk trouble: keep it in memory
+                del self._hot[key]
+                size = self._sizes.pop(key)
+                self.nbytes -= size
+                freed += size
+                self._spilled.add(key)
+                self.spills += 1
+        return freed
+
+    def _enforce_process_cap(self):
+        if self.manager is not None:
+            self.manager.enforce(exclude=self)
+
+    def namespace(self, prefix):
+        """View of the keys under `prefix`, sharing this session's cap"""
+        return Namespace(self, prefix)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hot_entries": len(self._hot),
+                "spilled_entries": len(self._spilled),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "spills": self.spills,
+                "loads": self.loads,
+            }
+
+
+class Namespace(MutableMapping):
+    """Prefixed view of a SessionMemory, so several caches can share one session budget"""
+
+    def __init__(self, memory, prefix):
+        self.memory = memory
+        self.prefix = f"{prefix}:"
+
+    def __getitem__(self, key):
+        return self.memory[self.prefix + key]
+
+    def __setitem__(self, key, value):
+        self.memory[self.prefix + key] = value
+
+    def __delitem__(self, key):
+        del self.memory[self.prefix + key]
+
+    def __contains__(self, key):
+        return self.prefix + key in self.memory
+
+    def __iter__(self):
+        return (key[len(self.prefix):] for key in self.memory if key.startswith(self.prefix))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    @property
+    def nbytes(self):
+        with self.memory._lock:
+            return sum(size for key, size in self.memory._sizes.items() if key.startswith(self.prefix))
+
+
+# ---------------- Manager ----------------
+class MemoryManager:
+    """Creates SessionMemory objects and keeps the sum of their RAM footprint under a process cap.
+
+    Sessions are held weakly: when Streamlit drops a session's state its memory is
+    collected and its spilled rows are deleted.
+    """
+
+    def __init__(self, store=None, session_max_bytes=DEFAULT_SESSION_MAX_BYTES,
+                 process_max_bytes=DEFAULT_PROCESS_MAX_BYTES):
+        self.store = store
+        self.session_max_bytes = session_max_bytes
+        self.process_max_bytes = process_max_bytes
+        self._sessions = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def session(self, session_id):
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = SessionMemory(session_id, self.store, self.session_max_bytes, manager=self)
+                self._sessions[session_id] = memory
+            return memory
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def enforce(self, exclude=None):
+        """Spill the coldest sessions until the process total is under the cap"""
+        if not self.process_max_bytes or self.store is None:
+            return
+        sessions = self._snapshot()
+        total = sum(memory.nbytes for memory in sessions)
+        if total <= self.process_max_bytes:
+            return
+        for memory in sorted(sessions, key=lambda memory: memory.last_access):
+            if memory is exclude:
+                continue
+            total -= memory.spill(0)
+            if total <= self.process_max_bytes:
+                return
+        if exclude is not None:
+            exclude.spill(max(0, exclude.nbytes - (total - self.process_max_bytes)))
+
+    def stats(self):
+        sessions = self._snapshot()
+        spilled = self.store.stats() if self.store is not None else {"entries": 0, "bytes": 0}
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(memory.nbytes for memory in sessions),
+            "max_bytes": self.process_max_bytes,
+            "spilled_entries": spilled["entries"],
+            "spilled_bytes": spilled["bytes"],
+            "spills": sum(memory.spills for memory in sessions),
+            "loads": sum(memory.loads for memory in sessions),
+        }
@@ -0,0 +1,215 @@
+"""Near-duplicate lookup for generation requests.
+
+Requests are normalized (case, whitespace, punctuation, URLs and common job-ad
+boilerplate), reduced to a MinHash signature over word shingles and indexed with
+LSH banding in SQLite. A lookup returns the cache key of an earlier request whose
+estimated Jaccard similarity reaches the threshold, so its response can be reused.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from random import Random
+
+from response_cache import DEFAULT_CACHE_DIR
+
+# ---------------- Defaults ----------------
+DEFAULT_THRESHOLD = float(os.environ.get("QA_SIMILARITY_THRESHOLD", 0.8))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("QA_SIMILARITY_MAX_ENTRIES", 20000))
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_WORDS = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = Random(1)  # fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [
+    (_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+# Sentences that job ads repeat verbatim and that say nothing about the role
+BOILERPLATE = re.compile(
+    r"[^.\n]*(?:equal opportunity employer|without regard to (?:race|age|gender)|"
+    r"reasonable accommodation|apply now|click apply|all rights reserved|"
+    r"privacy (?:policy|notice))[^.\n]*[.\n]?",
+    re.IGNORECASE
+)
+URLS_AND_EMAILS = re.compile(r"https?://\S+|www\.\S+|\S+@\S+\.\w+")
+NON_WORD = re.compile(r"[^\w+#]+")
+
+
+# ---------------- Fingerprints ----------------
+def normalize_text(text):
+    """Lowercase, drop boilerplate, links and punctuation, collapse whitespace"""
+    text = BOILERPLATE.sub(" ", text or "")
+    text = URLS_AND_EMAILS.sub(" ", text)
+    return NON_WORD.sub(" ", text.lower()).strip()
+
+
+def shingle_hashes(normalized, size=SHINGLE_WORDS):
+    """64-bit hashes of overlapping word n-grams (the whole text if it is shorter)"""
+    words = normalized.split()
+    if len(words) <= size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return [
+        struct.unpack("<Q", hashlib.blake2b(shingle.encode(), digest_size=8).digest())[0]
+        for shingle in shingles
+    ]
+
+
+def minhash_signature(hashes):
+    """NUM_PERM minimum values under fixed universal hash permutations"""
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_similarity(signature, other):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
+
+
+def band_keys(signature, bands=BANDS):
+    rows = len(signature) // bands
+    return [
+        hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest()
+        for band in range(bands)
+    ]
+
+
+# ---------------- LSH Index ----------------
+class SimilarityIndex:
+    """SQLite-backed MinHash LSH index from request text to a response cache key.
+
+    `scope` partitions the index: only requests with the same scope (for example the
+    same interview settings and resume) are compared. A threshold of 0 disables lookups.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, threshold=DEFAULT_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ENTRIES, filename="similarity.sqlite3"):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, filename)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self.identical_hits = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                value_key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (scope, value_key)
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                bucket TEXT NOT NULL,
+                entry_id INTEGER NOT NULL REFERENCES signatures(id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_bands_bucket ON bands(bucket);
+            CREATE INDEX IF NOT EXISTS idx_bands_entry ON bands(entry_id);
+        """)
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    @staticmethod
+    def _signature(text):
+        return minhash_signature(shingle_hashes(normalize_text(text)))
+
+    @staticmethod
+    def _buckets(scope, signature):
+        # Band number and scope are part of the bucket so unrelated scopes never collide
+        return [f"{scope}:{band}:{key}" for band, key in enumerate(band_keys(signature))]
+
+    def add(self, scope, text, value_key):
+        """Index `text` as answered by the response stored under `value_key`"""
+        signature = self._signature(text)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM signatures WHERE scope = ? AND value_key = ?", (scope, value_key)
+                )
+                cursor = self._conn.execute(
+                    "INSERT INTO signatures (scope, value_key, signature, created_at) VALUES (?, ?, ?, ?)",
+                    (scope, value_key, struct.pack(f"<{NUM_PERM}Q", *signature), time.time())
+                )
+                self._conn.executemany(
+                    "INSERT INTO bands (bucket, entry_id) VALUES (?, ?)",
+                    [(bucket, cursor.lastrowid) for bucket in self._buckets(scope, signature)]
+                )
+                self._prune()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.stores += 1
+
+    def _prune(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM signatures WHERE id IN (SELECT id FROM signatures ORDER BY created_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def find(self, scope, text, exclude=None):
+        """Return (value_key, similarity) for the most similar indexed request, or None.
+
+        Only candidates sharing at least one LSH band are scored; `exclude` skips a key
+        (typically the request's own exact cache key).
+        """
+        if self.threshold <= 0:
+            return None
+        signature = self._signature(text)
+        buckets = self._buckets(scope, signature)
+        with self._lock:
+            self.lookups += 1
+            rows = self._conn.execute(
+                f"""SELECT DISTINCT s.value_key, s.signature FROM bands b
+                    JOIN signatures s ON s.id = b.entry_id
+                    WHERE b.bucket IN ({", ".join("?" * len(buckets))})""",
+                buckets
+            ).fetchall()
+
+        best = None
+        for value_key, blob in rows:
+            if value_key == exclude:
+                continue
+            similarity = estimate_similarity(signature, struct.unpack(f"<{NUM_PERM}Q", blob))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (value_key, similarity)
+        if best is not None:
+            with self._lock:
+                self.hits += 1
+                self.identical_hits += best[1] == 1.0  # same text after normalization
+        return best
+
+    def discard(self, value_key):
+        """Forget a key whose response is no longer cached"""
+        with self._lock:
+            self._conn.execute("DELETE FROM signatures WHERE value_key = ?", (value_key,))
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "identical_hits": self.identical_hits,
+                "hit_ratio": self.hits / self.lookups if self.lookups else 0.0,
+                "stores": self.stores,
+                "entries": entries,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+# ---------------- Request Coalescing ----------------
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key (the leader) does the work; callers arriving while
+    it is running wait on the same Future and receive its result or exception.
+    Works across threads and the async runner since both share concurrent Futures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    def begin(self, key):
+        """Register interest in `key`; returns (future, is_leader)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.executed += 1
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        """Publish the leader's outcome and release the key"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(self._shareable(error))
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _shareable(error):
+        # Interrupts (rerun, cancellation) belong to the leader; waiters get a plain error
+        if isinstance(error, Exception):
+            return error
+        return RuntimeError("Coalesced request was interrupted")
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per concurrent key; returns (result, shared)"""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result=result)
+        return result, False
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """Async variant of do(); coro_fn is called only by the leader"""
+        future, leader = self.begin(key)
+        if not leader:
+            return await asyncio.wrap_future(future), True
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result=result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "in_flight": in_flight,
+        }
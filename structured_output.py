@@ -0,0 +1,140 @@
+"""Schema-constrained JSON responses.
+
+Schemas use a small JSON Schema subset (type, properties, required, items, enum,
+minimum, maximum, minItems) that Gemini's `response_schema` also accepts. Responses
+are parsed with orjson when it is installed, validated locally, and an invalid one
+gets a single short repair request instead of a full retry of the original prompt.
+"""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib parser is used instead
+    orjson = None
+
+from gemini_async import call_gemini_async
+
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+_PYTHON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+class SchemaError(ValueError):
+    """Response is not JSON or does not match its schema"""
+
+
+# ---------------- Parsing & Validation ----------------
+def loads(text):
+    text = CODE_FENCE.sub("", (text or "").strip())
+    try:
+        return orjson.loads(text) if orjson is not None else json.loads(text)
+    except ValueError as e:  # orjson.JSONDecodeError is a ValueError too
+        raise SchemaError(f"invalid JSON: {e}") from None
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def validate(value, schema, path="$"):
+    """Return `value` if it matches `schema`, else raise SchemaError naming the first bad path"""
+    expected = schema.get("type")
+    if expected:
+        is_bool = isinstance(value, bool)
+        if not isinstance(value, _PYTHON_TYPES[expected]) or (is_bool and expected != "boolean"):
+            raise SchemaError(f"{path}: expected {expected}, got {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise SchemaError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if "minimum" in schema and value < schema["minimum"]:
+        raise SchemaError(f"{path}: {value} is below {schema['minimum']}")
+    if "maximum" in schema and value > schema["maximum"]:
+        raise SchemaError(f"{path}: {value} is above {schema['maximum']}")
+
+    if expected == "object":
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise SchemaError(f"{path}: missing '{key}'")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                validate(value[key], subschema, f"{path}.{key}")
+    elif expected == "array":
+        if len(value) < schema.get("minItems", 0):
+            raise SchemaError(f"{path}: expected at least {schema['minItems']} items")
+        for idx, item in enumerate(value):
+            validate(item, schema.get("items", {}), f"{path}[{idx}]")
+    return value
+
+
+def parse_response(text, schema):
+    return validate(loads(text), schema)
+
+
+# ---------------- Gemini Request Config ----------------
+def to_gemini_schema(schema):
+    """Gemini spells types in upper case; everything else in the subset maps directly"""
+    converted = {}
+    for key, value in schema.items():
+        if key == "type":
+            converted[key] = value.upper()
+        elif key == "properties":
+            converted[key] = {name: to_gemini_schema(sub) for name, sub in value.items()}
+        elif key == "items":
+            converted[key] = to_gemini_schema(value)
+        else:
+            converted[key] = value
+    return converted
+
+
+def json_config(schema):
+    return {"response_mime_type": "application/json", "response_schema": to_gemini_schema(schema)}
+
+
+def build_repair_prompt(schema, response_text, error):
+    """Short follow-up that sends only the bad response, not the original prompt"""
+    return f"""
+The JSON below does not match the required schema: {error}
+
+Return ONLY the corrected JSON. Keep the existing content wherever it is valid.
+
+Schema:
+{json.dumps(schema)}
+
+JSON:
+{response_text}
+"""
+
+
+# ---------------- Structured Calls ----------------
+async def call_json_async(client, model, prompt, schema, cache=None, cache_key=None, **call_kwargs):
+    """Call Gemini in JSON mode and return the validated value.
+
+    An invalid response triggers one repair request; the repaired JSON replaces the
+    cached response. Raises SchemaError if the repair is invalid too. `call_kwargs`
+    are passed to call_gemini_async (retries, rate limiter, single-flight, ...).
+    """
+    config = json_config(schema)
+    text = await call_gemini_async(
+        client, model, prompt, cache=cache, cache_key=cache_key, config=config, **call_kwargs
+    )
+    try:
+        return parse_response(text, schema)
+    except SchemaError as error:
+        if cache is not None and cache_key:
+            cache.delete(cache_key)
+        repaired = await call_gemini_async(
+            client, model, build_repair_prompt(schema, text, error), config=config, **call_kwargs
+        )
+        value = parse_response(repaired, schema)
+        if cache is not None and cache_key:
+            cache.set(cache_key, dumps(value))
+        return value
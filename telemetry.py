@@ -0,0 +1,229 @@
+"""Latency spans and counters with Prometheus text exposition.
+
+Off unless QA_TELEMETRY is set. While off, `span()` hands back a shared no-op
+context manager, `incr()` returns immediately and `traced()` leaves functions
+undecorated, so instrumented code pays (almost) nothing. While on, span
+durations go into per-stage histograms and a short ring buffer of recent spans
+for the in-app debug panel. Metrics can be served over HTTP (QA_METRICS_PORT)
+or written to a file (QA_METRICS_FILE).
+"""
+import functools
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- Defaults ----------------
+ENABLED = os.environ.get("QA_TELEMETRY", "").lower() in ("1", "true", "yes", "on")
+METRICS_PORT = int(os.environ.get("QA_METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("QA_METRICS_HOST", "127.0.0.1")  # 0.0.0.0 to let a remote Prometheus scrape
+METRICS_FILE = os.environ.get("QA_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = int(os.environ.get("QA_METRICS_FILE_INTERVAL", 15))
+RECENT_SPANS = 200
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_NOOP = nullcontext()
+
+
+# ---------------- Registry ----------------
+class Registry:
+    """Thread-safe counters, latency histograms and extra exposition sources"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)  # (name, labels) -> value
+        self._histograms = {}  # labels -> [bucket counts..., sum, count]
+        self._collectors = {}
+        self.recent = deque(maxlen=RECENT_SPANS)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, stage, seconds, **labels):
+        key = tuple(sorted({"stage": stage, **labels}.items()))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            for idx, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[idx] += 1
+                    break
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            self.recent.append((time.time(), stage, labels, seconds))
+
+    def register_collector(self, name, fn):
+        """Add a callable returning extra exposition text (replaces one of the same name)"""
+        with self._lock:
+            self._collectors[name] = fn
+
+    def stage_summary(self):
+        """{stage: {"count", "p50", "p95", "max"}} from the recent-span buffer, in seconds"""
+        with self._lock:
+            recent = list(self.recent)
+        by_stage = defaultdict(list)
+        for _, stage, _, seconds in recent:
+            by_stage[stage].append(seconds)
+        summary = {}
+        for stage, samples in by_stage.items():
+            samples.sort()
+            summary[stage] = {
+                "count": len(samples),
+                "p50": samples[len(samples) // 2],
+                "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "max": samples[-1],
+            }
+        return summary
+
+    def metrics_text(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+        if histograms:
+            lines.append("# HELP qa_stage_seconds Latency of instrumented stages")
+            lines.append("# TYPE qa_stage_seconds histogram")
+            for labels, values in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, values):
+                    cumulative += count
+                    lines.append(f"qa_stage_seconds_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"qa_stage_seconds_bucket{_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                lines.append(f"qa_stage_seconds_sum{_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"qa_stage_seconds_count{_labels(labels)} {values[-1]}")
+        text = "\n".join(lines) + "\n" if lines else ""
+        for collector in collectors:
+            try:
+                text += collector()
+            except Exception:
+                pass  # a broken source must not take the endpoint down
+        return text
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def stats_text(name, stats):
+    """Numeric entries of a component's stats() dict as `qa_<name>_<key>` gauges"""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metric = f"qa_{name}_{key}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:g}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+registry = Registry()
+
+
+# ---------------- Spans ----------------
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry.observe(self.stage, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            registry.incr("qa_stage_errors_total", stage=self.stage)
+        return False
+
+
+def span(stage, **labels):
+    """Context manager timing one stage (no-op while telemetry is off)"""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, labels)
+
+
+def incr(name, value=1, **labels):
+    if ENABLED:
+        registry.incr(name, value, **labels)
+
+
+def traced(stage):
+    """Decorator timing every call of a function; returns it unchanged while telemetry is off"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(stage, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------------- Exposition ----------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.metrics_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would otherwise flood stderr
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics on a daemon thread; returns the server, or None if the port is 0"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_file_sink(path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    """Rewrite `path` with the current metrics every `interval` seconds (node_exporter textfile style)"""
+    if not path:
+        return None
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            write_metrics_file(path)
+
+    threading.Thread(target=run, name="metrics-file", daemon=True).start()
+    return stop
+
+
+def write_metrics_file(path):
+    # Write then rename so a scraper never reads a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.metrics_text())
+    os.replace(tmp_path, path)
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from interview_core import InterviewEngine, batch_qas_from_json, get_qas_cache_key
+from mock_gemini import MockGeminiClient
+from response_cache import ResponseCache
+from structured_output import SchemaError
+
+COMBINATIONS = [("Technical", "Easy", "Fresher"), ("Behavioral", "Hard", "Senior")]
+
+
+def make_engine(tmp_path, **client_options):
+    client = MockGeminiClient(latency=0, jitter=0, seed=1, **client_options)
+    return client, InterviewEngine(client, cache=ResponseCache(cache_dir=str(tmp_path)), max_retries=1)
+
+
+def test_batch_is_split_and_cached_per_combination(tmp_path):
+    client, engine = make_engine(tmp_path)
+    results = asyncio.run(engine.generate_qas_batch("Data Engineer", "", COMBINATIONS))
+    assert set(results) == set(COMBINATIONS)
+    assert results[COMBINATIONS[0]].startswith("Q1. Describe")
+    for combination in COMBINATIONS:
+        assert engine.is_cached(get_qas_cache_key("Data Engineer", "", *combination))
+    assert client.calls == 1
+
+
+def test_malformed_batch_is_not_served_from_cache(tmp_path):
+    client, engine = make_engine(tmp_path, invalid_json_rate=1.0)
+    for _ in range(3):
+        with pytest.raises(SchemaError):
+            asyncio.run(engine.generate_qas_batch("Data Engineer", "", COMBINATIONS))
+    # Each attempt reaches the API again: the request and its one repair
+    assert client.calls == 6
+    assert engine.cache.stats()["entries"] == 0
+
+
+def test_batch_keys_are_lowercased():
+    value = [{"category": " Technical", "difficulty": "EASY", "experience_level": "Fresher",
+              "questions": [{"question": " Why? ", "answer": "Because. "}]}]
+    assert batch_qas_from_json(value) == {("technical", "easy", "fresher"): "Q1. Why?\nA1. Because."}
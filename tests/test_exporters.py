@@ -0,0 +1,61 @@
+import csv
+import glob
+import io
+import json
+import os
+import tempfile
+
+import exporters
+
+ENTRY = {
+    "timestamp": "2026-01-01 09:00:00",
+    "job_or_jd": "Data Engineer",
+    "document_summary": "",
+    "category": "Technical",
+    "difficulty": "Easy",
+    "experience_level": "Fresher",
+    "qas": "Q1. What is Kafka?\nA1. A distributed log.",
+    "evaluations": [{"question": "What is Kafka?", "user_answer": "A queue", "feedback": "Close"}],
+}
+
+
+def test_iter_export_yields_header_then_one_chunk_per_session():
+    chunks = list(exporters.iter_export([ENTRY, ENTRY], "txt"))
+    assert len(chunks) == 3
+    assert "INTERVIEW Q&A SESSION HISTORY" in chunks[0]
+    assert "SESSION 2" in chunks[2]
+    assert "Feedback:\nClose" in chunks[1]
+
+
+def test_iter_export_accepts_a_generator():
+    history = (entry for entry in [ENTRY])
+    assert exporters.export_to_jsonl(history).count("\n") == 1
+
+
+def test_jsonl_lines_round_trip():
+    lines = exporters.export_to_jsonl([ENTRY, ENTRY]).splitlines()
+    assert [json.loads(line)["session"] for line in lines] == [1, 2]
+    assert json.loads(lines[0])["evaluations"] == ENTRY["evaluations"]
+
+
+def test_csv_has_header_and_embeds_evaluations():
+    rows = list(csv.reader(io.StringIO(exporters.export_to_csv([ENTRY]))))
+    assert rows[0] == exporters.CSV_COLUMNS
+    row = dict(zip(rows[0], rows[1]))
+    assert row["qas"] == ENTRY["qas"]  # multi-line values survive quoting
+    assert row["evaluation_count"] == "1"
+    assert json.loads(row["evaluations"]) == ENTRY["evaluations"]
+
+
+def test_empty_history_exports_nothing():
+    assert exporters.export_to_text([]) is None
+    assert exporters.export_to_csv([]) is None
+
+
+def test_export_bytes_streams_through_a_removed_temp_file():
+    pattern = os.path.join(tempfile.gettempdir(), "interview_history_*.txt")
+    before = set(glob.glob(pattern))
+    text = exporters.export_bytes(iter([ENTRY]), "txt").decode("utf-8")
+    assert text.startswith("=" * 80)
+    assert text.endswith(exporters.render_text_session(1, ENTRY))
+    assert set(glob.glob(pattern)) == before
@@ -0,0 +1,124 @@
+import pytest
+
+from history_store import HistoryStore
+
+
+def make_entry(job_or_jd, qas="Q1. What is a topic?\nA1. An append-only log.", category="Technical",
+               timestamp="2026-01-01 09:00:00", evaluations=()):
+    return {
+        "timestamp": timestamp,
+        "job_or_jd": job_or_jd,
+        "document_summary": "",
+        "category": category,
+        "difficulty": "Medium",
+        "experience_level": "Mid-level",
+        "qas": qas,
+        "pairs": [{"number": 1, "question": "What is a topic?", "answer": "An append-only log."}],
+        "evaluations": list(evaluations),
+    }
+
+
+@pytest.fixture
+def store():
+    return HistoryStore(":memory:")
+
+
+# ---------------- Sessions ----------------
+def test_sessions_are_listed_newest_first_and_paginated(store):
+    for idx in range(5):
+        store.add_session("u1", make_entry(f"Role {idx}", timestamp=f"2026-01-0{idx + 1} 09:00:00"))
+    page = store.list_sessions("u1", limit=2, offset=2)
+    assert [entry["timestamp"][:10] for entry in page] == ["2026-01-03", "2026-01-02"]
+    assert set(page[0]) == {"id", "timestamp", "category", "difficulty", "experience_level"}
+
+
+def test_filters_apply_to_count_and_listing(store):
+    store.add_session("u1", make_entry("A", category="Technical"))
+    store.add_session("u1", make_entry("B", category="Behavioral"))
+    filters = {"category": "Behavioral"}
+    assert store.count_sessions("u1", filters) == 1
+    assert [entry["category"] for entry in store.list_sessions("u1", filters=filters)] == ["Behavioral"]
+
+
+def test_full_entry_round_trips_pairs_and_evaluations(store):
+    evaluation = {"question": "What is a topic?", "user_answer": "A log", "feedback": "Good", "result": {"overall": 7}}
+    session_id = store.add_session("u1", make_entry("Data Engineer", evaluations=[evaluation]))
+    entry = store.get_session("u1", session_id)
+    assert entry["pairs"][0]["answer"] == "An append-only log."
+    assert entry["evaluations"] == [evaluation]
+    assert "user_id" not in entry
+
+
+def test_sessions_are_private_to_their_user(store):
+    session_id = store.add_session("u1", make_entry("Data Engineer"))
+    assert store.get_session("u2", session_id) is None
+    with pytest.raises(KeyError):
+        store.add_evaluation("u2", session_id, {"question": "q", "user_answer": "a", "feedback": "f"})
+    assert store.count_sessions("u2") == 0
+
+
+def test_iter_sessions_streams_oldest_first_across_batches(store):
+    ids = [store.add_session("u1", make_entry(f"Role {idx}")) for idx in range(7)]
+    store.add_session("u2", make_entry("Other"))
+    assert [entry["id"] for entry in store.iter_sessions("u1", batch_size=3)] == ids
+
+
+def test_clear_removes_sessions_and_their_search_entries(store):
+    store.add_session("u1", make_entry("Kafka engineer", evaluations=[
+        {"question": "q", "user_answer": "a", "feedback": "kafka feedback"}
+    ]))
+    store.clear("u1")
+    assert store.count_sessions("u1") == 0
+    assert store.count_evaluations("u1") == 0
+    assert store.search("u1", "kafka") == []
+
+
+# ---------------- Search ----------------
+def test_search_ranks_and_highlights_matches(store):
+    store.add_session("u1", make_entry("Kafka engineer", qas="Q1. How does Kafka partition a topic?\nA1. By key."))
+    store.add_session("u1", make_entry("Java developer"))
+    hits = store.search("u1", "kafka")
+    assert len(hits) == 1
+    assert "**Kafka**" in hits[0]["snippet"]
+
+
+def test_search_matches_evaluation_feedback(store):
+    session_id = store.add_session("u1", make_entry("Data Engineer"))
+    store.add_evaluation("u1", session_id, {"question": "q", "user_answer": "a", "feedback": "Mention idempotency"})
+    assert [hit["id"] for hit in store.search("u1", "idempotency")] == [session_id]
+
+
+def test_search_stems_terms_and_requires_all_of_them(store):
+    store.add_session("u1", make_entry("Kafka partitioning for streaming"))
+    assert store.search("u1", "partitioned") != []
+    assert store.search("u1", "kafka spark") == []
+
+
+def test_search_ignores_stopwords_unless_nothing_else_is_left(store):
+    store.add_session("u1", make_entry("Kafka engineer", qas="Q1. What is the log?\nA1. An ordered record."))
+    assert store.search("u1", "kafka in the") != []
+    assert store.search("u1", "the") != []
+
+
+def test_search_is_limited_to_the_exact_owner(store):
+    # "abc-def" tokenizes to "abc" and "def", so the FTS owner token alone would match "abc"
+    store.add_session("abc-def", make_entry("kafka secret", evaluations=[
+        {"question": "q", "user_answer": "a", "feedback": "kafka secret feedback"}
+    ]))
+    own_id = store.add_session("abc", make_entry("kafka public"))
+    hits = store.search("abc", "kafka")
+    assert [hit["id"] for hit in hits] == [own_id]
+    assert "secret" not in hits[0]["snippet"]
+
+
+def test_search_keeps_the_owners_hits_when_others_rank_higher(store):
+    for _ in range(5):
+        store.add_session("abc-def", make_entry("kafka kafka kafka kafka"))
+    own_id = store.add_session("abc", make_entry("kafka"))
+    assert [hit["id"] for hit in store.search("abc", "kafka", limit=2)] == [own_id]
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "kafka OR", "col:umn", "*", "NEAR(", "   "])
+def test_search_treats_query_syntax_as_text(store, query):
+    store.add_session("u1", make_entry("Kafka engineer"))
+    assert isinstance(store.search("u1", query), list)
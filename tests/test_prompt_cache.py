@@ -0,0 +1,72 @@
+from mock_gemini import MockGeminiClient, MockResponse
+from prompt_cache import PrefixCache
+from rate_limiter import RateLimiter
+from retry_policy import RetryPolicy
+
+PREFIX = "Static instructions and resume context. " * 20  # about 200 tokens
+PROMPT = PREFIX + "Category: Technical"
+
+
+def make_cache(**options):
+    client = MockGeminiClient(latency=0, jitter=0, seed=1)
+    options.setdefault("min_tokens", 100)
+    return client, PrefixCache(client, "main", ttl=600, **options)
+
+
+# ---------------- Registration ----------------
+def test_prefix_is_registered_on_its_second_sighting_and_reused():
+    client, cache = make_cache()
+    assert cache.request(PROMPT, PREFIX) == (PROMPT, None)
+    text, config = cache.request(PROMPT, PREFIX, {"temperature": 0})
+    assert text == "Category: Technical"
+    assert config == {"temperature": 0, "cached_content": "cachedContents/mock-1"}
+    cache.request(PROMPT, PREFIX)
+    assert client.cache_creations == 1
+    assert (cache.stats()["created"], cache.stats()["reused"]) == (1, 1)
+
+
+def test_short_prefixes_and_a_zero_ttl_are_sent_inline():
+    client, cache = make_cache(min_tokens=10_000, min_sightings=1)
+    assert cache.request(PROMPT, PREFIX) == (PROMPT, None)
+    disabled = PrefixCache(client, "main", ttl=0, min_tokens=1, min_sightings=1)
+    assert disabled.request(PROMPT, PREFIX) == (PROMPT, None)
+    assert client.cache_creations == 0
+
+
+def test_prompt_without_the_prefix_is_sent_unchanged():
+    _, cache = make_cache(min_sightings=1)
+    assert cache.request("Other prompt", PREFIX) == ("Other prompt", None)
+
+
+def test_invalidated_handles_are_registered_again():
+    client, cache = make_cache(min_sightings=1)
+    cache.handle(PREFIX)
+    cache.invalidate(PREFIX)
+    assert cache.handle(PREFIX) == "cachedContents/mock-2"
+    assert client.cache_creations == 2
+
+
+# ---------------- Shared budgets ----------------
+def test_registration_is_skipped_without_rate_limit_capacity():
+    limiter = RateLimiter(rpm=1, rpd=100, tpm=10 ** 6)
+    limiter.acquire("s")
+    client, cache = make_cache(min_sightings=1, rate_limiter=limiter)
+    assert cache.handle(PREFIX) is None
+    assert cache.stats()["skipped"] == 1
+    assert client.cache_creations == 0
+
+
+def test_registration_is_skipped_while_the_circuit_is_open():
+    policy = RetryPolicy(fallback_models=(), failure_threshold=1, reset_timeout=60)
+    policy.record_failure("main", "overloaded")
+    client, cache = make_cache(min_sightings=1, retry_policy=policy)
+    assert cache.handle(PREFIX) is None
+    assert client.cache_creations == 0
+
+
+# ---------------- Usage ----------------
+def test_cached_tokens_are_read_from_usage_metadata():
+    _, cache = make_cache()
+    assert cache.record(MockResponse("answer", prompt_tokens=1000, cached_tokens=800)) == 800
+    cache.record(MockResponse("answer", prompt_tokens=1000))
+    assert cache.stats()["saved_ratio"] == 0.4
@@ -0,0 +1,96 @@
+from interview_core import parse_qas, parse_qas_output, render_qas, split_complete_pairs
+
+
+def questions_and_answers(text):
+    return [(pair["number"], pair["question"], pair["answer"]) for pair in parse_qas(text)]
+
+
+# ---------------- parse_qas ----------------
+def test_bold_markers():
+    text = "**Q1.** What is Kafka?\n**A1.** A distributed log.\n\n**Q2.** Why partitions?\n**A2.** Parallelism."
+    assert questions_and_answers(text) == [
+        (1, "What is Kafka?", "A distributed log."),
+        (2, "Why partitions?", "Parallelism."),
+    ]
+
+
+def test_colon_markers():
+    text = "Q1: What is X?\nA1: It is Y.\nQ2: And Z?\nA2: W."
+    assert questions_and_answers(text) == [(1, "What is X?", "It is Y."), (2, "And Z?", "W.")]
+
+
+def test_lowercase_parenthesis_markers():
+    text = "q1) First?\na1) One.\nq2) Second?\na2) Two."
+    assert questions_and_answers(text) == [(1, "First?", "One."), (2, "Second?", "Two.")]
+
+
+def test_inline_markers():
+    text = "Q1: What? A1: That. Q2: Next? A2: This."
+    assert questions_and_answers(text) == [(1, "What?", "That."), (2, "Next?", "This.")]
+
+
+def test_quarter_names_inside_an_answer_are_not_markers():
+    text = "Q1: Describe revenue.\nA1: Compare Q3 earnings with Q2 guidance.\nQ2: Next?\nA2: Done."
+    assert questions_and_answers(text) == [
+        (1, "Describe revenue.", "Compare Q3 earnings with Q2 guidance."),
+        (2, "Next?", "Done."),
+    ]
+
+
+def test_text_before_the_first_question_is_ignored():
+    assert questions_and_answers("Here are your questions:\nQ1: A?\nA1: B.") == [(1, "A?", "B.")]
+
+
+def test_more_than_nine_pairs():
+    text = "\n".join(f"Q{n}: Question {n}?\nA{n}: Answer {n}." for n in range(1, 13))
+    pairs = parse_qas(text)
+    assert [pair["number"] for pair in pairs] == list(range(1, 13))
+    assert pairs[-1]["answer"] == "Answer 12."
+
+
+def test_unparseable_text_is_passed_through():
+    assert parse_qas("Just some text with no markers.") == []
+    assert parse_qas_output("  Just some text.  ") == ([], "Just some text.")
+    assert parse_qas_output("") == ([], "")
+
+
+def test_parsed_output_is_rendered():
+    pairs, markdown = parse_qas_output("Q1: What?\nA1: That.")
+    assert pairs == [{"number": 1, "question": "What?", "answer": "That."}]
+    assert "What?" in markdown and "That." in markdown
+
+
+
+def test_multi_line_answers_are_kept_whole():
+    text = "Q1: Explain joins?\nA1: Two kinds:\n- inner\n- outer\n\nQ2: Next?\nA2: Done."
+    assert parse_qas(text)[0]["answer"] == "Two kinds:\n- inner\n- outer"
+
+
+def test_an_answer_marker_must_match_its_question():
+    text = "Q1: First?\nA2: Wrong number.\nA1: Right one."
+    assert questions_and_answers(text) == [(1, "First?\nA2: Wrong number.", "Right one.")]
+
+
+def test_rendered_pairs_parse_back_unchanged():
+    pairs = parse_qas("**Q1)** What?\n**A1)** That.\nQ2: Why?\nA2: Because.")
+    assert parse_qas(render_qas(pairs)) == pairs
+
+# ---------------- split_complete_pairs ----------------
+def test_split_keeps_the_last_pair_pending():
+    done, pending = split_complete_pairs("Q1: a\nA1: b\nQ2: c\nA2: d")
+    assert done == ["Q1: a\nA1: b\n"]
+    assert pending == "Q2: c\nA2: d"
+
+
+def test_split_with_a_single_unfinished_pair():
+    assert split_complete_pairs("Q1: a\nA1: partial") == ([], "Q1: a\nA1: partial")
+
+
+def test_split_recognizes_bold_markers():
+    done, pending = split_complete_pairs("**Q1.** a\nA1: b\n**Q2.** c")
+    assert done == ["**Q1.** a\nA1: b\n"]
+    assert pending == "**Q2.** c"
+
+
+def test_split_without_markers():
+    assert split_complete_pairs("preamble only") == ([], "preamble only")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+# ---------------- TokenBucket ----------------
+def test_bucket_starts_full_and_refills():
+    bucket = TokenBucket(capacity=10, period=10)  # one token per second
+    now = bucket.updated
+    assert bucket.wait_time(10, now) == 0.0
+    bucket.consume(10, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1) == 0.0
+
+
+def test_bucket_never_refills_past_capacity():
+    bucket = TokenBucket(capacity=5, period=5)
+    bucket.consume(5, bucket.updated)
+    bucket.wait_time(0, bucket.updated + 100)
+    assert bucket.tokens == 5
+
+
+def test_bucket_caps_requests_larger_than_capacity():
+    bucket = TokenBucket(capacity=5, period=5)
+    assert bucket.wait_time(50, bucket.updated) == 0.0
+
+
+# ---------------- RateLimiter ----------------
+def test_acquire_is_immediate_with_budget():
+    limiter = RateLimiter(rpm=10, rpd=100, tpm=1000)
+    assert limiter.acquire("s", tokens=10) < 0.1
+    assert limiter.stats()["granted"] == 1
+
+
+def test_acquire_times_out_without_budget():
+    limiter = RateLimiter(rpm=1, rpd=100, tpm=1000)
+    limiter.acquire("s")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("s", timeout=0)
+    assert limiter.queue_length() == 0
+
+
+def test_sessions_are_served_round_robin():
+    limiter = RateLimiter(rpm=1200, rpd=10 ** 6, tpm=10 ** 9)  # one request every 50 ms
+    limiter.requests_per_minute.tokens = 0
+    order = []
+    lock = threading.Lock()
+
+    def request(session_id, label):
+        limiter.acquire(session_id)
+        with lock:
+            order.append(label)
+
+    threads = []
+    for session_id, label in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]:
+        thread = threading.Thread(target=request, args=(session_id, label))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)  # enqueue in this order
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # b queued last but is served right after a's first request
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_token_budget_delays_large_requests():
+    limiter = RateLimiter(rpm=100, rpd=1000, tpm=600)  # ten tokens per second
+    limiter.acquire("s", tokens=600)
+    assert limiter.expected_wait(tokens=10) == pytest.approx(1.0, abs=0.05)
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("s", tokens=100, timeout=0.5)
+
+
+def test_daily_budget_is_shared_across_sessions():
+    limiter = RateLimiter(rpm=100, rpd=2, tpm=1000)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("c", timeout=0.1)
+    assert limiter.stats()["rpd_available"] < 1
+
+
+def test_expected_wait_grows_with_the_queue():
+    limiter = RateLimiter(rpm=60, rpd=1000, tpm=1000)  # one request per second
+    limiter.requests_per_minute.tokens = 0
+    assert limiter.expected_wait() == pytest.approx(1.0, abs=0.05)
+    ready = threading.Event()
+
+    def waiter():
+        ready.set()
+        limiter.acquire("a", timeout=5)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    ready.wait()
+    time.sleep(0.05)
+    assert limiter.queue_length() == 1
+    assert limiter.expected_wait() > 1.5
+    thread.join(timeout=5)
+    assert limiter.stats()["granted"] == 1
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from response_cache import ResponseCache, SessionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(cache_dir=str(tmp_path), max_bytes=1000, default_ttl=3600)
+
+
+# ---------------- ResponseCache ----------------
+def test_hits_and_misses_are_counted(cache):
+    assert cache.get("k") is None
+    cache.set("k", "value")
+    assert cache.get("k") == "value"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, 5)
+
+
+def test_expired_entries_are_misses(cache):
+    cache.set("short", "value", ttl=0.05)
+    cache.set("long", "value")
+    assert "short" in cache
+    time.sleep(0.06)
+    assert "short" not in cache
+    assert cache.expires_in("short") is None
+    assert cache.get("short") is None
+    assert cache.expires_in("long") == pytest.approx(3600, abs=5)
+
+
+def test_zero_ttl_never_expires(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path), default_ttl=0)
+    cache.set("k", "value")
+    assert cache.expires_in("k") == float("inf")
+
+
+def test_least_recently_used_entries_are_evicted_over_the_budget(cache):
+    cache.set("a", "x" * 400)
+    time.sleep(0.01)
+    cache.set("b", "y" * 400)
+    time.sleep(0.01)
+    cache.get("a")  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache.set("c", "z" * 400)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 1000
+
+
+def test_values_over_the_budget_and_none_are_not_stored(cache):
+    cache.set("big", "x" * 1001)
+    cache.set("none", None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_survive_reopening_the_cache(tmp_path):
+    ResponseCache(cache_dir=str(tmp_path)).set("k", "value")
+    assert ResponseCache(cache_dir=str(tmp_path)).get("k") == "value"
+
+
+def test_delete_and_clear(cache):
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.delete("a")
+    assert "a" not in cache and "b" in cache
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+# ---------------- SessionCache ----------------
+def test_session_cache_has_the_same_interface():
+    cache = SessionCache({})
+    assert cache.get("k") is None
+    cache.set("k", "é")
+    assert cache.get("k") == "é"
+    assert cache.expires_in("k") == float("inf")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, 2)
+    cache.delete("k")
+    assert "k" not in cache
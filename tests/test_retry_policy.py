@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+import retry_policy
+from gemini_async import generate_with_retry_async
+from mock_gemini import MockGeminiClient
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, classify_error, retry_after
+
+
+class APIError(Exception):
+    """Shaped like google.genai.errors.APIError"""
+
+    def __init__(self, code=None, status=None, message="error", details=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.details = details
+
+
+# ---------------- classify_error ----------------
+@pytest.mark.parametrize("error, kind", [
+    (APIError(429), "rate_limit"),
+    (APIError(status="RESOURCE_EXHAUSTED"), "rate_limit"),
+    (APIError(503), "overloaded"),
+    (APIError(500), "overloaded"),
+    (APIError(status="UNAVAILABLE"), "overloaded"),
+    (APIError(400), "fatal"),
+    (APIError(403), "fatal"),
+    (APIError(status="INVALID_ARGUMENT"), "fatal"),
+    (APIError(404), "other"),
+    (Exception("503 UNAVAILABLE: model is overloaded"), "overloaded"),
+    (Exception("429 Too Many Requests"), "rate_limit"),
+    (ConnectionError("reset by peer"), "overloaded"),
+    (ValueError("bad value"), "other"),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_typed_code_wins_over_message():
+    assert classify_error(APIError(400, message="mentions 503 in passing")) == "fatal"
+
+
+def test_retry_after_from_retry_info():
+    error = APIError(429, details={"error": {"details": [{"retryDelay": "7s"}]}})
+    assert retry_after(error) == 7.0
+    assert retry_after(APIError(429)) is None
+
+
+# ---------------- CircuitBreaker ----------------
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+
+
+def test_released_probe_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+# ---------------- RetryPolicy ----------------
+def test_select_falls_back_past_an_open_circuit():
+    policy = RetryPolicy(fallback_models=["lite"], failure_threshold=1, reset_timeout=60)
+    policy.record_failure("main", "overloaded")
+    assert policy.select("main") == "lite"
+    assert policy.fallbacks == 1
+
+
+def test_select_fails_fast_when_every_circuit_is_open():
+    policy = RetryPolicy(fallback_models=["lite"], failure_threshold=1, reset_timeout=60)
+    policy.record_failure("main", "overloaded")
+    policy.record_failure("lite", "rate_limit")
+    with pytest.raises(CircuitOpenError):
+        policy.select("main")
+
+
+def test_client_errors_do_not_trip_the_circuit():
+    policy = RetryPolicy(fallback_models=(), failure_threshold=1, reset_timeout=60)
+    policy.record_failure("main", "fatal")
+    assert policy.breaker("main").state == "closed"
+
+
+def test_backoff_honors_retry_after_unless_switching_models():
+    policy = RetryPolicy(fallback_models=(), max_wait=30, seed=1)
+    error = APIError(429, details={"error": {"details": [{"retryDelay": "7s"}]}})
+    assert policy.backoff("rate_limit", 0.0, error) == 7.0
+    assert policy.backoff("rate_limit", 0.0, error, switching=True) == 1.0
+
+
+def test_backoff_jitter_stays_between_base_and_cap():
+    policy = RetryPolicy(fallback_models=(), max_wait=5, seed=1)
+    waits = [policy.backoff("overloaded", previous) for previous in (0.0, 1.0, 4.0, 100.0)]
+    assert all(1.0 <= wait <= 5.0 for wait in waits)
+    assert waits[0] == 1.0
+
+
+# ---------------- Retry loop ----------------
+@pytest.fixture
+def no_waits(monkeypatch):
+    monkeypatch.setattr(retry_policy, "BACKOFF_SCALE", 0)
+
+
+def test_overloaded_model_falls_back_to_the_next_one(no_waits):
+    client = MockGeminiClient(latency=0, jitter=0, seed=1, unavailable_models={"main"})
+    policy = RetryPolicy(fallback_models=["lite"], failure_threshold=3, reset_timeout=60)
+    text = asyncio.run(generate_with_retry_async(client, "main", "Summarize", retry_policy=policy))
+    assert text
+    assert client.calls_by_model == {"main": 1, "lite": 1}
+    assert policy.fallbacks == 1
+
+
+def test_open_circuit_skips_the_model_on_later_calls(no_waits):
+    client = MockGeminiClient(latency=0, jitter=0, seed=1, unavailable_models={"main"})
+    policy = RetryPolicy(fallback_models=["lite"], failure_threshold=1, reset_timeout=60)
+    for _ in range(3):
+        asyncio.run(generate_with_retry_async(client, "main", "Summarize", retry_policy=policy))
+    assert client.calls_by_model == {"main": 1, "lite": 3}
+    assert policy.stats()["circuits"]["main"]["state"] == "open"
+
+
+def test_fatal_errors_are_not_retried(no_waits):
+    attempts = []
+
+    class Models:
+        def generate_content(self, model, contents, config=None):
+            attempts.append(model)
+            raise APIError(400, "INVALID_ARGUMENT")
+
+    class Client:
+        models = Models()
+
+    with pytest.raises(APIError):
+        asyncio.run(generate_with_retry_async(Client(), "main", "Summarize", retry_policy=RetryPolicy(["lite"])))
+    assert attempts == ["main"]
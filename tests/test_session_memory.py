@@ -0,0 +1,106 @@
+import gc
+import threading
+
+import pytest
+
+from session_memory import MemoryManager, SessionMemory, SpillStore, value_size
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SpillStore(cache_dir=str(tmp_path))
+
+
+# ---------------- Session memory ----------------
+def test_value_size_counts_payload_bytes():
+    assert value_size("é") == 2
+    assert value_size({"a": [b"xy", "z"]}) == 4
+
+
+def test_least_recently_used_values_spill_past_the_cap(store):
+    memory = SessionMemory("s1", store, max_bytes=250)
+    memory["a"] = "x" * 100
+    memory["b"] = "y" * 100
+    memory["a"]  # touch: "b" is now the coldest
+    memory["c"] = "z" * 100
+    assert memory.stats()["spilled_entries"] == 1
+    assert memory.nbytes == 200
+    assert store.stats()["entries"] == 1
+    # Loaded back transparently, spilling the next coldest value to stay under the cap
+    assert memory["b"] == "y" * 100
+    assert memory.loads == 1
+    assert memory.nbytes <= 250
+    assert sorted(memory) == ["a", "b", "c"]
+
+
+def test_a_value_over_the_cap_alone_is_spilled(store):
+    memory = SessionMemory("s1", store, max_bytes=10)
+    memory["big"] = "x" * 100
+    assert memory.nbytes == 0
+    assert memory["big"] == "x" * 100
+
+
+def test_unpicklable_values_stay_in_memory(store):
+    memory = SessionMemory("s1", store, max_bytes=10)
+    memory["lock"] = [threading.Lock()] * 20
+    assert memory.stats()["hot_entries"] == 1
+
+
+def test_without_a_store_it_is_a_plain_mapping():
+    memory = SessionMemory("s1", None, max_bytes=1)
+    memory["a"] = "x" * 100
+    assert memory["a"] == "x" * 100
+    assert memory.spill() == 0
+
+
+def test_delete_and_clear_remove_spilled_rows(store):
+    memory = SessionMemory("s1", store, max_bytes=0)
+    memory["a"] = "x"
+    memory["b"] = "y"
+    del memory["a"]
+    assert store.stats()["entries"] == 1
+    memory.clear()
+    assert store.stats()["entries"] == 0
+    assert len(memory) == 0
+
+
+def test_namespaces_share_the_session_budget(store):
+    memory = SessionMemory("s1", store, max_bytes=1000)
+    data, api = memory.namespace("data"), memory.namespace("api")
+    data["qas"] = "x" * 10
+    api["qas"] = "y" * 20
+    assert data["qas"] == "x" * 10
+    assert list(data) == ["qas"]
+    assert (data.nbytes, api.nbytes, memory.nbytes) == (10, 20, 30)
+    data.clear()
+    assert "qas" not in data and "qas" in api
+
+
+# ---------------- Manager ----------------
+def test_process_cap_spills_the_coldest_session_first(store):
+    manager = MemoryManager(store, session_max_bytes=1000, process_max_bytes=150)
+    cold, warm = manager.session("cold"), manager.session("warm")
+    cold["v"] = "x" * 100
+    warm["v"] = "y" * 100
+    assert cold.nbytes == 0 and warm.nbytes == 100
+    assert manager.stats()["spilled_entries"] == 1
+    assert manager.session("warm") is warm
+
+
+def test_collected_sessions_drop_their_spilled_rows(store):
+    manager = MemoryManager(store, session_max_bytes=0)
+    memory = manager.session("gone")
+    memory["v"] = "x"
+    assert store.stats()["entries"] == 1
+    del memory
+    gc.collect()
+    assert store.stats()["entries"] == 0
+    assert manager.stats()["sessions"] == 0
+
+
+def test_purge_removes_rows_older_than_the_ttl(tmp_path):
+    store = SpillStore(cache_dir=str(tmp_path), ttl=60)
+    store.put("s1", "k", "v")
+    store._conn.execute("UPDATE spilled SET stored_at = stored_at - 120")
+    store.purge()
+    assert store.stats()["entries"] == 0
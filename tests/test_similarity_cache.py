@@ -0,0 +1,74 @@
+import pytest
+
+from interview_core import find_similar_qas, get_qas_cache_key, remember_qas
+from response_cache import ResponseCache
+from similarity_cache import SimilarityIndex, normalize_text
+
+JOB = (
+    "Senior data engineer to build streaming pipelines with Kafka and Spark, own the warehouse "
+    "data model in Snowflake, orchestrate jobs with Airflow and mentor two junior engineers."
+)
+REPOSTED = "  " + JOB.upper() + " We are an equal opportunity employer."
+OTHER_JOB = "Frontend developer building React components, design systems and accessibility audits for a web shop."
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SimilarityIndex(cache_dir=str(tmp_path), threshold=0.8)
+
+
+# ---------------- Normalization ----------------
+def test_normalization_drops_boilerplate_links_and_punctuation():
+    assert normalize_text("C++ & C#: see https://x.io, or mail a@b.com. Equal opportunity employer.") == "c++ c# see or mail"
+
+
+# ---------------- SimilarityIndex ----------------
+def test_reposted_job_ad_matches_the_original(index):
+    index.add("scope", JOB, "key-1")
+    assert index.find("scope", REPOSTED) == ("key-1", 1.0)
+    assert index.find("scope", JOB + " Based in Berlin.")[0] == "key-1"
+    assert index.stats()["identical_hits"] == 1
+
+
+def test_different_jobs_and_scopes_do_not_match(index):
+    index.add("scope", JOB, "key-1")
+    assert index.find("scope", OTHER_JOB) is None
+    assert index.find("other-scope", JOB) is None
+
+
+def test_exclude_skips_the_requests_own_key(index):
+    index.add("scope", JOB, "key-1")
+    assert index.find("scope", JOB, exclude="key-1") is None
+
+
+def test_zero_threshold_disables_lookups(tmp_path):
+    index = SimilarityIndex(cache_dir=str(tmp_path), threshold=0)
+    index.add("scope", JOB, "key-1")
+    assert index.find("scope", JOB) is None
+
+
+def test_oldest_entries_are_pruned_and_discarded_keys_forgotten(tmp_path):
+    index = SimilarityIndex(cache_dir=str(tmp_path), max_entries=1)
+    index.add("scope", JOB, "key-1")
+    index.add("scope", OTHER_JOB, "key-2")
+    assert index.find("scope", JOB) is None
+    index.discard("key-2")
+    assert index.stats()["entries"] == 0
+
+
+# ---------------- Q&A reuse ----------------
+def test_similar_request_reuses_cached_qas(index, tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    settings = ("", "Technical", "Medium", "Senior")
+    cache.set(get_qas_cache_key(JOB, *settings), "Q1. Why Kafka?\nA1. Replay.")
+    remember_qas(index, JOB, *settings)
+    assert find_similar_qas(index, cache, REPOSTED, *settings) == ("Q1. Why Kafka?\nA1. Replay.", 1.0)
+    assert find_similar_qas(index, cache, REPOSTED, "", "Technical", "Hard", "Senior") is None
+
+
+def test_evicted_responses_are_dropped_from_the_index(index, tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    settings = ("", "Technical", "Medium", "Senior")
+    remember_qas(index, JOB, *settings)  # never cached, or since evicted
+    assert find_similar_qas(index, cache, REPOSTED, *settings) is None
+    assert index.stats()["entries"] == 0
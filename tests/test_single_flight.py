@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+# ---------------- Threads ----------------
+def test_concurrent_callers_share_one_call():
+    group = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    def caller():
+        results.append(group.do("k", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while group.stats()["deduplicated"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 3
+    assert group.stats() == {"executed": 1, "deduplicated": 3, "in_flight": 0}
+
+
+def test_the_key_is_released_after_the_call():
+    group = SingleFlight()
+    assert group.do("k", lambda: 1) == (1, False)
+    assert group.do("k", lambda: 2) == (2, False)
+    assert not group.in_flight("k")
+
+
+def test_waiters_receive_the_leaders_error():
+    group = SingleFlight()
+    future, leader = group.begin("k")
+    waiter, shared = group.begin("k")
+    assert leader and not shared and waiter is future
+    group.finish("k", future, error=ValueError("boom"))
+    with pytest.raises(ValueError):
+        waiter.result()
+
+
+def test_interrupts_reach_waiters_as_plain_errors():
+    group = SingleFlight()
+    future, _ = group.begin("k")
+    group.finish("k", future, error=KeyboardInterrupt())
+    with pytest.raises(RuntimeError):
+        future.result()
+
+
+# ---------------- Async ----------------
+def test_async_callers_share_one_call():
+    group = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(group.do_async("k", work) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["answer"] * 3
+    assert [shared for _, shared in results].count(True) == 2
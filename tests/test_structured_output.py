@@ -0,0 +1,89 @@
+import asyncio
+import re
+
+import pytest
+
+from response_cache import ResponseCache
+from structured_output import SchemaError, call_json_async, loads, to_gemini_schema, validate
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 0, "maximum": 10},
+        "tags": {"type": "array", "minItems": 1, "items": {"type": "string", "enum": ["clear", "vague"]}},
+    },
+    "required": ["score", "tags"],
+}
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedClient:
+    """Answers each call with the next scripted text and records the prompts"""
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.prompts = []
+        self.models = self
+
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents[0]["text"])
+        return Response(self.texts.pop(0))
+
+
+# ---------------- Validation ----------------
+def test_valid_value_is_returned():
+    assert validate({"score": 7, "tags": ["clear"], "extra": None}, SCHEMA) == {"score": 7, "tags": ["clear"], "extra": None}
+
+
+@pytest.mark.parametrize("value, message", [
+    ({"tags": ["clear"]}, "$: missing 'score'"),
+    ({"score": "7", "tags": ["clear"]}, "$.score: expected integer"),
+    ({"score": True, "tags": ["clear"]}, "$.score: expected integer"),
+    ({"score": 11, "tags": ["clear"]}, "$.score: 11 is above 10"),
+    ({"score": 7, "tags": []}, "$.tags: expected at least 1 items"),
+    ({"score": 7, "tags": ["clear", "great"]}, "$.tags[1]: 'great' is not one of"),
+])
+def test_invalid_values_name_the_first_bad_path(value, message):
+    with pytest.raises(SchemaError, match=re.escape(message)):
+        validate(value, SCHEMA)
+
+
+def test_code_fences_are_stripped_and_bad_json_is_a_schema_error():
+    assert loads('```json\n{"a": 1}\n```') == {"a": 1}
+    with pytest.raises(SchemaError):
+        loads('{"a": ')
+
+
+def test_gemini_schema_uses_upper_case_types():
+    converted = to_gemini_schema(SCHEMA)
+    assert converted["type"] == "OBJECT"
+    assert converted["properties"]["tags"]["items"] == {"type": "STRING", "enum": ["clear", "vague"]}
+
+
+# ---------------- Repair ----------------
+def test_invalid_response_gets_one_repair_and_the_repair_is_cached(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    client = ScriptedClient('{"score": 7', '{"score": 7, "tags": ["clear"]}')
+    value = asyncio.run(call_json_async(client, "main", "Evaluate", SCHEMA, cache=cache, cache_key="k"))
+    assert value == {"score": 7, "tags": ["clear"]}
+    assert len(client.prompts) == 2
+    assert "invalid JSON" in client.prompts[1] and "Evaluate" not in client.prompts[1]
+    assert loads(cache.get("k")) == value
+
+
+def test_invalid_repair_raises_and_leaves_nothing_cached(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path))
+    client = ScriptedClient('{"score": 7}', '{"score": 70, "tags": ["clear"]}')
+    with pytest.raises(SchemaError):
+        asyncio.run(call_json_async(client, "main", "Evaluate", SCHEMA, cache=cache, cache_key="k"))
+    assert "k" not in cache
+
+
+def test_valid_response_needs_no_repair(tmp_path):
+    client = ScriptedClient('{"score": 3, "tags": ["vague"]}')
+    assert asyncio.run(call_json_async(client, "main", "Evaluate", SCHEMA)) == {"score": 3, "tags": ["vague"]}
+    assert len(client.prompts) == 1
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from gemini_async import generate_with_retry_async
+from mock_gemini import MockGeminiClient, MockResponse
+from token_meter import TokenBudgetExceeded, TokenMeter, response_usage, truncate_at_sentence, truncate_to_tokens
+
+
+class PlainResponse:
+    text = "x" * 40
+
+
+# ---------------- Truncation ----------------
+def test_truncation_ends_on_a_sentence():
+    text = "First sentence here. Second sentence is longer than the limit allows."
+    assert truncate_at_sentence(text, 40) == "First sentence here."
+    assert truncate_at_sentence(text, 1000) == text
+
+
+def test_unpunctuated_text_is_cut_at_a_word():
+    assert truncate_at_sentence("word " * 20, 23) == "word word word word"
+
+
+def test_truncate_to_tokens_adds_a_notice():
+    text = "A sentence. " * 100
+    truncated = truncate_to_tokens(text, max_tokens=10)
+    assert truncated.endswith("[Content truncated]")
+    assert len(truncated) <= 40 + len("\n[Content truncated]")
+    assert truncate_to_tokens(text, max_tokens=None) == text
+
+
+# ---------------- Usage ----------------
+def test_usage_metadata_is_preferred_over_the_estimate():
+    assert response_usage(MockResponse("y" * 80, prompt_tokens=500, cached_tokens=100), "prompt") == (500, 20, 100, False)
+    assert response_usage(PlainResponse(), "p" * 400) == (100, 10, 0, True)
+    assert response_usage(PlainResponse(), "p" * 400, output_text="z" * 8) == (100, 2, 0, True)
+
+
+def test_usage_is_attributed_to_sessions_and_features():
+    meter = TokenMeter()
+    meter.record("a", "qas", MockResponse("y" * 40, prompt_tokens=100), "prompt")
+    meter.record("b", "evaluation", PlainResponse(), "p" * 40)
+    meter.record("a", None, PlainResponse(), "p" * 40)
+    assert meter.session_usage("a") == 130
+    stats = meter.stats()
+    assert stats["process_tokens"] == 150
+    assert stats["features"]["qas"]["input_tokens"] == 100
+    assert stats["features"]["evaluation"]["estimated_requests"] == 1
+    assert stats["features"]["other"]["requests"] == 1
+    assert 'qa_gemini_input_tokens_total{feature="qas"} 100' in meter.metrics_text()
+
+
+# ---------------- Budgets ----------------
+def test_session_and_process_budgets_reject_requests():
+    meter = TokenMeter(session_budget=100, process_budget=150)
+    meter.record("a", "qas", MockResponse("", prompt_tokens=90), "prompt")
+    meter.check("a", 10)
+    with pytest.raises(TokenBudgetExceeded, match="Session"):
+        meter.check("a", 11)
+    meter.record("b", "qas", MockResponse("", prompt_tokens=50), "prompt")
+    with pytest.raises(TokenBudgetExceeded, match="Shared"):
+        meter.check("c", 11)
+    assert meter.stats()["rejected"] == 2
+
+
+def test_budgets_start_over_each_window():
+    meter = TokenMeter(session_budget=100, window=0.05)
+    meter.record("a", "qas", MockResponse("", prompt_tokens=100), "prompt")
+    with pytest.raises(TokenBudgetExceeded):
+        meter.check("a", 1)
+    time.sleep(0.06)
+    meter.check("a", 100)
+    assert meter.session_usage("a") == 0
+
+
+def test_over_budget_requests_are_not_sent():
+    client = MockGeminiClient(latency=0, jitter=0, seed=1)
+    meter = TokenMeter(session_budget=10)
+    with pytest.raises(TokenBudgetExceeded):
+        asyncio.run(generate_with_retry_async(client, "main", "p" * 400, session_id="a", token_meter=meter))
+    assert client.calls == 0
@@ -0,0 +1,171 @@
+"""Token accounting and budgets for Gemini calls.
+
+Every response is metered from its usage metadata (falling back to the local
+estimator when a response has none) and attributed to a session and a feature
+(summary, qas, evaluation). Session and process budgets apply per window; the
+per-feature counters are cumulative and exported in Prometheus text format.
+"""
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from rate_limiter import estimate_tokens
+
+# ---------------- Defaults ----------------
+# 0 means no budget
+DEFAULT_SESSION_BUDGET = int(os.environ.get("QA_SESSION_TOKEN_BUDGET", 0))
+DEFAULT_PROCESS_BUDGET = int(os.environ.get("QA_PROCESS_TOKEN_BUDGET", 0))
+DEFAULT_WINDOW = int(os.environ.get("QA_TOKEN_BUDGET_WINDOW", 86400))
+DOCUMENT_MAX_TOKENS = int(os.environ.get("QA_DOCUMENT_MAX_TOKENS", 3000))
+CHARS_PER_TOKEN = 4  # matches rate_limiter.estimate_tokens
+TRUNCATION_NOTICE = "\n[Content truncated]"
+
+SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised before a request that would exceed a session or process token budget"""
+
+
+# ---------------- Truncation ----------------
+def truncate_at_sentence(text, max_chars):
+    """Cut `text` to at most `max_chars`, ending on the last sentence or line break.
+
+    Falls back to the last word boundary when no sentence ends in the second half of
+    the allowed length, so a long unpunctuated block is not cut down to nothing.
+    """
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    ends = [m.end() for m in SENTENCE_END.finditer(head)]
+    if ends and ends[-1] >= max_chars // 2:
+        return head[:ends[-1]].rstrip()
+    space = head.rfind(" ")
+    return head[:space] if space >= max_chars // 2 else head
+
+
+def truncate_to_tokens(text, max_tokens=DOCUMENT_MAX_TOKENS, notice=TRUNCATION_NOTICE):
+    """Limit `text` to about `max_tokens` tokens at a sentence boundary; None means no limit"""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    return truncate_at_sentence(text, max_tokens * CHARS_PER_TOKEN) + notice
+
+
+# ---------------- Usage ----------------
+def response_usage(response, prompt, output_text=None):
+    """(input, output, cached, estimated) token counts for one response.
+
+    Counts come from `usage_metadata` when the response has it; otherwise they are
+    estimated from `prompt` and the response text (`output_text` for a stream).
+    """
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+    estimated = input_tokens is None
+    if input_tokens is None:
+        input_tokens = estimate_tokens(prompt)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(output_text if output_text is not None else getattr(response, "text", ""))
+    return input_tokens, output_tokens, cached_tokens, estimated
+
+
+# ---------------- Meter ----------------
+class TokenMeter:
+    """Thread-safe token counters with optional per-session and per-process budgets.
+
+    Budgets count input plus output tokens within a fixed window (a day by default);
+    when the window ends both budgets start over.
+    """
+
+    def __init__(self, session_budget=DEFAULT_SESSION_BUDGET, process_budget=DEFAULT_PROCESS_BUDGET,
+                 window=DEFAULT_WINDOW):
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.window = window
+        self.rejected = 0
+        self._window_start = time.time()
+        self._sessions = defaultdict(int)  # session_id -> tokens in the current window
+        self._process = 0
+        self._features = defaultdict(lambda: defaultdict(int))  # feature -> cumulative counters
+        self._lock = threading.Lock()
+
+    def _roll(self, now):
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._sessions.clear()
+            self._process = 0
+
+    def check(self, session_id, tokens):
+        """Raise TokenBudgetExceeded if `tokens` more input would pass a budget"""
+        with self._lock:
+            self._roll(time.time())
+            used = self._sessions.get(session_id, 0)
+            if self.session_budget and used + tokens > self.session_budget:
+                self.rejected += 1
+                raise TokenBudgetExceeded(
+                    f"Session token budget reached ({used:,} of {self.session_budget:,} tokens used)"
+                )
+            if self.process_budget and self._process + tokens > self.process_budget:
+                self.rejected += 1
+                raise TokenBudgetExceeded(
+                    f"Shared token budget reached ({self._process:,} of {self.process_budget:,} tokens used)"
+                )
+
+    def record(self, session_id, feature, response, prompt, output_text=None):
+        """Meter one response; returns (input, output, cached) token counts"""
+        input_tokens, output_tokens, cached_tokens, estimated = response_usage(response, prompt, output_text)
+        total = input_tokens + output_tokens
+        with self._lock:
+            self._roll(time.time())
+            self._sessions[session_id] += total
+            self._process += total
+            counters = self._features[feature or "other"]
+            counters["requests"] += 1
+            counters["input_tokens"] += input_tokens
+            counters["output_tokens"] += output_tokens
+            counters["cached_tokens"] += cached_tokens
+            counters["estimated_requests"] += estimated
+        return input_tokens, output_tokens, cached_tokens
+
+    def session_usage(self, session_id):
+        with self._lock:
+            self._roll(time.time())
+            return self._sessions.get(session_id, 0)
+
+    def stats(self):
+        with self._lock:
+            self._roll(time.time())
+            return {
+                "process_tokens": self._process,
+                "process_budget": self.process_budget,
+                "session_budget": self.session_budget,
+                "sessions": len(self._sessions),
+                "rejected": self.rejected,
+                "features": {feature: dict(counters) for feature, counters in self._features.items()},
+            }
+
+    def metrics_text(self):
+        """Per-feature counters in the Prometheus text exposition format"""
+        stats = self.stats()
+        lines = []
+        for name, help_text in (
+            ("requests", "Gemini responses metered"),
+            ("input_tokens", "Input tokens, including cached context"),
+            ("output_tokens", "Output tokens"),
+            ("cached_tokens", "Input tokens served from cached context"),
+        ):
+            metric = f"qa_gemini_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for feature, counters in sorted(stats["features"].items()):
+                lines.append(f'{metric}{{feature="{feature}"}} {counters.get(name, 0)}')
+        lines.append("# HELP qa_token_budget_rejections_total Requests refused by a token budget")
+        lines.append("# TYPE qa_token_budget_rejections_total counter")
+        lines.append(f"qa_token_budget_rejections_total {stats['rejected']}")
+        lines.append("# HELP qa_process_tokens Tokens used in the current budget window")
+        lines.append("# TYPE qa_process_tokens gauge")
+        lines.append(f"qa_process_tokens {stats['process_tokens']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,195 @@
+"""Background cache warming for popular roles.
+
+The session history doubles as the request log. The job roles that the most
+distinct users asked about without uploading a document are looked up
+periodically. Keys with a resume summary belong to one user and are never
+warmed. Every settings combination that is missing from the response cache, or
+about to expire, is generated with batched requests. The warmer runs at low priority.
+It only sends a request while no interactive request is queued and a share of
+the per-minute budget is still free, and gives up the round otherwise.
+
+Runs as a daemon thread inside the app, or once per invocation from cron:
+
+    python warmer.py --once
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import product
+
+from history_store import HistoryStore
+from interview_core import (
+    BATCH_MAX_COMBINATIONS,
+    CATEGORIES,
+    DIFFICULTIES,
+    EXPERIENCE_LEVELS,
+    InterviewEngine,
+    create_client,
+    get_qas_cache_key,
+)
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from retry_policy import RetryPolicy
+from similarity_cache import SimilarityIndex
+from token_meter import TokenMeter
+
+# ---------------- Defaults ----------------
+DEFAULT_INTERVAL = int(os.environ.get("QA_WARM_INTERVAL", 0))  # seconds between rounds; 0 = off
+DEFAULT_TOP_KEYS = int(os.environ.get("QA_WARM_TOP_KEYS", 5))
+DEFAULT_MIN_USERS = int(os.environ.get("QA_WARM_MIN_USERS", 3))
+DEFAULT_LOOKBACK_DAYS = int(os.environ.get("QA_WARM_LOOKBACK_DAYS", 7))
+DEFAULT_REFRESH_WITHIN = int(os.environ.get("QA_WARM_REFRESH_WITHIN", 24 * 3600))
+DEFAULT_RPM_RESERVE = float(os.environ.get("QA_WARM_RPM_RESERVE", 0.5))
+YIELD_RETRY = 60  # seconds before retrying a round that gave way to interactive traffic
+SESSION_ID = "warmer"
+
+ALL_COMBINATIONS = list(product(CATEGORIES, DIFFICULTIES, EXPERIENCE_LEVELS))
+
+
+# ---------------- Warmer ----------------
+class CacheWarmer:
+    """Keeps the response cache filled for the most requested roles.
+
+    `engine` is an InterviewEngine whose cache is shared with the app (its rate
+    limiter, if any, should be the app's too so the warmer can see queued work).
+    """
+
+    def __init__(self, engine, history, interval=DEFAULT_INTERVAL, top_keys=DEFAULT_TOP_KEYS,
+                 min_users=DEFAULT_MIN_USERS, lookback_days=DEFAULT_LOOKBACK_DAYS,
+                 refresh_within=DEFAULT_REFRESH_WITHIN, rpm_reserve=DEFAULT_RPM_RESERVE):
+        self.engine = engine
+        self.history = history
+        self.interval = interval
+        self.top_keys = top_keys
+        self.min_users = min_users
+        self.lookback_days = lookback_days
+        self.refresh_within = refresh_within
+        self.rpm_reserve = rpm_reserve
+        self.rounds = 0
+        self.warmed = 0
+        self.requests = 0
+        self.yielded = 0
+        self.failures = 0
+        self.last_round = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def hot_keys(self):
+        since = (datetime.now() - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d %H:%M:%S")
+        return self.history.popular_requests(since, limit=self.top_keys, min_users=self.min_users)
+
+    def stale_combinations(self, job_or_jd, summary_text):
+        """Settings combinations whose cached Q&A is missing or expires within refresh_within"""
+        stale = []
+        for combination in ALL_COMBINATIONS:
+            remaining = self.engine.cache.expires_in(get_qas_cache_key(job_or_jd, summary_text, *combination))
+            if remaining is None or remaining < self.refresh_within:
+                stale.append(combination)
+        return stale
+
+    def should_yield(self):
+        """True while interactive requests are queued or the free per-minute budget is low"""
+        limiter = self.engine.rate_limiter
+        if limiter is None:
+            return False
+        if limiter.queue_length():
+            return True
+        bucket = limiter.requests_per_minute
+        return limiter.stats()["rpm_available"] < bucket.capacity * self.rpm_reserve
+
+    async def warm_once(self):
+        """One round over the hot keys; returns False if it stopped to make room for users"""
+        self.rounds += 1
+        self.last_round = time.time()
+        for key in self.hot_keys():
+            job_or_jd, summary_text = key["job_or_jd"], key["document_summary"]
+            stale = self.stale_combinations(job_or_jd, summary_text)
+            for start in range(0, len(stale), BATCH_MAX_COMBINATIONS):
+                if self._stop.is_set():
+                    return True
+                if self.should_yield():
+                    self.yielded += 1
+                    return False
+                chunk = stale[start:start + BATCH_MAX_COMBINATIONS]
+                self.requests += 1
+                try:
+                    results = await self.engine.generate_qas_batch(job_or_jd, summary_text, chunk, feature="warm")
+                except Exception:
+                    self.failures += 1
+                    continue
+                self.warmed += len(results)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                completed = asyncio.run(self.warm_once())
+            except Exception:
+                self.failures += 1
+                completed = True
+            self._stop.wait(self.interval if completed else min(self.interval, YIELD_RETRY))
+
+    def start(self):
+        """Start the warming loop on a daemon thread (no-op when the interval is 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            "rounds": self.rounds,
+            "requests": self.requests,
+            "warmed": self.warmed,
+            "yielded": self.yielded,
+            "failures": self.failures,
+            "last_round": self.last_round,
+        }
+
+
+# ---------------- Standalone ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the response cache for popular roles")
+    parser.add_argument("--once", action="store_true", help="run a single round and exit")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL or 600, help="seconds between rounds")
+    parser.add_argument("--rpm", type=int, default=int(os.environ.get("QA_WARM_RPM", 5)),
+                        help="requests per minute for this process (separate from the app's budget)")
+    parser.add_argument("--api-key", help="Gemini API key (default: GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    engine = InterviewEngine(
+        create_client(args.api_key),
+        cache=ResponseCache(),
+        rate_limiter=RateLimiter(rpm=args.rpm),
+        session_id=SESSION_ID,
+        similarity_index=SimilarityIndex(),
+        token_meter=TokenMeter(),
+        retry_policy=RetryPolicy()
+    )
+    warmer = CacheWarmer(engine, HistoryStore(), interval=args.interval)
+    if args.once:
+        asyncio.run(warmer.warm_once())
+        print(warmer.stats(), file=sys.stderr)
+        return 0
+    warmer.start()
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(warmer.stats(), file=sys.stderr)
+    except KeyboardInterrupt:
+        warmer.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())